@@ -0,0 +1,198 @@
+"""
+Amostras de olhar em arrays estruturados NumPy.
+
+Nos JSON cada amostra é um dict ({x, y, t} no webgazer_data dos trials de eye tracking,
+{x, y, dx, dy} no raw_gaze da validação): centenas de bytes por amostra em objetos Python.
+Aqui elas viram arrays contíguos com coordenadas float32 e tempos int32:
+
+  WEBGAZER_DTYPE   -> x, y (px), t (ms desde o início do trial)
+  WEBGAZER_DTYPE_F64 -> idem em float64, para cálculos que precisam bater exatamente com o JS
+  VALIDACAO_DTYPE  -> point (índice do ponto de validação), x, y (olhar), dx, dy (alvo)
+
+`GazeArrays` guarda as amostras de vários trials num único array, indexado por
+(participant_id, trial_index), e pode ser gravado em .npy e reaberto com memmap.
+"""
+
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from leitor_trials import iter_trials
+
+WEBGAZER_DTYPE = np.dtype([("x", np.float32), ("y", np.float32), ("t", np.int32)])
+WEBGAZER_DTYPE_F64 = np.dtype([("x", np.float64), ("y", np.float64), ("t", np.float64)])
+VALIDACAO_DTYPE = np.dtype([
+    ("point", np.int16),
+    ("x", np.float32), ("y", np.float32),
+    ("dx", np.float32), ("dy", np.float32),
+])
+
+# campos lidos dos trials para montar as amostras (o resto é pulado sem decodificar)
+CAMPOS = ("participant_id", "trial_index", "task", "webgazer_data", "raw_gaze")
+
+
+def _to_float(v):
+    if isinstance(v, bool) or v is None:
+        return np.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _matrix(samples, keys):
+    """Matriz float64 (n × len(keys)) das amostras com todas as chaves e valores numéricos."""
+    try:
+        # caminho rápido: todas as amostras são dicts completos
+        m = np.array([tuple(s[k] for k in keys) for s in samples], dtype=np.float64).reshape(-1, len(keys))
+    except (KeyError, TypeError, ValueError):
+        rows = [[_to_float(s[k]) for k in keys] for s in samples
+                if isinstance(s, dict) and all(k in s for k in keys)]
+        m = np.array(rows, dtype=np.float64).reshape(-1, len(keys))
+    return m[~np.isnan(m).any(axis=1)]
+
+
+def webgazer_array(samples, dtype=WEBGAZER_DTYPE):
+    """Lista webgazer_data ([{x, y, t}, ...]) -> array `dtype` (amostras inválidas são descartadas)."""
+    m = _matrix(samples if isinstance(samples, list) else [], ("x", "y", "t"))
+    out = np.empty(len(m), dtype=dtype)
+    out["x"] = m[:, 0]
+    out["y"] = m[:, 1]
+    out["t"] = np.rint(m[:, 2]) if np.issubdtype(out.dtype["t"], np.integer) else m[:, 2]
+    return out
+
+
+def raw_gaze_array(raw_gaze):
+    """raw_gaze -> array VALIDACAO_DTYPE.
+
+    O plugin grava uma lista por ponto de validação ([[{x, y, dx, dy}, ...], ...]); uma lista
+    plana de amostras também é aceita e fica toda no ponto 0.
+    """
+    if not isinstance(raw_gaze, list):
+        raw_gaze = []
+    if raw_gaze and isinstance(raw_gaze[0], list):
+        pontos = [p if isinstance(p, list) else [] for p in raw_gaze]
+    else:
+        pontos = [raw_gaze]
+    mats = [_matrix(p, ("x", "y", "dx", "dy")) for p in pontos]
+    out = np.empty(sum(len(m) for m in mats), dtype=VALIDACAO_DTYPE)
+    start = 0
+    for i, m in enumerate(mats):
+        stop = start + len(m)
+        out["point"][start:stop] = i
+        for j, k in enumerate(("x", "y", "dx", "dy")):
+            out[k][start:stop] = m[:, j]
+        start = stop
+    return out
+
+
+class GazeArrays:
+    """Amostras de vários trials num único array estruturado, indexadas por (participant_id, trial_index)."""
+
+    def __init__(self, dtype, samples=None, index=None):
+        self.dtype = np.dtype(dtype)
+        self._chunks = []
+        self._samples = samples if samples is not None else np.empty(0, dtype=self.dtype)
+        self.index = index if index is not None else {}  # (participant_id, trial_index) -> (início, fim)
+        self._size = len(self._samples)
+
+    def add(self, participant_id, trial_index, samples):
+        samples = np.asarray(samples, dtype=self.dtype)
+        self.index[(participant_id, trial_index)] = (self._size, self._size + len(samples))
+        self._chunks.append(samples)
+        self._size += len(samples)
+
+    @property
+    def samples(self):
+        """Todas as amostras, na ordem de inserção (os blocos pendentes são concatenados uma vez só)."""
+        if self._chunks:
+            self._samples = np.concatenate([self._samples] + self._chunks)
+            self._chunks = []
+        return self._samples
+
+    def get(self, participant_id, trial_index):
+        start, stop = self.index[(participant_id, trial_index)]
+        return self.samples[start:stop]
+
+    def participant(self, participant_id):
+        """{trial_index: amostras} de um participante."""
+        return {ti: self.samples[a:b] for (pid, ti), (a, b) in self.index.items() if pid == participant_id}
+
+    def participants(self):
+        return list(dict.fromkeys(pid for pid, _ in self.index))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        samples = self.samples
+        for key, (a, b) in self.index.items():
+            yield key, samples[a:b]
+
+    def save(self, prefix):
+        """Grava <prefix>.npy (amostras) e <prefix>.index.json (índice)."""
+        np.save(prefix + ".npy", self.samples)
+        with open(prefix + ".index.json", "w", encoding="utf-8") as f:
+            json.dump([[pid, ti, a, b] for (pid, ti), (a, b) in self.index.items()], f)
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        """Reabre o que `save` gravou; com mmap=True as amostras ficam no disco (np.load mmap_mode='r')."""
+        samples = np.load(prefix + ".npy", mmap_mode="r" if mmap else None)
+        with open(prefix + ".index.json", "r", encoding="utf-8") as f:
+            index = {(pid, ti): (a, b) for pid, ti, a, b in json.load(f)}
+        return cls(samples.dtype, samples, index)
+
+
+def _trials(input_dir, pattern, campos):
+    """((participant_id, trial_index), trial) de todos os arquivos; sem os campos, usa o nome do arquivo e a posição."""
+    for path in sorted(glob.glob(os.path.join(input_dir, pattern))):
+        fallback_id = os.path.splitext(os.path.basename(path))[0].replace("dados_participante_", "")
+        for pos, trial in enumerate(iter_trials(path, fields=campos)):
+            yield (trial.get("participant_id", fallback_id), trial.get("trial_index", pos)), trial
+
+
+def load_gaze(input_dir, pattern="dados_participante_*.json", webgazer_dtype=WEBGAZER_DTYPE):
+    """Lê os arquivos de participante e devolve (webgazer, validacao) como GazeArrays."""
+    webgazer = GazeArrays(webgazer_dtype)
+    validacao = GazeArrays(VALIDACAO_DTYPE)
+    for key, trial in _trials(input_dir, pattern, CAMPOS):
+        if trial.get("task") == "eye_tracking" and isinstance(trial.get("webgazer_data"), list):
+            webgazer.add(*key, webgazer_array(trial["webgazer_data"], webgazer_dtype))
+        elif trial.get("task") == "eye_tracking_validation" and isinstance(trial.get("raw_gaze"), list):
+            validacao.add(*key, raw_gaze_array(trial["raw_gaze"]))
+    return webgazer, validacao
+
+
+def trials_eye_tracking(input_dir, campos, pattern="dados_participante_*.json"):
+    """Outros campos dos trials de eye tracking (text_id, text_content, ...), com as chaves do load_gaze."""
+    campos = [c for c in campos if c not in ("participant_id", "trial_index")]
+    linhas = [
+        [pid, ti] + [trial.get(c) for c in campos]
+        for (pid, ti), trial in _trials(input_dir, pattern, ("participant_id", "trial_index", "task", *campos))
+        if trial.get("task") == "eye_tracking"
+    ]
+    return pd.DataFrame(linhas, columns=["participant_id", "trial_index"] + campos)
+
+
+def trials_com_amostras(input_dir, campos, pattern="dados_participante_*.json", webgazer_dtype=WEBGAZER_DTYPE):
+    """((participant_id, trial_index), amostras, trial) dos trials de eye tracking com webgazer_data,
+    numa única leitura de cada arquivo: as amostras como no load_gaze e os outros `campos` em `trial`."""
+    campos = ("participant_id", "trial_index", "task", "webgazer_data", *campos)
+    for key, trial in _trials(input_dir, pattern, campos):
+        if trial.get("task") == "eye_tracking" and isinstance(trial.get("webgazer_data"), list):
+            yield key, webgazer_array(trial["webgazer_data"], webgazer_dtype), trial
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    output_prefix = os.path.join(input_directory, "gaze")
+
+    webgazer, validacao = load_gaze(input_directory)
+    webgazer.save(output_prefix + "_webgazer")
+    validacao.save(output_prefix + "_validacao")
+    print(f"{len(webgazer)} trials de eye tracking ({len(webgazer.samples)} amostras), "
+          f"{len(validacao)} validações ({len(validacao.samples)} amostras) → {output_prefix}_*.npy")
@@ -1,61 +1,142 @@
 import os
 import glob
 import pandas as pd
-import json
+
+from leitor_trials import iter_trials
 
 # === 0. CONFIGURAÇÃO DO DIRETÓRIO E COLETA DOS ARQUIVOS ===
 directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"  # ajuste para a pasta onde estão os .json
-file_pattern = os.path.join(directory, "*.json")
-json_files = glob.glob(file_pattern)
+# base Parquet particionada por task (gerada por dataset_trials.py); None = lê os JSON brutos
+dataset_dir = None  # ex.: os.path.join(directory, "dataset_trials")
+
+TEXT_KEYS = ["participant_id", "text_id", "text_authorship"]
+
+# campos dos trials usados nas análises abaixo: o resto (webgazer_data, raw_gaze, text_content,
+# segment_content...) é pulado durante a leitura dos JSON, sem ser decodificado
+CAMPOS_JSON = TEXT_KEYS + [
+    "task", "trial_type", "rt", "stimulus", "response", "segment_index",
+    "reading_time", "reading_time_per_word",
+    "number_of_fixations", "number_of_regressions", "total_reading_time",
+    "naturalidade", "clareza", "compreensao", "authorship_correct",
+]
+
+
+def carrega_da_base(dataset_dir):
+    """Lê da base só as partições e colunas usadas abaixo."""
+    from dataset_trials import read_task
+
+    df_leitura = read_task(dataset_dir, "self_paced_reading",
+                           TEXT_KEYS + ["segment_index", "reading_time_per_word", "reading_time"])
+    df_eye = read_task(dataset_dir, "eye_tracking",
+                       TEXT_KEYS + ["number_of_fixations", "number_of_regressions",
+                                    "total_reading_time", "reading_time_per_word"])
+    df_aval = read_task(dataset_dir, "text_evaluation",
+                        TEXT_KEYS + ["naturalidade", "clareza", "compreensao", "authorship_correct"])
+    df_demog = read_task(dataset_dir, "demographics", ["participant_id", "trial_index", "task", "item", "value"])
+    df_iat = read_task(dataset_dir, "iat", ["participant_id", "rt", "stimulus"])
+
+    for col in ["naturalidade", "clareza", "compreensao"]:
+        df_aval[col] = pd.to_numeric(df_aval[col], errors="coerce")
+    df_julg = df_aval.dropna(subset=["naturalidade", "clareza", "compreensao"], how="all")
+    df_autoria = df_aval if df_aval["authorship_correct"].notna().any() else None
+
+    def item(task, nome):
+        sel = df_demog[(df_demog["task"] == task) & (df_demog["item"] == nome)]
+        return sel[["participant_id", "trial_index", "value"]].rename(columns={"value": nome})
+
+    genesc = pd.merge(
+        item("demographic_questionnaire_gender_education", "genero"),
+        item("demographic_questionnaire_gender_education", "escolaridade"),
+        how="outer", on=["participant_id", "trial_index"]
+    )
+    demog = pd.merge(
+        item("demographic_questionnaire_age", "idade").drop(columns="trial_index"),
+        genesc.drop(columns="trial_index"),
+        how="outer",
+        on="participant_id"
+    )
+    return df_leitura, df_eye, df_julg, df_autoria, demog, df_iat
 
-all_records = []
-for file_path in json_files:
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
 
-    try:
-        data = [json.loads(line) for line in lines if line.strip().startswith("{")]
-    except Exception:
-        content = "".join(lines)
-        data = json.loads(content)
+def carrega_dos_json(directory):
+    file_pattern = os.path.join(directory, "*.json")
+    json_files = glob.glob(file_pattern)
 
-    # opcional: extrair participant_id do nome do arquivo, se não vier no JSON
-    base = os.path.splitext(os.path.basename(file_path))[0]
-    fallback_id = base.replace("dados_participante_", "")
-    for rec in data:
-        if "participant_id" not in rec:
-            rec["participant_id"] = fallback_id
+    all_records = []
+    for file_path in json_files:
+        # opcional: extrair participant_id do nome do arquivo, se não vier no JSON
+        base = os.path.splitext(os.path.basename(file_path))[0]
+        fallback_id = base.replace("dados_participante_", "")
+        for rec in iter_trials(file_path, fields=CAMPOS_JSON):
+            if "participant_id" not in rec:
+                rec["participant_id"] = fallback_id
+            all_records.append(rec)
 
-    all_records.extend(data)
+    # Cria o DataFrame com todos os dados
+    df = pd.DataFrame(all_records)
 
-# Cria o DataFrame com todos os dados
-df = pd.DataFrame(all_records)
+    # Garante existência da coluna 'task' para evitar KeyError
+    if "task" not in df.columns:
+        df["task"] = None
 
-# Garante existência da coluna 'task' para evitar KeyError
-if "task" not in df.columns:
-    df["task"] = None
+    # Garante existência das colunas necessárias para agrupamentos
+    for col in ["text_id", "text_authorship", "segment_index"]:
+        if col not in df.columns:
+            df[col] = None
 
+    # Garante existência da coluna 'response' para evitar KeyError
+    if "response" not in df.columns:
+        df["response"] = None
 
-# Garante existência das colunas necessárias para agrupamentos
-for col in ["text_id", "text_authorship", "segment_index"]:
-    if col not in df.columns:
-        df[col] = None
+    # Garante existência das colunas para IAT e evita KeyError
+    for col in ["trial_type", "rt", "stimulus"]:
+        if col not in df.columns:
+            df[col] = None
 
-# Garante existência da coluna 'response' para evitar KeyError
-if "response" not in df.columns:
-    df["response"] = None
+    # Garante identificador mínimo
+    if "participant_id" not in df.columns:
+        df["participant_id"] = "unknown"
 
-# Garante existência das colunas para IAT e evita KeyError
-for col in ["trial_type", "rt", "stimulus"]:
-    if col not in df.columns:
-        df[col] = None
+    # Garante existência das colunas de julgamentos subjetivos para evitar KeyError
+    for col in ["naturalidade", "clareza", "compreensao"]:
+        if col not in df.columns:
+            df[col] = pd.NA
+    for col in ["naturalidade", "clareza", "compreensao"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df_julg = df.dropna(subset=["naturalidade", "clareza", "compreensao"], how="all")
+
+    df_autoria = df if "authorship_correct" in df.columns else None
+    df_iat = df[df["trial_type"].str.contains("iat", na=False)]
+
+    return (df[df["task"] == "self_paced_reading"].copy(), df[df["task"] == "eye_tracking"].copy(),
+            df_julg, df_autoria, extrai_demograficos(df), df_iat)
+
+
+# === 3. DEMOGRÁFICOS (JSON brutos) ===
+def extrai_demograficos(df):
+    df_age = df[df["task"] == "demographic_questionnaire_age"].copy()
+    df_genesc = df[df["task"] == "demographic_questionnaire_gender_education"].copy()
 
-# Garante identificador mínimo
-if "participant_id" not in df.columns:
-    df["participant_id"] = "unknown"
+    df_age["idade"] = df_age["response"].apply(lambda x: x.get("idade") if isinstance(x, dict) else None)
+    df_genesc["genero"] = df_genesc["response"].apply(lambda x: x.get("genero") if isinstance(x, dict) else None)
+    df_genesc["escolaridade"] = df_genesc["response"].apply(lambda x: x.get("escolaridade") if isinstance(x, dict) else None)
+
+    demog = pd.merge(
+        df_age[["participant_id", "idade"]],
+        df_genesc[["participant_id", "genero", "escolaridade"]],
+        how="outer",
+        on="participant_id"
+    )
+    return demog
+
+
+if dataset_dir:
+    df_leitura, df_eye, df_julg, df_autoria, demog_base, df_iat = carrega_da_base(dataset_dir)
+else:
+    df_leitura, df_eye, df_julg, df_autoria, demog_base, df_iat = carrega_dos_json(directory)
 
 # === 1. SELF-PACED READING ===
-df_leitura = df[df["task"] == "self_paced_reading"].copy()
 for col in ["reading_time_per_word", "reading_time"]:
     if col in df_leitura.columns:
         df_leitura[col] = pd.to_numeric(df_leitura[col], errors="coerce")
@@ -66,7 +147,6 @@ for col in ["reading_time_per_word", "reading_time", "number_of_fixations", "num
         df_leitura[col] = pd.NA
 
 # === 2. EYE TRACKING ===
-df_eye = df[df["task"] == "eye_tracking"].copy()
 # Garante existência das colunas de eye-tracking para evitar KeyError
 for col in ["number_of_fixations", "number_of_regressions", "total_reading_time", "reading_time_per_word"]:
     if col not in df_eye.columns:
@@ -84,16 +164,6 @@ eye_base = df_eye.groupby(
     "reading_time_per_word": "mean"
 })
 
-# === 3. JULGAMENTOS SUBJETIVOS ===
-# Garante existência das colunas de julgamentos subjetivos para evitar KeyError
-for col in ["naturalidade", "clareza", "compreensao"]:
-    if col not in df.columns:
-        df[col] = pd.NA
-for col in ["naturalidade", "clareza", "compreensao"]:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-df_julg = df.dropna(subset=["naturalidade", "clareza", "compreensao"], how="all")
-
 # === 4. AGRUPAMENTOS E MERGES ===
 # leitura por segmento
 leitura_base = df_leitura.groupby(
@@ -118,32 +188,14 @@ tabela_geral = pd.merge(leitura_base, julg_base,
                         on=["participant_id", "text_id", "text_authorship"])
 
 # acurácia de autoria, se existir
-if "authorship_correct" in df.columns:
-    autoria_base = df.groupby(
+if df_autoria is not None:
+    autoria_base = df_autoria.groupby(
         ["participant_id", "text_id", "text_authorship"], as_index=False
     )["authorship_correct"].first()
     tabela_geral = tabela_geral.merge(autoria_base,
                                       how="left",
                                       on=["participant_id", "text_id", "text_authorship"])
 
-# === 5. DEMOGRÁFICOS ===
-def extrai_demograficos(df):
-    df_age = df[df["task"] == "demographic_questionnaire_age"].copy()
-    df_genesc = df[df["task"] == "demographic_questionnaire_gender_education"].copy()
-
-    df_age["idade"] = df_age["response"].apply(lambda x: x.get("idade") if isinstance(x, dict) else None)
-    df_genesc["genero"] = df_genesc["response"].apply(lambda x: x.get("genero") if isinstance(x, dict) else None)
-    df_genesc["escolaridade"] = df_genesc["response"].apply(lambda x: x.get("escolaridade") if isinstance(x, dict) else None)
-
-    demog = pd.merge(
-        df_age[["participant_id", "idade"]],
-        df_genesc[["participant_id", "genero", "escolaridade"]],
-        how="outer",
-        on="participant_id"
-    )
-    return demog
-
-demog_base = extrai_demograficos(df)
 tabela_geral = tabela_geral.merge(demog_base, how="left", on="participant_id")
 
 # === 6. IAT (D-SCORE) ===
@@ -155,8 +207,7 @@ def extract_block_from_stimulus(stimulus):
             return "B"
     return None
 
-df_iat = df[df["trial_type"].str.contains("iat", na=False)].copy()
-df_iat = df_iat[df_iat["rt"].astype(float) >= 300]
+df_iat = df_iat[df_iat["rt"].astype(float) >= 300].copy()
 df_iat["block"] = df_iat["stimulus"].apply(extract_block_from_stimulus)
 
 iat_scores = []
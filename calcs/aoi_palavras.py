@@ -0,0 +1,302 @@
+"""
+Áreas de interesse (AOIs) por palavra nos trials de eye tracking.
+
+O texto aparece em .eye-tracking-text (css/style.css): Arial 18px, line-height 1.8, padding 30px,
+max-width 700px, margin 20px auto. Aqui cada texto é quebrado em linhas como o navegador faz
+(larguras de caractere da Arial, quebra só nos espaços) e cada palavra vira uma caixa
+[x0, x1) × [y0, y1): a altura da linha inteira e metade do espaço de cada lado.
+
+Posição do texto na tela:
+  - se o trial tem webgazer_targets (retângulo do #eye-tracking-text-<id> gravado pela extensão
+    do WebGazer), ele é usado;
+  - senão, a posição é estimada pela resolução (LARGURA_TELA × ALTURA_TELA): caixa centralizada
+    na horizontal e conteúdo (texto + botão "Concluído") centralizado na vertical.
+
+As fixações (fixacoes.py) são atribuídas às palavras por um índice de intervalos ordenados
+(linha, x) -> palavra: uma busca binária vetorizada, que mapeia milhões de pontos de uma vez.
+
+Medidas por palavra e trial (primeira passagem = antes de qualquer fixação numa palavra à direita):
+  first_fixation_duration  duração da primeira fixação na palavra, na primeira passagem
+  gaze_duration            soma das fixações seguidas na palavra a partir da primeira
+  go_past_time             soma das fixações desde a primeira na palavra até a primeira numa
+                           palavra à direita (inclui as regressões)
+  total_viewing_time       soma de todas as fixações na palavra
+  skipped                  1 se o leitor passou da palavra sem fixá-la na primeira passagem (há
+                           fixação numa palavra à direita), 0 se ela foi fixada na primeira
+                           passagem; NaN para as palavras além da mais à direita fixada (e para
+                           todas, num trial sem fixações), que o leitor nunca chegou a passar
+Fixações fora das palavras são descartadas antes das medidas. A taxa de pulo (skip_rate) de cada
+palavra sai de `medidas_por_palavra`, que agrega os trials (os NaN ficam fora da média).
+"""
+
+import os
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from amostras_gaze import WEBGAZER_DTYPE_F64, load_gaze, trials_eye_tracking
+from fixacoes import tabela_fixacoes
+
+# .eye-tracking-text (css/style.css)
+FONTE_PX = 18
+ALTURA_LINHA = 1.8 * FONTE_PX
+PADDING = 30
+LARGURA_MAX = 700
+MARGEM = 20
+
+# viewport usado quando o trial não tem webgazer_targets
+LARGURA_TELA = 1920
+ALTURA_TELA = 1080
+ALTURA_BOTOES = 40  # botão "Concluído" do html-button-response (aprox.)
+
+# larguras de avanço da Arial (métricas iguais às da Helvetica), em milésimos de em
+_LARGURAS = dict(zip(
+    " !\"#$%&'()*+,-./0123456789:;<=>?@",
+    [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278]
+    + [556] * 10 + [278, 278, 584, 584, 584, 556, 1015],
+))
+_LARGURAS.update(zip(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    [667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833,
+     722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611],
+))
+_LARGURAS.update(zip(
+    "abcdefghijklmnopqrstuvwxyz",
+    [556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833,
+     556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500],
+))
+_LARGURAS.update(zip("[\\]^_`{|}~", [278, 278, 278, 469, 556, 333, 334, 260, 334, 584]))
+_LARGURAS.update({"“": 333, "”": 333, "„": 333, "‘": 222, "’": 222, "‚": 222, "–": 556, "—": 1000,
+                  "…": 1000, "«": 556, "»": 556, "ª": 370, "º": 365, "°": 400, " ": 278})
+_LARGURA_PADRAO = 556
+
+_PASSO = 1e6  # chave do índice: linha * _PASSO + x (x sempre bem menor que _PASSO)
+
+COLUNAS_PALAVRAS = ["palavra", "texto", "linha", "x0", "x1", "y0", "y1"]
+COLUNAS = ["participant_id", "trial_index", "text_id", "text_authorship", "palavra", "texto", "linha",
+           "n_fixacoes", "first_fixation_duration", "gaze_duration", "go_past_time",
+           "total_viewing_time", "skipped"]
+
+
+def _largura_caractere(c):
+    if c in _LARGURAS:
+        return _LARGURAS[c]
+    # letras acentuadas têm a largura da letra base (á = a, ç = c)
+    return _LARGURAS.get(unicodedata.normalize("NFD", c)[:1], _LARGURA_PADRAO)
+
+
+@lru_cache(maxsize=None)
+def largura_palavra(palavra):
+    """Largura (px) de uma palavra em Arial FONTE_PX."""
+    return sum(_largura_caractere(c) for c in palavra) * FONTE_PX / 1000
+
+
+@lru_cache(maxsize=None)
+def _quebra_linhas(texto, largura):
+    """(palavras, linha, x0, x1) de cada palavra, relativos ao canto da área de conteúdo."""
+    palavras = tuple(texto.split())  # mesma separação do eye-tracking.js (split(/\s+/))
+    espaco = largura_palavra(" ")
+    linha = np.zeros(len(palavras), dtype=np.int64)
+    x0 = np.zeros(len(palavras))
+    x1 = np.zeros(len(palavras))
+    l, cursor = 0, None
+    for i, p in enumerate(palavras):
+        w = largura_palavra(p)
+        if cursor is None:
+            cursor = 0.0
+        elif cursor + espaco + w > largura:
+            # não cabe: vai para a próxima linha (uma palavra maior que a linha fica sozinha nela)
+            l, cursor = l + 1, 0.0
+        else:
+            cursor += espaco
+        linha[i], x0[i], x1[i] = l, cursor, cursor + w
+        cursor += w
+    return palavras, linha, x0, x1
+
+
+def caixa_texto(texto, alvo=None, largura_tela=LARGURA_TELA, altura_tela=ALTURA_TELA):
+    """(left, top, largura) da área de conteúdo do .eye-tracking-text na tela."""
+    if isinstance(alvo, dict) and alvo:
+        # webgazer_targets: {seletor: {x, y, width, height, top, right, bottom, left}}
+        rect = next(iter(alvo.values()))
+        if isinstance(rect, dict) and all(isinstance(rect.get(k), (int, float)) for k in ("left", "top", "width")):
+            return rect["left"] + PADDING, rect["top"] + PADDING, rect["width"] - 2 * PADDING
+    externa = min(LARGURA_MAX + 2 * PADDING, 0.95 * largura_tela)
+    largura = externa - 2 * PADDING
+    linha = _quebra_linhas(texto, largura)[1]
+    n_linhas = int(linha[-1]) + 1 if len(linha) else 0
+    altura = 2 * MARGEM + 2 * PADDING + n_linhas * ALTURA_LINHA + ALTURA_BOTOES
+    left = (largura_tela - externa) / 2 + PADDING
+    top = max(0.0, (altura_tela - altura) / 2) + MARGEM + PADDING
+    return left, top, largura
+
+
+class IndicePalavras:
+    """Índice (linha, x) -> palavra de um texto posicionado na tela."""
+
+    def __init__(self, texto, left, top, largura):
+        palavras, linha, x0, x1 = _quebra_linhas(texto, largura)
+        meio_espaco = largura_palavra(" ") / 2
+        self.palavras = palavras
+        self.linha = linha
+        self.x0 = left + x0 - meio_espaco
+        self.x1 = left + x1 + meio_espaco
+        self.y0 = top + linha * ALTURA_LINHA
+        self.y1 = self.y0 + ALTURA_LINHA
+        self.top = top
+        self.n_linhas = int(linha[-1]) + 1 if len(linha) else 0
+        # as caixas de uma linha são contíguas e crescentes em x: as chaves já saem ordenadas
+        self._inicio = linha * _PASSO + self.x0
+        self._fim = linha * _PASSO + self.x1
+
+    def __len__(self):
+        return len(self.palavras)
+
+    def consulta(self, x, y):
+        """Índice da palavra sob cada ponto (x, y), ou -1 fora das palavras."""
+        x = np.asarray(x, dtype=np.float64)
+        if not len(self):
+            return np.full(x.shape, -1, dtype=np.int64)
+        linha = np.floor((np.asarray(y, dtype=np.float64) - self.top) / ALTURA_LINHA)
+        ok = (linha >= 0) & (linha < self.n_linhas)  # NaN também fica de fora
+        chave = np.where(ok, linha, -1) * _PASSO + x
+        k = np.searchsorted(self._inicio, chave, side="right") - 1
+        ok &= (k >= 0) & (chave < self._fim[np.maximum(k, 0)])
+        return np.where(ok, k, -1)
+
+    def tabela(self):
+        return pd.DataFrame({
+            "palavra": np.arange(len(self)), "texto": self.palavras, "linha": self.linha,
+            "x0": self.x0, "x1": self.x1, "y0": self.y0, "y1": self.y1,
+        })[COLUNAS_PALAVRAS]
+
+
+@lru_cache(maxsize=1024)
+def _indice(texto, left, top, largura):
+    return IndicePalavras(texto, left, top, largura)
+
+
+def indice_trial(texto, alvo=None, largura_tela=LARGURA_TELA, altura_tela=ALTURA_TELA):
+    """IndicePalavras de um trial (reaproveitado entre trials com o mesmo texto e posição)."""
+    texto = texto if isinstance(texto, str) else ""
+    return _indice(texto, *caixa_texto(texto, alvo, largura_tela, altura_tela))
+
+
+def mapear(pontos, trials, largura_tela=LARGURA_TELA, altura_tela=ALTURA_TELA):
+    """Índice da palavra de cada linha de `pontos` (amostras ou fixações com participant_id,
+    trial_index, x, y); `trials` traz text_content e webgazer_targets de cada trial."""
+    palavra = np.full(len(pontos), -1, dtype=np.int64)
+    if not len(pontos):
+        return palavra
+    x = pontos["x"].to_numpy(dtype=np.float64)
+    y = pontos["y"].to_numpy(dtype=np.float64)
+    grupos = pontos.groupby(["participant_id", "trial_index"], sort=False).indices
+    alvos = trials.get("webgazer_targets", pd.Series(None, index=trials.index))
+    for pid, ti, texto, alvo in zip(trials["participant_id"], trials["trial_index"],
+                                    trials["text_content"], alvos):
+        pos = grupos.get((pid, ti))
+        if pos is not None:
+            palavra[pos] = indice_trial(texto, alvo, largura_tela, altura_tela).consulta(x[pos], y[pos])
+    return palavra
+
+
+def medidas_trial(palavra, duracao, n_palavras):
+    """Medidas de leitura por palavra a partir da sequência de fixações de um trial.
+
+    Devolve (n_fixacoes, first_fixation_duration, gaze_duration, go_past_time,
+    total_viewing_time, skipped), arrays de tamanho n_palavras; skipped é 1/0 só para as palavras
+    até a mais à direita fixada e NaN depois dela.
+    """
+    dentro = palavra >= 0
+    f = palavra[dentro]
+    d = np.asarray(duracao, dtype=np.float64)[dentro]
+    n_fix = np.bincount(f, minlength=n_palavras)
+    total = np.bincount(f, weights=d, minlength=n_palavras)
+    primeira = np.full(n_palavras, np.nan)
+    gaze = np.full(n_palavras, np.nan)
+    go_past = np.full(n_palavras, np.nan)
+    pulada = np.full(n_palavras, np.nan)
+    if len(f):
+        soma = np.r_[0.0, np.cumsum(d)]
+        maximo = np.maximum.accumulate(f)
+        # primeira fixação de cada palavra; é de primeira passagem se nada à direita veio antes
+        w, k0 = np.unique(f, return_index=True)
+        passagem = maximo[k0] == w
+        w, k0 = w[passagem], k0[passagem]
+        # fim (exclusivo) da sequência de fixações seguidas na mesma palavra
+        fim_sequencia = np.r_[np.flatnonzero(f[1:] != f[:-1]) + 1, len(f)]
+        fim = fim_sequencia[np.searchsorted(fim_sequencia, k0, side="right")]
+        # primeira fixação numa palavra à direita
+        saida = np.searchsorted(maximo, w, side="right")
+        primeira[w] = d[k0]
+        gaze[w] = soma[fim] - soma[k0]
+        go_past[w] = soma[saida] - soma[k0]
+        # pulada: à esquerda da palavra mais à direita fixada e sem fixação de primeira passagem
+        pulada[:maximo[-1]] = 1.0
+        pulada[w] = 0.0
+    return n_fix, primeira, gaze, go_past, total, pulada
+
+
+def tabela_medidas(fixacoes, trials, largura_tela=LARGURA_TELA, altura_tela=ALTURA_TELA):
+    """Uma linha por palavra de cada trial de eye tracking, com as medidas de leitura.
+
+    `fixacoes` vem de fixacoes.tabela_fixacoes; `trials` de amostras_gaze.trials_eye_tracking com
+    text_id, text_authorship, text_content e (se houver) webgazer_targets.
+    """
+    fixacoes = fixacoes.sort_values(["participant_id", "trial_index", "start"], kind="stable")
+    palavra = mapear(fixacoes, trials, largura_tela, altura_tela)
+    duracao = fixacoes["duration"].to_numpy(dtype=np.float64)
+    grupos = fixacoes.groupby(["participant_id", "trial_index"], sort=False).indices
+    vazio = np.empty(0, dtype=np.int64)
+
+    partes = {c: [] for c in COLUNAS}
+    alvos = trials.get("webgazer_targets", pd.Series(None, index=trials.index))
+    for pid, ti, text_id, autoria, texto, alvo in zip(
+            trials["participant_id"], trials["trial_index"], trials["text_id"],
+            trials["text_authorship"], trials["text_content"], alvos):
+        indice = indice_trial(texto, alvo, largura_tela, altura_tela)
+        n = len(indice)
+        pos = grupos.get((pid, ti), vazio)
+        medidas = medidas_trial(palavra[pos], duracao[pos], n)
+        for c, v in zip(["participant_id", "trial_index", "text_id", "text_authorship"], [pid, ti, text_id, autoria]):
+            partes[c].append(np.full(n, v, dtype=object))
+        partes["palavra"].append(np.arange(n))
+        partes["texto"].append(np.array(indice.palavras, dtype=object))
+        partes["linha"].append(indice.linha)
+        for c, v in zip(COLUNAS[7:], medidas):
+            partes[c].append(v)
+    if not partes["palavra"]:
+        return pd.DataFrame(columns=COLUNAS)
+    tabela = pd.DataFrame({c: np.concatenate(v) for c, v in partes.items()})
+    tabela["trial_index"] = pd.to_numeric(tabela["trial_index"])
+    return tabela[COLUNAS]
+
+
+def medidas_por_palavra(medidas):
+    """Médias por palavra de cada texto, com a taxa de pulo (skip_rate) entre os trials em que o
+    leitor passou da palavra (skipped não NaN)."""
+    return (medidas.groupby(["text_id", "text_authorship", "palavra", "texto"], sort=True)
+            .agg(n_trials=("skipped", "size"),
+                 skip_rate=("skipped", "mean"),
+                 first_fixation_duration=("first_fixation_duration", "mean"),
+                 gaze_duration=("gaze_duration", "mean"),
+                 go_past_time=("go_past_time", "mean"),
+                 total_viewing_time=("total_viewing_time", "mean"))
+            .reset_index())
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    output_trials = os.path.join(input_directory, "medidas_palavras.csv")
+    output_palavras = os.path.join(input_directory, "medidas_por_palavra.csv")
+
+    webgazer, _ = load_gaze(input_directory, webgazer_dtype=WEBGAZER_DTYPE_F64)
+    fixacoes = tabela_fixacoes(webgazer, "ancora")
+    trials = trials_eye_tracking(
+        input_directory, ["text_id", "text_authorship", "text_content", "webgazer_targets"])
+    medidas = tabela_medidas(fixacoes, trials)
+    medidas.to_csv(output_trials, index=False, sep=';', decimal=',')
+    medidas_por_palavra(medidas).to_csv(output_palavras, index=False, sep=';', decimal=',')
+    print(f"{len(fixacoes)} fixações em {len(trials)} trials → {output_trials}, {output_palavras}")
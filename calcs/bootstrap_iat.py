@@ -0,0 +1,228 @@
+"""
+Intervalos de confiança bootstrap (percentil e BCa) para o D-score do IAT.
+
+Por participante: os trials críticos que entram no D (dscore_iat.trials_criticos) são
+reamostrados com reposição dentro de cada bloco 3, 4, 6 e 7, mantendo o número de trials de
+cada bloco. Cada réplica só precisa, por bloco, da soma e da soma dos quadrados dos TR
+sorteados: médias e DP combinados 3∪6 / 4∪7 saem dessas somas. Os sorteios são feitos em lote,
+como matrizes de índices (blocos de mesmo tamanho × réplicas × trials), e os participantes são
+divididos em lotes de tamanho fixo distribuídos entre processos; cada lote tem a sua semente
+(SeedSequence.spawn), então o resultado não depende do número de processos.
+
+O BCa (Efron, 1987) usa o viés da distribuição bootstrap (z0) e a aceleração estimada por
+jackknife (retirando um trial por vez, também a partir das somas).
+
+Para a média do grupo, os participantes (os seus D) são reamostrados com reposição.
+
+Só as variantes sem troca dos erros (D1, D2): nas demais o TR trocado depende dos trials
+sorteados e teria de ser recalculado em cada réplica.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from dscore_iat import RT_MIN_VARIANTE, VARIANTES, trials_criticos
+
+REPLICAS = 10000
+ALPHA = 0.05
+SEMENTE = 20240917
+LOTE_PARTICIPANTES = 32       # participantes por tarefa (e por semente)
+LOTE_SORTEIOS = 4_000_000     # elementos por matriz de índices (limita a memória)
+
+_PAR = np.array([0, 1, 0, 1])  # 3∪6 -> 0, 4∪7 -> 1
+
+
+def _d_somas(n, s1, s2):
+    """D a partir de n, soma e soma dos quadrados por bloco (último eixo: blocos 3, 4, 6, 7).
+
+    n, s1 e s2 se combinam por broadcasting; os TR devem estar centrados por par de blocos
+    (o DP não muda e a soma dos quadrados não perde precisão).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(n > 0, s1 / n, np.nan)
+        n_par = n[..., :2] + n[..., 2:]
+        soma = s1[..., :2] + s1[..., 2:]
+        quad = s2[..., :2] + s2[..., 2:]
+        desvio = quad - soma * soma / n_par
+        # DP zero (ou só arredondamento) ou menos de 2 trials: sem quociente, como no dscore_iat
+        valido = (n_par >= 2) & (desvio > 1e-9 * quad)
+        dp = np.where(valido, np.sqrt(np.where(valido, desvio, 1.0) / np.maximum(n_par - 1, 1)), np.nan)
+        q = (media[..., 2:] - media[..., :2]) / dp
+        n_q = np.isfinite(q).sum(axis=-1)
+        d = np.where(n_q > 0, np.nansum(q, axis=-1) / np.maximum(n_q, 1), np.nan)
+    return d
+
+
+def _replicas_lote(args):
+    """Réplicas bootstrap (replicas × participantes) de um lote de participantes."""
+    rt, n, replicas, semente = args
+    rng = np.random.default_rng(semente)
+    n = n.reshape(-1, 4)
+    n_celulas = n.size
+    tamanho = n.ravel()
+    inicio = np.r_[0, np.cumsum(tamanho)[:-1]].astype(np.int32)
+    s1 = np.zeros((replicas, n_celulas))
+    s2 = np.zeros((replicas, n_celulas))
+    for tam in np.unique(tamanho[tamanho > 0]):
+        celulas = np.flatnonzero(tamanho == tam)
+        passo = max(1, LOTE_SORTEIOS // (len(celulas) * tam))
+        for b0 in range(0, replicas, passo):
+            b1 = min(replicas, b0 + passo)
+            idx = inicio[celulas][:, None, None] + rng.integers(0, tam, size=(len(celulas), b1 - b0, tam), dtype=np.int32)
+            v = rt[idx]
+            s1[b0:b1, celulas] = v.sum(axis=2).T
+            s2[b0:b1, celulas] = np.einsum("cbt,cbt->bc", v, v)
+    return _d_somas(n, s1.reshape(replicas, -1, 4), s2.reshape(replicas, -1, 4))
+
+
+def _quantis(ordenado, validos, q):
+    """Quantil q[j] (interpolação linear) da coluna j de `ordenado` (NaN no fim de cada coluna)."""
+    pos = q * (validos - 1)
+    baixo = np.floor(np.nan_to_num(pos)).astype(np.int64).clip(0, max(ordenado.shape[0] - 1, 0))
+    alto = np.minimum(baixo + 1, np.maximum(validos - 1, 0))
+    col = np.arange(ordenado.shape[1])
+    frac = pos - baixo
+    valor = ordenado[baixo, col] + frac * (ordenado[alto, col] - ordenado[baixo, col])
+    return np.where((validos > 0) & np.isfinite(q), valor, np.nan)
+
+
+def _intervalos(estimativa, boot, aceleracao, alpha):
+    """(EP, percentil baixo/alto, BCa baixo/alto) de cada coluna de `boot` (réplicas × estimativas)."""
+    validos = np.isfinite(boot).sum(axis=0)
+    ordenado = np.sort(boot, axis=0)  # NaN vão para o fim
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # colunas sem réplicas válidas -> NaN
+        ep = np.where(validos > 1, np.nanstd(boot, axis=0, ddof=1), np.nan)
+        # viés: fração das réplicas abaixo da estimativa (empates contam metade)
+        abaixo = (boot < estimativa).sum(axis=0) + 0.5 * (boot == estimativa).sum(axis=0)
+        z0 = ndtri(abaixo / validos)
+        z = ndtri(np.array([alpha / 2, 1 - alpha / 2]))[:, None]
+        a = np.nan_to_num(aceleracao)
+        q_bca = ndtr(z0 + (z0 + z) / (1 - a * (z0 + z)))
+    pct = [_quantis(ordenado, validos, np.full(boot.shape[1], p)) for p in (alpha / 2, 1 - alpha / 2)]
+    bca = [_quantis(ordenado, validos, q) for q in q_bca]
+    sem_estimativa = ~np.isfinite(estimativa)
+    return [np.where(sem_estimativa, np.nan, v) for v in (ep, pct[0], pct[1], bca[0], bca[1])]
+
+
+def _aceleracao(jackknife, grupo, n_grupos):
+    """Aceleração do BCa por grupo a partir dos valores jackknife (NaN são ignorados)."""
+    ok = np.isfinite(jackknife)
+    g, jk = grupo[ok], jackknife[ok]
+    m = np.bincount(g, minlength=n_grupos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.bincount(g, weights=jk, minlength=n_grupos) / m
+        dev = media[g] - jk
+        num = np.bincount(g, weights=dev ** 3, minlength=n_grupos)
+        den = 6 * np.bincount(g, weights=dev ** 2, minlength=n_grupos) ** 1.5
+        return np.where(den > 0, num / den, 0.0)
+
+
+def ic_participantes(trials, variante="D1", replicas=REPLICAS, alpha=ALPHA, semente=SEMENTE, jobs=1):
+    """IC bootstrap do D-score de cada participante de `trials` (o formato do dscore_iat.d_scores).
+
+    Colunas: participant_id, iat_d (estimativa), iat_d_se (erro-padrão bootstrap),
+    iat_d_pct_low/high (percentil) e iat_d_bca_low/high (BCa), ao nível 1 - alpha.
+    """
+    descarta_rapidos, troca = VARIANTES[variante]
+    if troca is not None:
+        raise ValueError(f"Bootstrap só para variantes sem troca dos erros (D1, D2), não {variante}.")
+
+    ids, _, _, grupo, bloco, rt, _ = trials_criticos(trials)
+    if descarta_rapidos:
+        f = rt >= RT_MIN_VARIANTE
+        grupo, bloco, rt = grupo[f], bloco[f], rt[f]
+    n_grupos = len(ids)
+
+    # trials ordenados por célula (participante × bloco), centrados por par de blocos
+    celula = grupo * 4 + bloco
+    ordem = np.argsort(celula, kind="stable")
+    grupo, bloco, rt, celula = grupo[ordem], bloco[ordem], rt[ordem], celula[ordem]
+    par = grupo * 2 + _PAR[bloco]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centro = np.bincount(par, weights=rt, minlength=n_grupos * 2) / np.bincount(par, minlength=n_grupos * 2)
+    rt = rt - centro[par]
+
+    n = np.bincount(celula, minlength=n_grupos * 4).reshape(n_grupos, 4)
+    s1 = np.bincount(celula, weights=rt, minlength=n_grupos * 4).reshape(n_grupos, 4)
+    s2 = np.bincount(celula, weights=rt * rt, minlength=n_grupos * 4).reshape(n_grupos, 4)
+    estimativa = _d_somas(n, s1, s2)
+
+    # jackknife: cada trial retirado da soma do seu bloco
+    um = np.eye(4)[bloco]
+    jackknife = _d_somas(n[grupo] - um, s1[grupo] - um * rt[:, None], s2[grupo] - um * (rt * rt)[:, None])
+    aceleracao = _aceleracao(jackknife, grupo, n_grupos)
+
+    # réplicas: lotes de participantes com sementes independentes
+    limites = list(range(0, n_grupos, LOTE_PARTICIPANTES)) + [n_grupos]
+    inicio_trial = np.r_[0, np.cumsum(n.sum(axis=1))]
+    sementes = np.random.SeedSequence(semente).spawn(max(len(limites) - 1, 1))
+    tarefas = [(rt[inicio_trial[a]:inicio_trial[b]], n[a:b], replicas, s)
+               for a, b, s in zip(limites[:-1], limites[1:], sementes)]
+    if jobs > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tarefas))) as executor:
+            partes = list(executor.map(_replicas_lote, tarefas))
+    else:
+        partes = [_replicas_lote(t) for t in tarefas]
+    boot = np.concatenate(partes, axis=1) if partes else np.empty((replicas, 0))
+
+    ep, pct_baixo, pct_alto, bca_baixo, bca_alto = _intervalos(estimativa, boot, aceleracao, alpha)
+    return pd.DataFrame({
+        "participant_id": np.asarray(ids, dtype=object),
+        "iat_d": estimativa,
+        "iat_d_se": ep,
+        "iat_d_pct_low": pct_baixo,
+        "iat_d_pct_high": pct_alto,
+        "iat_d_bca_low": bca_baixo,
+        "iat_d_bca_high": bca_alto,
+    })
+
+
+def ic_media(d, grupos=None, replicas=REPLICAS, alpha=ALPHA, semente=SEMENTE):
+    """IC bootstrap da média do D (reamostrando participantes), no total ou por grupo.
+
+    `d`: D-scores (um por participante; NaN são ignorados); `grupos`: rótulo de cada
+    participante (None = todos juntos). Uma linha por grupo: grupo, n, media, se e os ICs.
+    """
+    d = np.asarray(d, dtype=np.float64)
+    grupos = np.full(len(d), "todos", dtype=object) if grupos is None else np.asarray(grupos, dtype=object)
+    rng = np.random.default_rng(semente)
+    linhas = []
+    for rotulo in pd.unique(grupos):
+        x = d[(grupos == rotulo) & np.isfinite(d)]
+        linha = {"grupo": rotulo, "n": len(x), "media": x.mean() if len(x) else np.nan}
+        if len(x) > 1:
+            boot = x[rng.integers(0, len(x), size=(replicas, len(x)))].mean(axis=1)[:, None]
+            jackknife = (x.sum() - x) / (len(x) - 1)
+            aceleracao = _aceleracao(jackknife, np.zeros(len(x), dtype=np.int64), 1)
+            valores = _intervalos(np.array([linha["media"]]), boot, aceleracao, alpha)
+        else:
+            valores = [np.array([np.nan])] * 5
+        for nome, v in zip(("se", "pct_low", "pct_high", "bca_low", "bca_high"), valores):
+            linha[nome] = v[0]
+        linhas.append(linha)
+    return pd.DataFrame(linhas, columns=["grupo", "n", "media", "se", "pct_low", "pct_high", "bca_low", "bca_high"])
+
+
+if __name__ == "__main__":
+    from consolida_dados import INPUT_DIR, PATTERN, _collect_iat_trials
+
+    jobs = os.cpu_count() or 1  # processos em paralelo (1 = sequencial)
+    saida_participantes = os.path.join(INPUT_DIR, "iat_bootstrap_participantes.csv")
+    saida_media = os.path.join(INPUT_DIR, "iat_bootstrap_media.csv")
+
+    trials = _collect_iat_trials(INPUT_DIR, PATTERN)
+    ic = ic_participantes(trials, replicas=REPLICAS, jobs=jobs)
+    media = ic_media(ic["iat_d"], replicas=REPLICAS)
+    ic.to_csv(saida_participantes, index=False, encoding="utf-8", sep=";", decimal=",")
+    media.to_csv(saida_media, index=False, encoding="utf-8", sep=";", decimal=",")
+    print(f"[OK] IC de {len(ic)} participantes ({REPLICAS} réplicas) → {saida_participantes}")
+    for r in media.itertuples(index=False):
+        print(f"[IAT] média D ({r.grupo}, n={r.n}) = {r.media:.4f}  "
+              f"IC{100 * (1 - ALPHA):.0f}% percentil [{r.pct_low:.4f}, {r.pct_high:.4f}]  "
+              f"BCa [{r.bca_low:.4f}, {r.bca_high:.4f}]")
@@ -0,0 +1,169 @@
+"""
+Cache incremental dos resultados intermediários de cada arquivo de participante.
+
+Layout do diretório de cache (uma subpasta por versão, então processadores com versões
+diferentes podem dividir o mesmo cache_dir):
+  <cache_dir>/<versão>/manifest.json     -> versão + {caminho: tamanho, mtime, sha256, tabelas}
+  <cache_dir>/<versão>/<tabela>.parquet  -> uma linha por arquivo: `_arquivo` (origem) e
+                                            `_linhas` (a lista de linhas do arquivo em JSON,
+                                            que volta exata: mesmas chaves, int continua int)
+                                            (uma leitura por tabela, não uma por participante)
+
+Um arquivo só é reprocessado se for novo ou se o conteúdo mudou:
+  - tamanho e mtime iguais ao manifesto  -> acerto direto (nem abre o arquivo)
+  - tamanho igual e mtime diferente      -> o sha256 decide (ex.: arquivo copiado de novo)
+Mudou a `version` (lógica de consolidação alterada) -> outra subpasta; as antigas podem ser
+apagadas à mão.
+
+Requer pyarrow (importado só quando o cache lê/grava tabelas).
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import pandas as pd
+
+MANIFEST = "manifest.json"
+SOURCE_COLUMN = "_arquivo"
+ROWS_COLUMN = "_linhas"
+_JSON_COLUMNS = b"json_columns"  # metadado: colunas gravadas como JSON
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_frame(df: pd.DataFrame, path: str):
+    """Grava em Parquet; colunas object com tipos misturados ('' e números) vão como JSON e voltam exatas."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.copy()
+    json_cols = []
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                df[col] = [json.dumps(v, ensure_ascii=False) for v in df[col]]
+                json_cols.append(col)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_JSON_COLUMNS] = json.dumps(json_cols).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    json_cols = json.loads((table.schema.metadata or {}).get(_JSON_COLUMNS, b"[]"))
+    df = table.to_pandas()
+    for col in json_cols:
+        df[col] = df[col].map(json.loads)
+    return df
+
+
+class ResultCache:
+    """Manifesto + uma tabela Parquet por tipo de linha; a API trabalha com listas de linhas (dicts)."""
+
+    def __init__(self, cache_dir: str, version: str):
+        self.cache_dir = os.path.join(cache_dir, re.sub(r"[^\w.+-]+", "_", version))
+        self.version = version
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._cached = None  # {caminho: {tabela: [linhas]}}, carregado na primeira consulta
+        self._fresh = {}     # {caminho: {tabela: [linhas]}} gravados nesta execução
+        self._dirty = False  # tabelas precisam ser regravadas (arquivo novo/alterado/removido)
+
+        manifest_path = os.path.join(self.cache_dir, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == version:
+                self.entries = manifest.get("files", {})
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _table_names(self):
+        return sorted({name for entry in self.entries.values() for name in entry["tables"]})
+
+    def _load(self):
+        import pyarrow as pa
+
+        if self._cached is not None:
+            return
+        self._cached = {}
+        try:
+            for name in self._table_names():
+                df = read_frame(os.path.join(self.cache_dir, name + ".parquet"))
+                for path, rows in zip(df[SOURCE_COLUMN], df[ROWS_COLUMN]):
+                    self._cached.setdefault(path, {})[name] = json.loads(rows)
+        except (OSError, ValueError, pa.ArrowException):
+            # cache corrompido/incompleto: reprocessa tudo
+            self.entries = {}
+            self._cached = {}
+
+    def lookup(self, path):
+        """Linhas em cache do arquivo ({tabela: [linhas]}), ou None se ele for novo/alterado."""
+        self._load()
+        entry = self.entries.get(path)
+        if entry is None:
+            self.misses += 1
+            return None
+        st = os.stat(path)
+        if (st.st_size, st.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+            if st.st_size != entry["size"] or file_sha256(path) != entry["sha256"]:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = st.st_mtime_ns  # mesmo conteúdo, só o mtime mudou
+        self.hits += 1
+        return self._cached.get(path, {})
+
+    def store(self, path, tables):
+        """Registra as linhas do arquivo ({tabela: [linhas]}; {} para arquivos sem linhas/ilegíveis)."""
+        self._load()
+        st = os.stat(path)
+        tables = {name: rows for name, rows in tables.items() if rows}
+        self._fresh[path] = tables
+        self._dirty = True
+        self.entries[path] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": file_sha256(path),
+            "tables": list(tables),
+        }
+
+    def prune(self, paths):
+        """Remove do cache os arquivos que não estão mais no diretório de entrada."""
+        keep = set(paths)
+        for path in list(self.entries):
+            if path not in keep:
+                del self.entries[path]
+                self._dirty = True
+
+    def save(self):
+        """Regrava as tabelas (cache antigo válido + arquivos novos/alterados) e o manifesto."""
+        self._load()
+        if self._dirty:
+            for name in self._table_names():
+                sources, rows = [], []
+                for path in self.entries:
+                    tables = self._fresh[path] if path in self._fresh else self._cached.get(path, {})
+                    if name in tables:
+                        sources.append(path)
+                        rows.append(json.dumps(tables[name], ensure_ascii=False))
+                df = pd.DataFrame({SOURCE_COLUMN: sources, ROWS_COLUMN: rows})
+                write_frame(df, os.path.join(self.cache_dir, name + ".parquet"))
+
+        manifest_path = os.path.join(self.cache_dir, MANIFEST)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "files": self.entries}, f, indent=1)
+        os.replace(tmp_path, manifest_path)
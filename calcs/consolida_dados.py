@@ -10,6 +10,12 @@ Observação (IAT):
 - O JSON registra uma entrada de fase, ex. {"phase":"instruction_block_5", ...}
   e em seguida vêm os trials do IAT (trial_type="iat-html") com os tempos "rt".
 - Este script associa cada trial ao bloco numérico extraído de "phase".
+
+Leitura: cada arquivo é lido uma única vez (collect_task_rows) e cada trial é
+despachado para os acumuladores das três tarefas. Com CACHE_DIR definido, as
+linhas de autoleitura, eye-tracking e IAT de cada arquivo ficam em cache e só
+arquivos novos/alterados são relidos; o D-score é recalculado a partir dos
+trials IAT em cache.
 """
 
 import os
@@ -18,25 +24,23 @@ import glob
 import re
 import pandas as pd
 
+from bootstrap_iat import ic_participantes
+from dscore_iat import d_scores
+from leitor_trials import iter_trials
+
 # === Caminhos (ajuste aqui) ===
 INPUT_DIR  = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
 OUTPUT_CSV = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/dados_consolidados.csv"
 PATTERN    = "*.json"
+# Modo incremental: guarda as linhas intermediárias de cada arquivo (Parquet) e só
+# relê arquivos novos/alterados. None = desligado (lê tudo a cada execução).
+CACHE_DIR  = None  # ex.: os.path.join(INPUT_DIR, ".cache_consolida_dados")
+CACHE_VERSION = "consolida_dados-2"  # incremente ao mudar a extração por trial
 # ===============================
 
 # ---------- Util ----------
-def _iter_trials(obj):
-  if isinstance(obj, list):
-    for it in obj:
-      if isinstance(it, dict):
-        yield it
-  elif isinstance(obj, dict):
-    for key in ("trials", "data", "events"):
-      lst = obj.get(key)
-      if isinstance(lst, list):
-        for it in lst:
-          if isinstance(it, dict):
-            yield it
+# arquivo ilegível é descartado por inteiro (nenhuma linha parcial entra no consolidado)
+_READ_ERRORS = (json.JSONDecodeError, UnicodeDecodeError, OSError)
 
 def _f(v, default=0.0):
   try:
@@ -60,32 +64,87 @@ def _block_id_from_phase(phase_str):
   m = re.search(r"\d+", str(phase_str))
   return m.group(0) if m else None
 
-# ---------- 1) Autoleitura ----------
-def consolidate_self_paced_reading(input_dir, pattern):
-  rows = []
-  for path in glob.glob(os.path.join(input_dir, pattern)):
-    try:
-      data = json.load(open(path, "r", encoding="utf-8"))
-    except Exception:
-      continue
-    for it in _iter_trials(data):
-      task = (it.get("task") or it.get("type") or it.get("trial_type") or "").lower()
-      if task not in ("self_paced_reading", "autoleitura"):
-        continue
-      pid = _pid(it)
-      text_id = it.get("text_id") or it.get("text") or it.get("id_texto")
-      text_auth = it.get("text_authorship") or it.get("autoria_texto") or it.get("text_author")
-      if pid is None or text_id is None or text_auth is None:
+# ---------- Passada única (um parse por arquivo) ----------
+TASKS = ("self", "eye", "iat")
+
+def _collect_file_rows(path):
+  """Lê o arquivo uma vez e despacha cada trial para os acumuladores das três tarefas.
+  Retorna {"self": [...], "eye": [...], "iat": [...]}, ou None se o arquivo for ilegível.
+  """
+  file_rows = {task: [] for task in TASKS}
+  iat_state = {"block": None, "pid": None}
+  try:
+    for it in iter_trials(path):
+      row = _self_paced_row(it)
+      if row is not None:
+        file_rows["self"].append(row)
+      row = _eye_row(it)
+      if row is not None:
+        file_rows["eye"].append(row)
+      row = _iat_row(it, iat_state)
+      if row is not None:
+        file_rows["iat"].append(row)
+  except _READ_ERRORS:
+    return None
+  return file_rows
+
+def collect_task_rows(input_dir, pattern, cache_dir=None):
+  """Linhas de cada tarefa de todos os arquivos, na ordem dos arquivos/trials.
+  Com `cache_dir`, só arquivos novos ou alterados são lidos; os demais vêm do cache Parquet.
+  """
+  cache = None
+  if cache_dir is not None:
+    from cache_resultados import ResultCache  # pyarrow só é necessário no modo incremental
+    cache = ResultCache(cache_dir, CACHE_VERSION)
+
+  rows = {task: [] for task in TASKS}
+  paths = glob.glob(os.path.join(input_dir, pattern))
+  for path in paths:
+    file_rows = None
+    if cache is not None:
+      cached = cache.lookup(path)
+      if cached is not None:
+        file_rows = {task: cached.get(task, []) for task in TASKS}
+    if file_rows is None:
+      file_rows = _collect_file_rows(path)
+      if cache is not None:
+        # arquivo ilegível também entra no manifesto (sem tabelas) até mudar de novo
+        cache.store(path, file_rows or {})
+      if file_rows is None:
         continue
-      rt_seg = it.get("reading_time")
-      if rt_seg is None:
-        rt_seg = it.get("rt") or it.get("reaction_time")
-      rows.append({
-        "participant_id": pid,
-        "text_id": text_id,
-        "text_authorship": text_auth,
-        "rt_ms": _f(rt_seg)
-      })
+    for task in TASKS:
+      rows[task].extend(file_rows[task])
+
+  if cache is not None:
+    cache.prune(paths)
+    cache.save()
+    print(f"[cache] {cache.hits} arquivo(s) do cache, {cache.misses} lido(s) → {cache_dir}")
+  return rows
+
+# ---------- 1) Autoleitura ----------
+def _self_paced_row(it):
+  task = (it.get("task") or it.get("type") or it.get("trial_type") or "").lower()
+  if task not in ("self_paced_reading", "autoleitura"):
+    return None
+  pid = _pid(it)
+  text_id = it.get("text_id") or it.get("text") or it.get("id_texto")
+  text_auth = it.get("text_authorship") or it.get("autoria_texto") or it.get("text_author")
+  if pid is None or text_id is None or text_auth is None:
+    return None
+  rt_seg = it.get("reading_time")
+  if rt_seg is None:
+    rt_seg = it.get("rt") or it.get("reaction_time")
+  return {
+    "participant_id": pid,
+    "text_id": text_id,
+    "text_authorship": text_auth,
+    "rt_ms": _f(rt_seg)
+  }
+
+def consolidate_self_paced_reading(input_dir, pattern, task_rows=None):
+  if task_rows is None:
+    task_rows = collect_task_rows(input_dir, pattern)
+  rows = task_rows["self"]
   if not rows:
     return pd.DataFrame(columns=["participant_id","text_id","text_authorship","total_reading_self"])
   df = pd.DataFrame(rows)
@@ -95,31 +154,29 @@ def consolidate_self_paced_reading(input_dir, pattern):
   return agg
 
 # ---------- 2) Eye-tracking ----------
-def consolidate_eye_tracking(input_dir, pattern):
-  rows = []
-  for path in glob.glob(os.path.join(input_dir, pattern)):
-    try:
-      data = json.load(open(path, "r", encoding="utf-8"))
-    except Exception:
-      continue
-    for it in _iter_trials(data):
-      task = (it.get("task") or it.get("type") or it.get("trial_type") or "").lower()
-      has_fields = ("number_of_regressions" in it) or ("number_of_fixations" in it) or ("total_reading_time" in it)
-      if (task not in ("eye_tracking", "eyetracking", "rastreamento_ocular")) and not has_fields:
-        continue
-      pid = _pid(it)
-      text_id = it.get("text_id") or it.get("text") or it.get("id_texto")
-      text_auth = it.get("text_authorship") or it.get("autoria_texto") or it.get("text_author")
-      if pid is None or text_id is None or text_auth is None:
-        continue
-      rows.append({
-        "participant_id": pid,
-        "text_id": text_id,
-        "text_authorship": text_auth,
-        "eye_n_regressions": _i(it.get("number_of_regressions")),
-        "eye_n_fixations":  _i(it.get("number_of_fixations")),
-        "total_reading_eye": _f(it.get("total_reading_time")),
-      })
+def _eye_row(it):
+  task = (it.get("task") or it.get("type") or it.get("trial_type") or "").lower()
+  has_fields = ("number_of_regressions" in it) or ("number_of_fixations" in it) or ("total_reading_time" in it)
+  if (task not in ("eye_tracking", "eyetracking", "rastreamento_ocular")) and not has_fields:
+    return None
+  pid = _pid(it)
+  text_id = it.get("text_id") or it.get("text") or it.get("id_texto")
+  text_auth = it.get("text_authorship") or it.get("autoria_texto") or it.get("text_author")
+  if pid is None or text_id is None or text_auth is None:
+    return None
+  return {
+    "participant_id": pid,
+    "text_id": text_id,
+    "text_authorship": text_auth,
+    "eye_n_regressions": _i(it.get("number_of_regressions")),
+    "eye_n_fixations":  _i(it.get("number_of_fixations")),
+    "total_reading_eye": _f(it.get("total_reading_time")),
+  }
+
+def consolidate_eye_tracking(input_dir, pattern, task_rows=None):
+  if task_rows is None:
+    task_rows = collect_task_rows(input_dir, pattern)
+  rows = task_rows["eye"]
   if not rows:
     return pd.DataFrame(columns=[
       "participant_id","text_id","text_authorship",
@@ -134,158 +191,79 @@ def consolidate_eye_tracking(input_dir, pattern):
   return agg
 
 # ---------- 3) IAT (rt por bloco; D-score) ----------
-# Parâmetros do passo-a-passo (Greenwald et al. 2003)
-IAT_RT_MAX = 10000.0        # descarta TR > 10.000 ms
-IAT_LOW_RT_MS = 300.0       # TR considerado "baixo"
-IAT_LOW_RT_FRAC_THRESHOLD = 0.10  # remove participante se >10% TR<300ms
+# O passo-a-passo de Greenwald et al. (2003) — corte de 10 s, exclusão por >10% de TR < 300 ms,
+# DP combinado 3∪6 / 4∪7 e média dos quocientes — está em dscore_iat, vetorizado para todos
+# os participantes de uma vez. iat_d é a variante D1 (TR até a resposta correta).
+IAT_EXTRA_VARIANTS = ()     # ex.: ("D2", "D4") acrescenta as colunas iat_d2, iat_d4
 IAT_VERBOSE = False         # imprime detalhes do passo-a-passo
-# Mapas padrão dos blocos (ajuste conforme seu protocolo):
-CONG_PRACTICE_BLOCKS   = {"3"}     # prática congruente
-CONG_TEST_BLOCKS       = {"4"}     # teste  congruente
-INCONG_PRACTICE_BLOCKS = {"5"}     # prática incongruente
-INCONG_TEST_BLOCKS     = {"6","7"} # teste  incongruente
-
-def _collect_iat_trials(input_dir, pattern):
-  """Percorre arquivos; associa cada trial IAT ao 'current_block' definido pela última entrada com 'phase'."""
-  rows = []
-  for path in glob.glob(os.path.join(input_dir, pattern)):
-    try:
-      data = json.load(open(path, "r", encoding="utf-8"))
-    except Exception:
-      continue
-
-    current_block = None
-    current_pid = None  # se as fases também trazem participant_id, manteremos o último visto
-
-    for it in _iter_trials(data):
-      # marcador de fase
-      if "phase" in it and it.get("phase"):
-        current_block = _block_id_from_phase(it.get("phase"))
-        # alguns registros de fase também têm participant_id
-        current_pid = _pid(it) or current_pid
-        continue
-
-      # trial iat
-      ttype = (it.get("trial_type") or it.get("type") or "").lower()
-      if "iat" not in ttype:
-        continue
-
-      pid = _pid(it) or current_pid
-      if pid is None or current_block is None:
-        # sem participante ou sem fase corrente → ignorar
-        continue
+# IC bootstrap do iat_d (bootstrap_iat): réplicas por participante; 0 = desligado
+IAT_BOOTSTRAP = 0           # ex.: 10000 acrescenta iat_d_se, iat_d_pct_low/high, iat_d_bca_low/high
+IAT_BOOTSTRAP_JOBS = os.cpu_count() or 1
+
+def _iat_row(it, state):
+  """Associa o trial IAT ao bloco corrente; `state` guarda o último 'phase'/participante visto no arquivo."""
+  # marcador de fase
+  if "phase" in it and it.get("phase"):
+    state["block"] = _block_id_from_phase(it.get("phase"))
+    # alguns registros de fase também têm participant_id
+    state["pid"] = _pid(it) or state["pid"]
+    return None
 
-      rt = _f(it.get("rt"))
-      rows.append({"participant_id": pid, "block": str(current_block), "rt_ms": rt})
+  # trial iat
+  ttype = (it.get("trial_type") or it.get("type") or "").lower()
+  if "iat" not in ttype:
+    return None
 
-  return pd.DataFrame(rows) if rows else pd.DataFrame(columns=["participant_id","block","rt_ms"])
+  pid = _pid(it) or state["pid"]
+  if pid is None or state["block"] is None:
+    # sem participante ou sem fase corrente → ignorar
+    return None
 
+  rt = _f(it.get("rt"))
+  return {"participant_id": pid, "block": str(state["block"]), "rt_ms": rt, "correct": it.get("correct")}
 
-# Passo-a-passo D-score (Greenwald et al. 2003) adaptado:
-def _calc_iat_dscore_step(df_part: "pd.DataFrame", pid: str) -> tuple:
-  """Calcula D-score passo-a-passo para um participante.
-  Espera colunas: 'block' (str) e 'rt_ms' (float em ms).
-  Retorna: (d_final, d_practice_36, d_test_47, trials_usados)
-  Pode retornar (None, None, None, 0) se não for possível calcular.
-  """
-  if df_part is None or df_part.empty:
-    return (None, None, None, 0)
-
-  # 1) Filtra blocos críticos 3,4,6,7
-  d = df_part.copy()
-  d["block"] = d["block"].astype(str)
-  d = d[d["block"].isin({"3", "4", "6", "7"})]
-  if d.empty:
-    if IAT_VERBOSE:
-      print(f"[IAT] {pid}: nenhum trial nos blocos 3/4/6/7")
-    return (None, None, None, 0)
-
-  # 2) Remove TR > 10000 ms
-  before = len(d)
-  d = d[d["rt_ms"] <= IAT_RT_MAX]
-  removed_hi = before - len(d)
-
-  # 3) Remove participante se >10% TR < 300 ms
-  if len(d) == 0:
-    if IAT_VERBOSE:
-      print(f"[IAT] {pid}: todos os trials removidos por TR>={IAT_RT_MAX}ms")
-    return (None, None, None, 0)
-  frac_low = (d["rt_ms"] < IAT_LOW_RT_MS).mean()
-  if frac_low > IAT_LOW_RT_FRAC_THRESHOLD:
-    if IAT_VERBOSE:
-      print(f"[IAT] {pid}: removido por {frac_low:.1%} TR<300ms (limite 10%)")
-    return (None, None, None, 0)
-
-  # Função para quociente (diferença / DP concatenado)
-  def _quotient(cong_block: str, incong_block: str):
-    cong = d[d["block"] == cong_block]["rt_ms"]
-    incong = d[d["block"] == incong_block]["rt_ms"]
-    if cong.empty or incong.empty:
-      return None, None, None
-    pooled = pd.concat([cong, incong], ignore_index=True)
-    sd = pooled.std(ddof=1)
-    if pd.isna(sd) or sd == 0:
-      return None, None, None
-    diff = incong.mean() - cong.mean()
-    return (diff / sd, diff, sd)
-
-  # 4-7) Cálculos por pares: (3,6) treino e (4,7) crítico
-  q36, diff36, sd36 = _quotient("3", "6")
-  q47, diff47, sd47 = _quotient("4", "7")
-
-  # 8) Média dos quocientes disponíveis
-  quots = [q for q in (q36, q47) if q is not None]
-  d_final = float(pd.Series(quots).mean()) if quots else None
+def _collect_iat_trials(input_dir, pattern, task_rows=None):
+  """Percorre arquivos; associa cada trial IAT ao 'current_block' definido pela última entrada com 'phase'."""
+  if task_rows is None:
+    task_rows = collect_task_rows(input_dir, pattern)
+  rows = task_rows["iat"]
+  return pd.DataFrame(rows) if rows else pd.DataFrame(columns=["participant_id","block","rt_ms","correct"])
 
-  if IAT_VERBOSE:
-    print("=" * 60)
-    print(f"CÁLCULO D-SCORE - PARTICIPANTE: {pid}")
-    print("- Blocos válidos:", len(d), f"(removidos TR>10s: {removed_hi})")
-    if q36 is not None:
-      print(f"Treino  (6-3): quociente={q36:.4f}  (dif={diff36:.2f} / DP={sd36:.2f})")
-    else:
-      print("Treino  (6-3): insuficiente")
-    if q47 is not None:
-      print(f"Crítico (7-4): quociente={q47:.4f}  (dif={diff47:.2f} / DP={sd47:.2f})")
-    else:
-      print("Crítico (7-4): insuficiente")
-    print("D-final:", None if d_final is None else f"{d_final:.4f}")
-
-  return (d_final, q36, q47, int(len(d)))
-
-def _d_from_blocks(cong, incong):
-  """Greenwald et al. (2003): D = (M_incong - M_cong) / SD(cong ∪ incong)"""
-  if cong.empty or incong.empty:
-    return None
-  pooled = pd.concat([cong, incong], ignore_index=True)
-  sd = pooled.std(ddof=1)
-  if pd.isna(sd) or sd == 0:
-    return None
-  return (incong.mean() - cong.mean()) / sd
 
-def consolidate_iat(input_dir, pattern):
-  df = _collect_iat_trials(input_dir, pattern)
+def consolidate_iat(input_dir, pattern, task_rows=None):
+  df = _collect_iat_trials(input_dir, pattern, task_rows)
+  extra = [f"iat_{v.lower()}" for v in IAT_EXTRA_VARIANTS]
+  if IAT_BOOTSTRAP:
+    extra += ["iat_d_se","iat_d_pct_low","iat_d_pct_high","iat_d_bca_low","iat_d_bca_high"]
   if df.empty:
-    return pd.DataFrame(columns=["participant_id","iat_d","iat_d_practice","iat_d_test","iat_trials_used"])
+    return pd.DataFrame(columns=["participant_id","iat_d","iat_d_practice","iat_d_test","iat_trials_used"] + extra)
+
+  res = d_scores(df, ("D1",) + tuple(IAT_EXTRA_VARIANTS))
+  out = pd.DataFrame({
+    "participant_id": res["participant_id"],
+    "iat_d": res["D1"],
+    "iat_d_practice": res["D1_practice"],  # (6-3)/DP(3∪6)
+    "iat_d_test": res["D1_test"],          # (7-4)/DP(4∪7)
+    "iat_trials_used": res["trials_used"],
+  })
+  for v, col in zip(IAT_EXTRA_VARIANTS, extra):
+    out[col] = res[v]
+  if IAT_BOOTSTRAP:
+    ic = ic_participantes(df, replicas=IAT_BOOTSTRAP, jobs=IAT_BOOTSTRAP_JOBS)
+    out = out.merge(ic.drop(columns="iat_d"), on="participant_id", how="left")
 
-  out = []
-  for pid, dfg in df.groupby("participant_id"):
-    d_final, d36, d47, used = _calc_iat_dscore_step(dfg[["block","rt_ms"]].copy(), pid)
-    out.append({
-      "participant_id": pid,
-      "iat_d": d_final,
-      "iat_d_practice": d36,  # (6-3)/DP(3∪6)
-      "iat_d_test": d47,       # (7-4)/DP(4∪7)
-      "iat_trials_used": used,
-    })
-
-  return pd.DataFrame(out)
+  if IAT_VERBOSE:
+    for r in out.itertuples(index=False):
+      print(f"[IAT] {r.participant_id}: trials={r.iat_trials_used}  "
+            f"treino(6-3)={r.iat_d_practice:.4f}  crítico(7-4)={r.iat_d_test:.4f}  D={r.iat_d:.4f}")
+  return out
 
 # ---------- MAIN ----------
 def main():
-  df_self = consolidate_self_paced_reading(INPUT_DIR, PATTERN)
-  df_eye  = consolidate_eye_tracking(INPUT_DIR, PATTERN)
-  df_iat  = consolidate_iat(INPUT_DIR, PATTERN)
+  task_rows = collect_task_rows(INPUT_DIR, PATTERN, CACHE_DIR)  # cada arquivo é lido uma única vez
+  df_self = consolidate_self_paced_reading(INPUT_DIR, PATTERN, task_rows)
+  df_eye  = consolidate_eye_tracking(INPUT_DIR, PATTERN, task_rows)
+  df_iat  = consolidate_iat(INPUT_DIR, PATTERN, task_rows)
 
   keys = ["participant_id","text_id","text_authorship"]
   if df_self.empty:
@@ -0,0 +1,566 @@
+"""
+Consolidação dos dados do experimento em uma ou mais granularidades, com um único parse por arquivo.
+
+Granularidades (qualquer subconjunto):
+  participant -> uma linha por participante (dados do consentimento, demográficos, D-score)
+  text        -> uma linha por participante/texto (dados_combinados.csv)
+  segment     -> uma linha por participante/segmento da leitura automonitorada (dados_detalhados.csv)
+
+Cada arquivo é lido uma vez, já com a projeção dos campos usados (webgazer_data, text_content
+etc. são pulados sem decodificar); informações do participante, demográficos, trials do IAT e
+o índice por text_id (leitura automonitorada, eye tracking e avaliações) saem desses mesmos
+registros em memória, e todas as tabelas pedidas são montadas a partir deles. O D-score é
+calculado uma vez por arquivo e vai para todas as tabelas.
+
+Com cache_dir, o cache incremental guarda as tabelas intermediárias de cada arquivo (linhas,
+trials do IAT e demográficos); D-score e demográficos são aplicados a cada execução, então
+mudar o cálculo do D-score não exige reler os arquivos.
+
+consolida_dados_deep.py (texto) e consolida_det_dados.py (segmento) usam este processador com
+uma granularidade; para gerar as tabelas juntas, rode este script.
+
+Com zipf_dir, a tabela de segmentos ganha a covariável zipf_medio_segmento (Zipf médio das
+palavras do segmento), consultada no léxico persistido do lexico_zipf depois de juntar o
+vocabulário de todos os segmentos.
+"""
+
+import io
+import json
+import pandas as pd
+import os
+import glob
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any
+
+from dscore_iat import d_scores
+from estimulos_iat import categoriza, resolve as resolve_stimulus
+from leitor_trials import iter_trials
+
+CACHE_VERSION = "consolida_granular-2"  # mude ao alterar a lógica de extração: invalida o cache incremental
+
+GRANULARIDADES = ("participant", "text", "segment")
+ROTULOS = {"participant": "participantes", "text": "textos", "segment": "segmentos"}
+
+# únicos campos decodificados de cada trial (projeção do leitor_trials)
+CAMPOS = (
+    'participant_id', 'external_id', 'consent_agreed', 'consent_version', 'consent_timestamp',
+    'user_agent', 'language', 'screen_w', 'screen_h',
+    'task', 'response', 'text_id', 'text_authorship', 'rt',
+    'segment_index', 'segment_content',
+    'number_of_regressions', 'number_of_fixations', 'total_reading_time', 'reading_time_per_word',
+    'total_samples', 'authorship_correct',
+    'phase', 'trial_type', 'stimulus', 'trial_index', 'correct',
+)
+
+DEMOGRAFICOS = ('idade', 'genero', 'escolaridade', 'familiaridade_ia', 'frequencia_ia', 'confianca_identificacao')
+
+
+class ExperimentDataProcessor:
+    def __init__(self, input_dir: str, output_files: Dict[str, str], granularity=GRANULARIDADES,
+                 jobs: int = 1, cache_dir: str = None, zipf_dir: str = None):
+        granularity = tuple(g for g in GRANULARIDADES if g in set(granularity))
+        desconhecidas = set(output_files) - set(GRANULARIDADES)
+        if not granularity or desconhecidas:
+            raise ValueError(f"Granularidade inválida: use um subconjunto de {GRANULARIDADES}")
+        sem_saida = [g for g in granularity if g not in output_files]
+        if sem_saida:
+            raise ValueError(f"Sem arquivo de saída para: {sem_saida}")
+        self.input_dir = input_dir
+        self.output_files = output_files
+        self.granularity = granularity
+        self.jobs = jobs  # processos em paralelo (1 = sequencial)
+        self.cache_dir = cache_dir  # None = sem cache incremental (requer pyarrow quando ativo)
+        self.zipf_dir = zipf_dir  # None = sem a covariável de frequência por segmento
+        self.all_data = {g: [] for g in granularity}
+
+    def load_json_files(self):
+        """Lista os arquivos JSON do diretório; cada um é lido uma única vez, em process_file"""
+        json_files = glob.glob(os.path.join(self.input_dir, "*.json"))
+        json_files.extend(glob.glob(os.path.join(self.input_dir, "*.txt")))
+
+        print(f"Procurando arquivos em: {self.input_dir}")
+        print(f"Arquivos encontrados: {json_files}")
+
+        return [{'file_path': file_path, 'file_name': os.path.basename(file_path)} for file_path in json_files]
+
+    def extract_participant_info(self, data: List[Dict]) -> Dict[str, Any]:
+        """Extrai informações básicas do participante"""
+        participant_info = {
+            'participant_id': '',
+            'external_id': '',
+            'consent_agreed': False,
+            'consent_version': '',
+            'consent_timestamp': '',
+            'user_agent': '',
+            'language': '',
+            'screen_resolution': '',
+            'idade': '',
+            'genero': '',
+            'escolaridade': '',
+            'familiaridade_ia': '',
+            'frequencia_ia': '',
+            'confianca_identificacao': ''
+        }
+
+        for trial in data:
+            if 'participant_id' in trial:
+                participant_info['participant_id'] = trial.get('participant_id', '')
+                participant_info['external_id'] = trial.get('external_id', '')
+                participant_info['consent_agreed'] = trial.get('consent_agreed', False)
+                participant_info['consent_version'] = trial.get('consent_version', '')
+                participant_info['consent_timestamp'] = trial.get('consent_timestamp', '')
+                participant_info['user_agent'] = trial.get('user_agent', '')
+                participant_info['language'] = trial.get('language', '')
+
+                screen_w = trial.get('screen_w', '')
+                screen_h = trial.get('screen_h', '')
+                participant_info['screen_resolution'] = f"{screen_w}x{screen_h}" if screen_w and screen_h else ''
+                break
+
+        return participant_info
+
+    def extract_demographic_data(self, data: List[Dict], participant_info: Dict) -> Dict[str, Any]:
+        """Extrai dados demográficos do participante"""
+        demographic_data = {
+            'idade': '',
+            'genero': '',
+            'escolaridade': '',
+            'familiaridade_ia': '',
+            'frequencia_ia': '',
+            'confianca_identificacao': ''
+        }
+
+        for trial in data:
+            task_type = trial.get('task', '')
+
+            if task_type == 'demographic_questionnaire_age':
+                response_data = trial.get('response', {})
+                if isinstance(response_data, dict):
+                    demographic_data['idade'] = response_data.get('idade', '')
+
+            elif task_type == 'demographic_questionnaire_gender_education':
+                response_data = trial.get('response', {})
+                if isinstance(response_data, dict):
+                    demographic_data['genero'] = response_data.get('genero', '')
+                    demographic_data['escolaridade'] = response_data.get('escolaridade', '')
+
+            elif task_type == 'ai_familiarity_questionnaire':
+                response_data = trial.get('response', {})
+                if isinstance(response_data, dict):
+                    demographic_data['familiaridade_ia'] = response_data.get('familiaridade_ia', '')
+                    demographic_data['frequencia_ia'] = response_data.get('frequencia_ia', '')
+                    demographic_data['confianca_identificacao'] = response_data.get('confianca_identificacao', '')
+
+        return demographic_data
+
+    def extract_iat_data(self, data: List[Dict], participant_info: Dict) -> List[Dict]:
+        """
+        Extrai dados do IAT de um arquivo JSON individual
+        """
+        iat_trials = []
+
+        # Mapeamento de fases para blocos do IAT
+        phase_to_block = {
+            'instruction_block_1': 1,  # Bloco 1: Prática - apenas textos (IA vs Humano)
+            'instruction_block_2': 2,  # Bloco 2: Prática - apenas palavras (Positivo vs Negativo)
+            'instruction_block_3': 3,  # Bloco 3: Prática combinada (IA+Positivo vs Humano+Negativo)
+            'instruction_block_4': 4,  # Bloco 4: Teste combinado (IA+Positivo vs Humano+Negativo)
+            'instruction_block_5': 5,  # Bloco 5: Prática - textos invertidos
+            'instruction_block_6': 6,  # Bloco 6: Prática combinada invertida (Humano+Positivo vs IA+Negativo)
+            'instruction_block_7': 7   # Bloco 7: Teste combinado invertido (Humano+Positivo vs IA+Negativo)
+        }
+
+        current_block = None
+
+        for trial in data:
+            # Identificar mudança de bloco pelas instruções
+            if 'phase' in trial and trial['phase'] in phase_to_block:
+                current_block = phase_to_block[trial['phase']]
+                continue
+
+            # Processar apenas trials do IAT (trial_type = 'iat-html')
+            if (trial.get('trial_type') == 'iat-html' and
+                    'rt' in trial and
+                    'stimulus' in trial and
+                    current_block is not None):
+
+                # Stimulus e categoria do HTML (memoizado: cada HTML distinto é lido uma vez)
+                resolvido = resolve_stimulus(trial['stimulus'])
+
+                if resolvido:
+                    clean_stimulus, category = resolvido
+
+                    # Garantir que rt seja float
+                    rt_value = float(trial.get('rt', 0))
+
+                    # Dados completos para análise
+                    iat_trial = {
+                        'id_participante': participant_info['participant_id'],
+                        'bloco': current_block,
+                        'trial_index': trial.get('trial_index', 0),
+                        'stimulus': clean_stimulus,
+                        'categoria': category,
+                        'resposta': trial.get('response', ''),
+                        'correta': trial.get('correct', False),
+                        'react_time': rt_value,  # Já como float
+                        'condicao': self.get_condition(current_block, category)
+                    }
+
+                    iat_trials.append(iat_trial)
+
+        return iat_trials
+
+    def categorize_stimulus(self, stimulus):
+        """
+        Categoriza o stimulus como 'ia_text', 'human_text', 'positive', ou 'negative'
+        """
+        return categoriza(stimulus)
+
+    def get_condition(self, bloco, categoria):
+        """
+        Determina se o trial é congruente ou incongruente baseado no bloco e categoria
+        """
+        # Blocos 3 e 4: IA+Positivo (E) vs Humano+Negativo (I) - CONGRUENTE para IA+Positivo
+        # Blocos 6 e 7: Humano+Positivo (E) vs IA+Negativo (I) - INCONGRUENTE para IA+Positivo
+
+        if bloco in [3, 4]:
+            return 'congruent' if categoria in ['ia_text', 'positive'] else 'incongruent'
+        elif bloco in [6, 7]:
+            return 'incongruent' if categoria in ['ia_text', 'positive'] else 'congruent'
+        else:
+            return 'practice'
+
+    def calculate_d_score(self, iat_trials):
+        """
+        Calcula o D-score (Greenwald et al., 2003: blocos 3/4/6/7, corte de 10 s, exclusão por
+        >10% de TR < 300 ms, DP combinado 3∪6 e 4∪7, média dos quocientes) com dscore_iat
+        """
+        if not iat_trials:
+            return None
+
+        trials = pd.DataFrame({
+            'participant_id': [t['id_participante'] for t in iat_trials],
+            'block': [t['bloco'] for t in iat_trials],
+            'rt_ms': [t['react_time'] for t in iat_trials],
+            'correct': [t['correta'] for t in iat_trials],
+        })
+        d = d_scores(trials)['D1'].iloc[0]
+        return None if pd.isna(d) else float(d)
+
+    def index_texts(self, data: List[Dict]) -> Dict[str, Dict]:
+        """Uma passada pelos trials: leitura automonitorada, eye tracking e avaliações indexados por text_id"""
+        index = {
+            'reading': {},     # text_id -> autoria e tempos dos segmentos (ordem da leitura automonitorada)
+            'segments': {},    # "<text_id>_segment_<i>" -> primeiro trial do segmento
+            'eye_first': {},   # text_id -> autoria do primeiro trial de eye tracking
+            'any_first': {},   # text_id (não vazio) -> autoria do primeiro trial com esse texto
+            'eye': {},         # text_id -> campos do último trial de eye tracking
+            'evaluation': {},  # text_id -> avaliações subjetivas (o último trial de cada tarefa vale)
+        }
+        for trial in data:
+            task_type = trial.get('task', '')
+            text_id = trial.get('text_id', '')
+
+            # Leitura automonitorada
+            if task_type == 'self_paced_reading':
+                reading = index['reading'].setdefault(text_id, {
+                    'text_authorship': trial.get('text_authorship', ''),
+                    'reading_times': []
+                })
+                reading['reading_times'].append(trial.get('rt', 0))
+
+                # Cria uma chave única para cada segmento
+                segment_key = f"{text_id}_segment_{trial.get('segment_index', '')}"
+                index['segments'].setdefault(segment_key, trial)
+
+            # Eye tracking
+            elif task_type == 'eye_tracking':
+                index['eye_first'].setdefault(text_id, trial.get('text_authorship', ''))
+                index['eye'][text_id] = {
+                    'number_of_regressions': trial.get('number_of_regressions', ''),
+                    'number_of_fixations': trial.get('number_of_fixations', ''),
+                    'total_reading_eye': trial.get('total_reading_time', ''),
+                    'reading_time_per_word': trial.get('reading_time_per_word', ''),
+                    'total_samples': trial.get('total_samples', ''),
+                }
+
+            # Avaliações subjetivas (só trials com text_id válido)
+            if not text_id:
+                continue
+            index['any_first'].setdefault(text_id, trial.get('text_authorship', ''))
+            evaluation = index['evaluation'].setdefault(text_id, {})
+            if task_type == 'text_evaluation':
+                response_data = trial.get('response', {})
+                if isinstance(response_data, dict):
+                    evaluation['naturalidade'] = response_data.get('naturalidade', '')
+                    evaluation['clareza'] = response_data.get('clareza', '')
+                    evaluation['compreensao'] = response_data.get('compreensao', '')
+
+            elif task_type == 'authorship_identification':
+                evaluation['authorship_correct'] = trial.get('authorship_correct', '')
+
+            elif task_type == 'confidence_rating':
+                evaluation['confidence_response'] = trial.get('response', '')
+
+        return index
+
+    def _text_attributes(self, index: Dict, text_id) -> Dict:
+        """Campos de eye tracking e avaliações do texto (junção pela chave text_id)"""
+        return {**index['eye'].get(text_id, {}), **index['evaluation'].get(text_id, {})}
+
+    def text_rows(self, index: Dict, participant_info: Dict) -> List[Dict]:
+        """Uma linha por texto: textos lidos na autoleitura, depois os só do eye tracking e os só avaliados"""
+        def base(text_id, text_authorship):
+            return {
+                'participant_id': participant_info['participant_id'],
+                'text_id': text_id,
+                'text_authorship': text_authorship,
+                'source_file': participant_info.get('source_file', '')
+            }
+
+        rows = {}
+        for text_id, reading in index['reading'].items():
+            rows[text_id] = base(text_id, reading['text_authorship'])
+            rows[text_id]['tempo_total_leitura'] = sum(reading['reading_times'])
+            rows[text_id]['quantidade_segmentos'] = len(reading['reading_times'])
+        for text_id, text_authorship in list(index['eye_first'].items()) + list(index['any_first'].items()):
+            if text_id not in rows:
+                rows[text_id] = base(text_id, text_authorship)
+
+        return [{**row, **self._text_attributes(index, text_id)} for text_id, row in rows.items()]
+
+    def segment_rows(self, index: Dict, participant_info: Dict) -> List[Dict]:
+        """Uma linha por segmento da leitura automonitorada, com os campos do seu texto"""
+        rows = []
+        for trial in index['segments'].values():
+            text_id = trial.get('text_id', '')
+            rows.append({
+                'participant_id': participant_info['participant_id'],
+                'text_id': text_id,
+                'text_authorship': trial.get('text_authorship', ''),
+                'segment_index': trial.get('segment_index', ''),
+                'segment_content': trial.get('segment_content', ''),
+                'reading_time_segment': trial.get('rt', 0),
+                'source_file': participant_info.get('source_file', ''),
+                **self._text_attributes(index, text_id)
+            })
+        return rows
+
+    def add_segment_zipf(self):
+        """Zipf médio das palavras de cada segmento, com o vocabulário de todos os segmentos resolvido em lote"""
+        from lexico_zipf import LexicoZipf, palavras
+
+        lexico = LexicoZipf(self.zipf_dir)
+        rows = self.all_data['segment']
+        por_segmento = [palavras(row.get('segment_content', '')) for row in rows]
+        lexico.resolve(p for seq in por_segmento for p in seq)
+        for row, seq in zip(rows, por_segmento):
+            media = lexico.media(seq)
+            row['zipf_medio_segmento'] = '' if media != media else round(media, 4)
+        lexico.salva()
+        print(f"[zipf] {len(lexico)} palavra(s) no léxico → {lexico.path}")
+
+    def participant_row(self, index: Dict, participant_info: Dict, iat_trials: List[Dict]) -> Dict:
+        """Uma linha por participante: consentimento, tela, contagens de textos/segmentos e trials do IAT"""
+        row = {k: v for k, v in participant_info.items() if k not in DEMOGRAFICOS}
+        row['n_textos'] = len(index['reading'])
+        row['n_segmentos'] = len(index['segments'])
+        row['iat_trials'] = len(iat_trials)
+        return row
+
+    def extract_file(self, file_info: Dict) -> Dict[str, List[Dict]]:
+        """Único parse do arquivo (projeção CAMPOS): tabelas intermediárias que vão para o cache.
+
+        {granularidade: linhas ainda sem demográficos e D-score, 'iat': trials do IAT,
+        'demographics': [dados demográficos]}; D-score e demográficos entram em finish_file.
+        """
+        print(f"Processando arquivo: {file_info['file_name']}")
+
+        data = list(iter_trials(file_info['file_path'], fields=CAMPOS))
+        participant_info = self.extract_participant_info(data)
+        participant_info['source_file'] = file_info['file_name']
+
+        # Processa dados demográficos
+        demographic_data = self.extract_demographic_data(data, participant_info)
+
+        # Processa dados do IAT
+        iat_trials = self.extract_iat_data(data, participant_info)
+
+        # Índice por texto, compartilhado pelas tabelas de texto e de segmento
+        index = self.index_texts(data)
+        tables = {'iat': iat_trials, 'demographics': [demographic_data]}
+        if 'participant' in self.granularity:
+            tables['participant'] = [self.participant_row(index, participant_info, iat_trials)]
+        if 'text' in self.granularity:
+            tables['text'] = self.text_rows(index, participant_info)
+        if 'segment' in self.granularity:
+            tables['segment'] = self.segment_rows(index, participant_info)
+        return tables
+
+    def finish_file(self, tables: Dict[str, List[Dict]]):
+        """D-score (dos trials do IAT) e demográficos em cada linha; acrescenta as linhas a all_data"""
+        if not tables.get('demographics'):
+            return  # arquivo ilegível: nenhuma linha
+        demographic_data = tables['demographics'][0]
+        d_score = self.calculate_d_score(tables.get('iat', []))
+
+        # Adiciona dados demográficos e D-score a cada linha
+        extra = {campo: demographic_data[campo] for campo in DEMOGRAFICOS}
+        extra['d_score'] = d_score if d_score is not None else ''
+
+        # Combina os dados (filtra entradas vazias)
+        for granularity in self.granularity:
+            key = 'participant_id' if granularity == 'participant' else 'text_id'
+            valid_data = [{**entry, **extra} for entry in tables.get(granularity, []) if entry.get(key)]
+            self.all_data[granularity].extend(valid_data)
+            print(f"  {ROTULOS[granularity].capitalize()} processados: {len(valid_data)}")
+
+        print(f"  D-score: {d_score if d_score is not None else 'N/A'}")
+        print(f"  Idade: {demographic_data['idade']}")
+        print(f"  Gênero: {demographic_data['genero']}")
+        print(f"  Escolaridade: {demographic_data['escolaridade']}")
+        print(f"  Familiaridade IA: {demographic_data['familiaridade_ia']}")
+        print(f"  Frequência IA: {demographic_data['frequencia_ia']}")
+        print(f"  Confiança Identificação: {demographic_data['confianca_identificacao']}")
+
+    def process_file(self, file_info: Dict):
+        """Processa um arquivo individual (um único parse, com a projeção CAMPOS)"""
+        self.finish_file(self.extract_file(file_info))
+
+    def save_to_csv(self, granularity: str):
+        """Salva a tabela de uma granularidade em CSV com formato brasileiro"""
+        output_file = self.output_files[granularity]
+        if not self.all_data[granularity]:
+            print("Nenhum dado para salvar.")
+            return
+
+        df = pd.DataFrame(self.all_data[granularity])
+
+        # Remove linhas completamente vazias (problema das linhas em branco)
+        df = df.dropna(how='all')
+
+        # Remove linhas onde participant_id está vazio
+        df = df[df['participant_id'].notna() & (df['participant_id'] != '')]
+
+        # Cria o diretório de saída se não existir
+        output_dir = os.path.dirname(output_file)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+            print(f"✓ Diretório criado: {output_dir}")
+
+        # Configura formato brasileiro (; como separador, , como decimal)
+        df.to_csv(output_file, sep=';', decimal=',', index=False, encoding='utf-8')
+        print(f"\n✓ Dados salvos em: {output_file}")
+        print(f"✓ Total de registros: {len(df)}")
+        print(f"✓ Colunas: {list(df.columns)}")
+
+        # Mostra estatísticas básicas
+        print(f"\nEstatísticas:")
+        print(f"  Total de {ROTULOS[granularity]} processados: {len(df)}")
+        print(f"  Participantes únicos: {df['participant_id'].nunique()}")
+
+    def _extract_file_safe(self, file_info: Dict) -> Dict[str, List[Dict]]:
+        """extract_file; {} se o arquivo não puder ser lido"""
+        try:
+            return self.extract_file(file_info)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"✗ Erro ao carregar {file_info['file_path']}: {e}")
+            return {}
+
+    def extract_file_buffered(self, file_info: Dict):
+        """extract_file com o stdout acumulado em buffer; devolve (tabelas intermediárias, log)"""
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            tables = self._extract_file_safe(file_info)
+        return tables, log.getvalue()
+
+    def run(self):
+        """Executa o processamento completo"""
+        print(f"Processando arquivos em: {self.input_dir}")
+
+        files = self.load_json_files()
+        print(f"Encontrados {len(files)} arquivos")
+
+        if not files:
+            print("Nenhum arquivo encontrado para processar!")
+            return
+
+        # ordem determinística das linhas, independente do número de processos
+        files.sort(key=lambda f: f['file_name'])
+
+        # arquivos sem mudança desde a última execução vêm do cache (tabelas intermediárias:
+        # linhas, trials do IAT e demográficos); só os novos/alterados são lidos
+        cache = None
+        tables_by_file = {}
+        if self.cache_dir:
+            from cache_resultados import ResultCache
+            # o conjunto de granularidades faz parte da versão: o cache só tem as tabelas pedidas
+            cache = ResultCache(self.cache_dir, f"{CACHE_VERSION}:{'+'.join(self.granularity)}")
+            for file_info in files:
+                cached = cache.lookup(file_info['file_path'])
+                if cached is not None:
+                    tables_by_file[file_info['file_path']] = cached
+        cached_paths = set(tables_by_file)
+        pending = [f for f in files if f['file_path'] not in cached_paths]
+
+        logs = {}
+        if self.jobs > 1 and len(pending) > 1:
+            tasks = [(self.input_dir, self.output_files, self.granularity, file_info) for file_info in pending]
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                for file_info, (tables, log) in zip(pending, executor.map(_extract_file_worker, tasks)):
+                    tables_by_file[file_info['file_path']] = tables
+                    logs[file_info['file_path']] = log
+
+        # D-score e demográficos sempre a partir das tabelas intermediárias, na ordem dos arquivos;
+        # o log de cada arquivo lido sai inteiro (arquivos do cache não geram log)
+        for file_info in files:
+            path = file_info['file_path']
+            if path in cached_paths:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.finish_file(tables_by_file[path])
+                continue
+            if path in logs:
+                print(logs[path], end='')
+            else:
+                tables_by_file[path] = self._extract_file_safe(file_info)
+            self.finish_file(tables_by_file[path])
+
+        if cache is not None:
+            for file_info in pending:
+                cache.store(file_info['file_path'], tables_by_file[file_info['file_path']])
+            cache.prune([f['file_path'] for f in files])
+            cache.save()
+            print(f"[cache] {len(files) - len(pending)} arquivo(s) do cache, {len(pending)} lido(s) → {self.cache_dir}")
+
+        if self.zipf_dir and 'segment' in self.granularity:
+            self.add_segment_zipf()
+
+        for g in self.granularity:
+            self.save_to_csv(g)
+
+
+def _extract_file_worker(task):
+    """Executado em cada processo do pool: lê um arquivo isolado e devolve (tabelas intermediárias, log)"""
+    input_dir, output_files, granularity, file_info = task
+    return ExperimentDataProcessor(input_dir, output_files, granularity).extract_file_buffered(file_info)
+
+# Exemplo de uso
+if __name__ == "__main__":
+    # Configurações
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"  # Pasta com os arquivos JSON
+    output_files = {
+        'participant': "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/dados_participantes.csv",
+        'text': "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/dados_combinados.csv",
+        'segment': "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/dados_detalhados.csv",
+    }
+    granularity = ('participant', 'text', 'segment')  # qualquer subconjunto
+
+    jobs = os.cpu_count() or 1  # processos em paralelo (1 = sequencial)
+    cache_dir = None  # ex.: os.path.join(input_directory, ".cache_consolida_granular") para reprocessar só arquivos novos/alterados
+    zipf_dir = None  # ex.: os.path.join(input_directory, ".cache_zipf") para a covariável zipf_medio_segmento
+
+    # Executa o processamento
+    processor = ExperimentDataProcessor(input_directory, output_files, granularity, jobs=jobs, cache_dir=cache_dir,
+                                        zipf_dir=zipf_dir)
+    processor.run()
@@ -5,26 +5,48 @@ Compares Human vs AI (GLM) texts across 5 genres.
 Metrics:
   - TTR (Type-Token Ratio): unique_types / total_tokens
   - MSTTR (Mean Segmental TTR): average TTR over fixed-size windows (100 tokens)
-  - MTLD (Measure of Textual Lexical Diversity): robust lexical diversity
-  - Mean Zipf Frequency: average log-frequency of content words (wordfreq)
+  - MTLD (Measure of Textual Lexical Diversity): robust lexical diversity (also per direction)
+  - MATTR (Moving-Average TTR): mean TTR over a sliding window (50 tokens)
+  - HD-D: expected TTR contribution of each type in random 42-token samples (hypergeometric)
+  - Mean Zipf Frequency: average log-frequency of content words (wordfreq, via the
+    persisted lexicon of lexico_zipf: each distinct word of the corpus is looked up once)
   - Lexical Density: content words / total words
   - Referential Cohesion (Argument Overlap): noun/pronoun overlap between sentences
   - Stem Overlap: overlap of stemmed nouns between adjacent sentences
+  - LSA Cohesion: cosine between adjacent sentences, all sentence pairs and adjacent paragraphs
+    in a truncated-SVD space fitted once on the TF-IDF sentence × stem matrix of the whole corpus
 """
 
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import nltk
 from nltk.tokenize import word_tokenize, sent_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import RSLPStemmer
-from wordfreq import zipf_frequency
 from collections import Counter
+from functools import lru_cache
+
+from lexico_zipf import LexicoZipf, ZIPF_LANG, versao_wordfreq
+
+NLTK_PACKAGES = ["punkt", "punkt_tab", "stopwords", "rslp", "averaged_perceptron_tagger"]
+
+# Worker processes for analyze_text (1 = serial). Texts are spread over a process pool;
+# results keep the (source, category, text_id) order.
+JOBS = os.cpu_count() or 1
+
+# word -> Zipf lexicon persisted here, one file per wordfreq version and language (None = in memory)
+ZIPF_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_zipf")
 
-nltk.download('punkt', quiet=True)
-nltk.download('punkt_tab', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('rslp', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
+# Parquet snapshot of the workbook texts + per-text metrics keyed by text hash (None = no cache;
+# requires pyarrow when active). Bump METRICS_VERSION whenever a metric changes.
+CORPUS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_corpus")
+METRICS_VERSION = "corpus_metrics-6"
 
 EXCEL_PATH = (
     "/Users/vander/Meu Drive - Pessoal/Mestrado Comunicação Digital - IDP/"
@@ -57,8 +79,9 @@ GLM_TEXT_COLS = {
     "Poetry/short story/literature": 29,
 }
 
-PT_STOPWORDS = set(stopwords.words("portuguese"))
-STEMMER = RSLPStemmer()
+# Filled by init_resources(), once per process (main process and each pool worker)
+PT_STOPWORDS = set()
+STEMMER = None
 
 # POS tags considered "content words" in NLTK universal tagset approximation
 # We use a simple heuristic: non-stopword alphabetic tokens
@@ -66,34 +89,107 @@ CONTENT_POS = {"NN", "NNS", "NNP", "NNPS", "VB", "VBD", "VBG", "VBN", "VBP", "VB
                "JJ", "JJR", "JJS", "RB", "RBR", "RBS"}
 
 
+# ---------------------------------------------------------------------------
+# NLTK resources
+# ---------------------------------------------------------------------------
+
+def init_resources(download=True):
+    """
+    Loads the NLTK data, Portuguese stopwords and RSLP stemmer for this process.
+    Runs once per process: later calls return immediately. Pool workers pass
+    download=False, since the main process has already fetched the data.
+    """
+    global PT_STOPWORDS, STEMMER
+    if STEMMER is not None:
+        return
+    if download:
+        for package in NLTK_PACKAGES:
+            nltk.download(package, quiet=True)
+    PT_STOPWORDS = set(stopwords.words("portuguese"))
+    STEMMER = RSLPStemmer()
+
+
 # ---------------------------------------------------------------------------
 # Text loading
 # ---------------------------------------------------------------------------
 
-def load_texts():
-    """Returns dict: {source: {category: [text, ...]}}"""
-    df_human = pd.read_excel(EXCEL_PATH, sheet_name="Human", header=None)
-    df_glm = pd.read_excel(EXCEL_PATH, sheet_name="GLM", header=None)
+def _read_workbook(path):
+    """Long table (source, category, text) read from both sheets in a single pass over the workbook."""
+    sheets = pd.read_excel(path, sheet_name=["Human", "GLM"], header=None)
+    frames = []
+    for source, text_cols in (("Human", HUMAN_TEXT_COLS), ("GLM", GLM_TEXT_COLS)):
+        for cat, col in text_cols.items():
+            # Data rows start at index 2 (row 0 empty, row 1 headers)
+            values = sheets[source].iloc[2:, col]
+            values = values[values.notna()].astype(str).str.strip()
+            texts = values[values != ""].tolist()
+            frames.append(pd.DataFrame({"source": source, "category": cat, "text": pd.Series(texts, dtype=object)}))
+    return pd.concat(frames, ignore_index=True)
 
-    # Data rows start at index 2 (row 0 empty, row 1 headers)
-    data = {"Human": {}, "GLM": {}}
 
-    for cat, col in HUMAN_TEXT_COLS.items():
-        texts = []
-        for i in range(2, len(df_human)):
-            val = df_human.iloc[i, col]
-            if pd.notna(val) and str(val).strip():
-                texts.append(str(val).strip())
-        data["Human"][cat] = texts
-
-    for cat, col in GLM_TEXT_COLS.items():
-        texts = []
-        for i in range(2, len(df_glm)):
-            val = df_glm.iloc[i, col]
-            if pd.notna(val) and str(val).strip():
-                texts.append(str(val).strip())
-        data["GLM"][cat] = texts
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
+
+def _write_json(obj, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _corpus_snapshot(path, cache_dir):
+    """
+    Long table of texts from a Parquet snapshot of the workbook, rebuilt only when the workbook
+    changes: same size and mtime -> hit without opening it; same size, other mtime -> sha256 decides.
+    """
+    from cache_resultados import file_sha256, read_frame, write_frame
+
+    manifest_path = os.path.join(cache_dir, "corpus_snapshot.json")
+    snapshot_path = os.path.join(cache_dir, "corpus_snapshot.parquet")
+    layout = {"Human": HUMAN_TEXT_COLS, "GLM": GLM_TEXT_COLS}
+    st = os.stat(path)
+
+    manifest = _read_json(manifest_path)
+    if (manifest and manifest.get("workbook") == os.path.abspath(path) and manifest.get("layout") == layout
+            and manifest.get("size") == st.st_size and os.path.exists(snapshot_path)):
+        if manifest.get("mtime_ns") == st.st_mtime_ns:
+            return read_frame(snapshot_path)
+        if file_sha256(path) == manifest.get("sha256"):
+            manifest["mtime_ns"] = st.st_mtime_ns  # same content, only the mtime changed
+            _write_json(manifest, manifest_path)
+            return read_frame(snapshot_path)
+
+    print(f"  reading {os.path.basename(path)} (snapshot -> {cache_dir})")
+    texts = _read_workbook(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_frame(texts, snapshot_path)
+    _write_json({
+        "workbook": os.path.abspath(path),
+        "layout": layout,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(path),
+    }, manifest_path)
+    return texts
+
+
+def load_texts(path=EXCEL_PATH, cache_dir=None):
+    """
+    Returns dict: {source: {category: [text, ...]}}
+    With cache_dir, the texts come from a Parquet snapshot of the workbook (see _corpus_snapshot).
+    """
+    texts = _corpus_snapshot(path, cache_dir) if cache_dir else _read_workbook(path)
+    data = {"Human": {}, "GLM": {}}
+    for source, text_cols in (("Human", HUMAN_TEXT_COLS), ("GLM", GLM_TEXT_COLS)):
+        for cat in text_cols:
+            data[source][cat] = []
+    for source, cat, text in zip(texts["source"], texts["category"], texts["text"]):
+        data[source][cat].append(text)
     return data
 
 
@@ -101,6 +197,15 @@ def load_texts():
 # Tokenization helpers
 # ---------------------------------------------------------------------------
 
+PT_PRONOUNS = {
+    "eu", "tu", "ele", "ela", "nós", "vós", "eles", "elas",
+    "me", "te", "se", "nos", "vos", "lhe", "lhes",
+    "meu", "minha", "teu", "tua", "seu", "sua", "nosso", "nossa",
+    "isso", "isto", "aquilo", "esse", "esta", "este", "essa",
+    "que", "quem", "qual", "cujo", "onde",
+}
+
+
 def tokenize_words(text):
     """All alphabetic lowercase tokens."""
     tokens = word_tokenize(text.lower(), language="portuguese")
@@ -112,173 +217,292 @@ def content_words(tokens):
     return [t for t in tokens if t not in PT_STOPWORDS and len(t) > 1]
 
 
+@lru_cache(maxsize=None)
+def stem(word):
+    """RSLP stem, memoized for the whole process (the same words repeat across sentences and texts)."""
+    return STEMMER.stem(word)
+
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*")
+
+
+def _content_stems(tokens):
+    """Stems of the content words of `tokens`, in order and with repetitions."""
+    return [stem(t) for t in tokens if t not in PT_STOPWORDS and len(t) > 1]
+
+
+class AnnotatedDoc:
+    """
+    A text tokenized once, with the annotations every metric reads:
+      tokens            -- alphabetic lowercase tokens of the whole text (tokenize_words)
+      is_stopword       -- per token: in PT_STOPWORDS
+      is_pronoun        -- per token: in PT_PRONOUNS
+      stems             -- per token: RSLP stem of content words (None for the others)
+      content_words     -- non-stopword tokens longer than one letter
+      sentences         -- alphabetic lowercase tokens of each sentence (sent_tokenize of the whole text)
+      argument_sets     -- per sentence: pronouns + stems of non-stopword nouns (len > 3)
+      content_stem_sets -- per sentence: stems of all content words
+    and, for the LSA cohesion only, the sentences of each paragraph (the text split on line
+    breaks, then sent_tokenize of each paragraph, so no LSA sentence spans two paragraphs):
+      sentence_stems    -- per LSA sentence: stems of the content words, with repetitions
+      sentence_paragraphs -- per LSA sentence: index of its paragraph
+    The text-level annotations come from the whole-text tokenization, as before; the sentence
+    split is only used for the sentence-level ones.
+    """
+
+    def __init__(self, text):
+        init_resources()
+        self.tokens = tokenize_words(text)
+        self.is_stopword = [t in PT_STOPWORDS for t in self.tokens]
+        self.is_pronoun = [t in PT_PRONOUNS for t in self.tokens]
+        self.stems = [stem(t) if not sw and len(t) > 1 else None
+                      for t, sw in zip(self.tokens, self.is_stopword)]
+        self.content_words = [t for t, st in zip(self.tokens, self.stems) if st is not None]
+
+        self.sentences = [tokenize_words(s) for s in sent_tokenize(text, language="portuguese")]
+        self.argument_sets = []
+        self.content_stem_sets = []
+        for sent in self.sentences:
+            arguments = set()
+            for t in sent:
+                if t in PT_PRONOUNS:
+                    arguments.add(t)
+                elif t not in PT_STOPWORDS and len(t) > 3:
+                    arguments.add(stem(t))
+            self.argument_sets.append(arguments)
+            self.content_stem_sets.append(set(_content_stems(sent)))
+
+        self.sentence_stems, self.sentence_paragraphs = [], []
+        paragraphs = [p for p in PARAGRAPH_BREAK.split(text) if p.strip()]
+        for paragraph, chunk in enumerate(paragraphs):
+            for raw in sent_tokenize(chunk, language="portuguese"):
+                self.sentence_stems.append(_content_stems(tokenize_words(raw)))
+                self.sentence_paragraphs.append(paragraph)
+
+
 # ---------------------------------------------------------------------------
-# TTR metrics
+# Lexical diversity
 # ---------------------------------------------------------------------------
 
+MSTTR_SEGMENT = 100
+MTLD_THRESHOLD = 0.720
+MATTR_WINDOW = 50
+HDD_SAMPLE = 42
+
+
+def lexical_diversity(tokens, segment_size=MSTTR_SEGMENT, threshold=MTLD_THRESHOLD,
+                      window=MATTR_WINDOW, sample=HDD_SAMPLE):
+    """
+    TTR, MSTTR, MTLD (forward, backward and their mean), MATTR, HD-D and hapax ratio
+    in one pass over the tokens, with incremental type counts and no list copies:
+      - whole text: frequency of each type (TTR, hapax ratio, HD-D spectrum)
+      - MSTTR: types of the current segment, via the segment where each type was last seen
+      - MTLD: the forward and the backward factors advance together (token i and n-1-i),
+        each with the factor where each type was last seen
+      - MATTR (Covington & McFall, 2010): sliding-window counter of `window` tokens
+      - HD-D (McCarthy & Jarvis, 2010): sum over types of P(type in a random sample of
+        `sample` tokens) / sample, from the hypergeometric distribution
+    """
+    n = len(tokens)
+    nan = float("nan")
+    if n == 0:
+        return {"n_types": 0, "ttr": nan, "msttr": nan, "mtld": nan, "mtld_fwd": nan,
+                "mtld_bwd": nan, "mattr": nan, "hdd": nan, "hapax_ratio": nan}
+
+    freq = {}
+    hapaxes = 0
+    seg_seen, seg_id, seg_types, seg_ttr_sum, n_segments = {}, 0, 0, 0.0, 0
+    fwd_seen, fwd_id, fwd_types, fwd_start, fwd_factors = {}, 0, 0, 0, 0
+    bwd_seen, bwd_id, bwd_types, bwd_start, bwd_factors = {}, 0, 0, 0, 0
+    win, win_types, win_ttr_sum = {}, 0, 0.0
+
+    for i, token in enumerate(tokens):
+        # whole text
+        f = freq.get(token, 0) + 1
+        freq[token] = f
+        hapaxes += 1 if f == 1 else (-1 if f == 2 else 0)
+
+        # MSTTR: non-overlapping segments
+        if seg_seen.get(token) != seg_id:
+            seg_seen[token] = seg_id
+            seg_types += 1
+        if (i + 1) % segment_size == 0:
+            seg_ttr_sum += seg_types / segment_size
+            n_segments += 1
+            seg_id += 1
+            seg_types = 0
+
+        # MTLD forward
+        if fwd_seen.get(token) != fwd_id:
+            fwd_seen[token] = fwd_id
+            fwd_types += 1
+        if fwd_types / (i - fwd_start + 1) <= threshold:
+            fwd_factors += 1
+            fwd_id += 1
+            fwd_types = 0
+            fwd_start = i + 1
+
+        # MTLD backward (token n-1-i)
+        back = tokens[n - 1 - i]
+        if bwd_seen.get(back) != bwd_id:
+            bwd_seen[back] = bwd_id
+            bwd_types += 1
+        if bwd_types / (i - bwd_start + 1) <= threshold:
+            bwd_factors += 1
+            bwd_id += 1
+            bwd_types = 0
+            bwd_start = i + 1
+
+        # MATTR: the token entering the window, then the one leaving it
+        c = win.get(token, 0)
+        win[token] = c + 1
+        win_types += c == 0
+        if i >= window:
+            old = tokens[i - window]
+            c = win[old] - 1
+            win[old] = c
+            win_types -= c == 0
+        if i >= window - 1:
+            win_ttr_sum += win_types / window
+
+    n_types = len(freq)
+    ttr_value = n_types / n
+
+    def _factors(count, remaining, types):
+        # partial factor of the tokens after the last full one
+        if remaining > 0:
+            partial_ttr = types / remaining
+            if partial_ttr > threshold:
+                count += (1 - partial_ttr) / (1 - threshold)
+        return count
+
+    fwd = _factors(fwd_factors, n - fwd_start, fwd_types)
+    bwd = _factors(bwd_factors, n - bwd_start, bwd_types)
+    if n < 10 or (fwd == 0 and bwd == 0):
+        mtld_value = nan
+    elif fwd == 0:
+        mtld_value = n / bwd
+    elif bwd == 0:
+        mtld_value = n / fwd
+    else:
+        mtld_value = (n / fwd + n / bwd) / 2
+
+    # HD-D: types with the same frequency share the same probability
+    if n >= sample:
+        spectrum = Counter(freq.values())
+        hdd_value = 0.0
+        for f, n_f in spectrum.items():
+            p_absent = 1.0
+            for k in range(sample):  # C(n - f, sample) / C(n, sample)
+                if n - f - k <= 0:
+                    p_absent = 0.0
+                    break
+                p_absent *= (n - f - k) / (n - k)
+            hdd_value += n_f * (1 - p_absent) / sample
+    else:
+        hdd_value = nan
+
+    return {
+        "n_types": n_types,
+        "ttr": ttr_value,
+        "msttr": seg_ttr_sum / n_segments if n >= segment_size else ttr_value,
+        "mtld": mtld_value,
+        "mtld_fwd": n / fwd if n >= 10 and fwd else nan,
+        "mtld_bwd": n / bwd if n >= 10 and bwd else nan,
+        "mattr": win_ttr_sum / (n - window + 1) if n >= window else ttr_value,
+        "hdd": hdd_value,
+        "hapax_ratio": hapaxes / n_types,
+    }
+
+
 def ttr(tokens):
-    if not tokens:
-        return float("nan")
-    return len(set(tokens)) / len(tokens)
+    return lexical_diversity(tokens)["ttr"]
 
 
-def msttr(tokens, segment_size=100):
+def msttr(tokens, segment_size=MSTTR_SEGMENT):
     """Mean Segmental TTR over non-overlapping windows."""
-    if len(tokens) < segment_size:
-        return ttr(tokens)
-    segments = [tokens[i:i + segment_size] for i in range(0, len(tokens) - segment_size + 1, segment_size)]
-    return sum(ttr(seg) for seg in segments) / len(segments)
+    return lexical_diversity(tokens, segment_size=segment_size)["msttr"]
 
 
-def mtld(tokens, threshold=0.720):
+def mtld(tokens, threshold=MTLD_THRESHOLD):
     """
     Measure of Textual Lexical Diversity (McCarthy & Jarvis, 2010).
     Average factor length where TTR drops to threshold.
     """
-    def _factor_count(toks):
-        if not toks:
-            return 0
-        types = set()
-        factor_count = 0
-        start = 0
-        for i, token in enumerate(toks):
-            types.add(token)
-            current_ttr = len(types) / (i - start + 1)
-            if current_ttr <= threshold:
-                factor_count += 1
-                types = set()
-                start = i + 1
-        # Partial factor
-        remaining = len(toks) - start
-        if remaining > 0:
-            partial_ttr = len(types) / remaining
-            if partial_ttr > threshold:
-                factor_count += (1 - partial_ttr) / (1 - threshold)
-        return factor_count
-
-    if len(tokens) < 10:
-        return float("nan")
-
-    fwd = _factor_count(tokens)
-    bwd = _factor_count(tokens[::-1])
-
-    if fwd == 0 and bwd == 0:
-        return float("nan")
-    if fwd == 0:
-        return len(tokens) / bwd
-    if bwd == 0:
-        return len(tokens) / fwd
-    return (len(tokens) / fwd + len(tokens) / bwd) / 2
+    return lexical_diversity(tokens, threshold=threshold)["mtld"]
 
 
 # ---------------------------------------------------------------------------
 # Lexical frequency
 # ---------------------------------------------------------------------------
 
-def mean_zipf(tokens, lang="pt"):
+def mean_zipf(content_words, lexicon):
     """
-    Mean Zipf frequency of content words using wordfreq.
+    Mean Zipf frequency of content words using wordfreq (looked up in a LexicoZipf).
     Zipf scale: ~7 = very common, ~1 = very rare.
     Higher = more common/frequent vocabulary.
     """
-    content = content_words(tokens)
-    if not content:
-        return float("nan")
-    freqs = [zipf_frequency(t, lang) for t in content]
-    return sum(freqs) / len(freqs)
+    return lexicon.media(content_words)
 
 
-def lexical_density(tokens):
+def lexical_density(doc):
     """Content words / total tokens."""
-    if not tokens:
+    if not doc.tokens:
         return float("nan")
-    return len(content_words(tokens)) / len(tokens)
+    return len(doc.content_words) / len(doc.tokens)
 
 
 def hapax_ratio(tokens):
     """Proportion of words that appear only once (hapax legomena)."""
-    if not tokens:
-        return float("nan")
-    freq = Counter(tokens)
-    hapaxes = sum(1 for v in freq.values() if v == 1)
-    return hapaxes / len(set(tokens))
+    return lexical_diversity(tokens)["hapax_ratio"]
 
 
 # ---------------------------------------------------------------------------
 # Referential cohesion
 # ---------------------------------------------------------------------------
 
-def get_nouns_and_pronouns(tokens):
-    """
-    Returns set of stems of nouns and pronouns.
-    Uses RSLP stemmer + simple pronoun list as proxy for Portuguese POS.
-    """
-    PT_PRONOUNS = {
-        "eu", "tu", "ele", "ela", "nós", "vós", "eles", "elas",
-        "me", "te", "se", "nos", "vos", "lhe", "lhes",
-        "meu", "minha", "teu", "tua", "seu", "sua", "nosso", "nossa",
-        "isso", "isto", "aquilo", "esse", "esta", "este", "essa",
-        "que", "quem", "qual", "cujo", "onde",
-    }
-    stems = set()
-    for t in tokens:
-        if t in PT_PRONOUNS:
-            stems.add(t)
-        elif t not in PT_STOPWORDS and len(t) > 3:
-            stems.add(STEMMER.stem(t))
-    return stems
+def _adjacent_overlap(sets):
+    """Mean |A ∩ B| / max(|A|, |B|) over adjacent sentence pairs (pairs of empty sets are skipped)."""
+    if len(sets) < 2:
+        return float("nan")
+    scores = []
+    for a, b in zip(sets, sets[1:]):
+        denom = max(len(a), len(b))
+        if denom == 0:
+            continue
+        scores.append(len(a & b) / denom)
+    return sum(scores) / len(scores) if scores else float("nan")
 
 
-def argument_overlap(sent_tokens_list):
+def argument_overlap(doc):
     """
     Local argument overlap: mean proportion of adjacent sentence pairs
     that share at least one noun/pronoun stem.
     Formula: for each pair (i, i+1), |A ∩ B| / max(|A|, |B|)
     Returns mean over all pairs.
+    Nouns/pronouns: RSLP stems + simple pronoun list as proxy for Portuguese POS
+    (AnnotatedDoc.argument_sets).
     """
-    if len(sent_tokens_list) < 2:
-        return float("nan")
-    scores = []
-    for i in range(len(sent_tokens_list) - 1):
-        a = get_nouns_and_pronouns(sent_tokens_list[i])
-        b = get_nouns_and_pronouns(sent_tokens_list[i + 1])
-        denom = max(len(a), len(b))
-        if denom == 0:
-            continue
-        scores.append(len(a & b) / denom)
-    return sum(scores) / len(scores) if scores else float("nan")
+    return _adjacent_overlap(doc.argument_sets)
 
 
-def stem_overlap(sent_tokens_list):
+def stem_overlap(doc):
     """
     Stem overlap between adjacent sentences using ALL content words (stemmed).
     """
-    if len(sent_tokens_list) < 2:
-        return float("nan")
-    scores = []
-    for i in range(len(sent_tokens_list) - 1):
-        a = {STEMMER.stem(t) for t in content_words(sent_tokens_list[i])}
-        b = {STEMMER.stem(t) for t in content_words(sent_tokens_list[i + 1])}
-        denom = max(len(a), len(b))
-        if denom == 0:
-            continue
-        scores.append(len(a & b) / denom)
-    return sum(scores) / len(scores) if scores else float("nan")
+    return _adjacent_overlap(doc.content_stem_sets)
 
 
-def global_noun_overlap(sent_tokens_list):
+def global_noun_overlap(doc):
     """
     Global argument overlap: each sentence vs. all previous sentences combined.
     """
-    if len(sent_tokens_list) < 2:
+    sets = doc.argument_sets
+    if len(sets) < 2:
         return float("nan")
     scores = []
-    cumulative = set()
-    for i, tokens in enumerate(sent_tokens_list):
-        if i == 0:
-            cumulative = get_nouns_and_pronouns(tokens)
-            continue
-        current = get_nouns_and_pronouns(tokens)
+    cumulative = set(sets[0])
+    for current in sets[1:]:
         denom = max(len(current), len(cumulative))
         if denom > 0:
             scores.append(len(current & cumulative) / denom)
@@ -286,51 +510,285 @@ def global_noun_overlap(sent_tokens_list):
     return sum(scores) / len(scores) if scores else float("nan")
 
 
+# ---------------------------------------------------------------------------
+# Semantic cohesion (LSA)
+# ---------------------------------------------------------------------------
+
+LSA_DIMS = 100
+LSA_METRICS = ["lsa_adjacent", "lsa_all_sentences", "lsa_paragraph"]
+
+
+def lsa_units(doc):
+    """What the LSA space needs from a text: (paragraph of each sentence, content stems of each sentence)."""
+    return doc.sentence_paragraphs, doc.sentence_stems
+
+
+def _unit_rows(matrix):
+    """Rows scaled to unit length, plus the mask of the non-zero ones (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = norms > 1e-12
+    return matrix / np.where(valid, norms, 1.0)[:, None], valid
+
+
+def _indicator(groups, n_groups):
+    """Sparse (n_groups × len(groups)) matrix with a 1 at (group, row) of each row."""
+    from scipy import sparse
+
+    n = len(groups)
+    return sparse.csr_matrix((np.ones(n), (groups, np.arange(n))), shape=(n_groups, n))
+
+
+def _adjacent_cosines(vectors, groups, n_groups):
+    """
+    Mean cosine of consecutive rows of the same group; NaN without pairs. Rows without terms are
+    dropped before pairing, so the rows on either side of one count as adjacent.
+    """
+    unit, valid = _unit_rows(vectors)
+    unit, groups = unit[valid], groups[valid]
+    pair = groups[:-1] == groups[1:]
+    cosines = np.clip(np.einsum("ij,ij->i", unit[:-1][pair], unit[1:][pair]), -1.0, 1.0)
+    n = np.bincount(groups[:-1][pair], minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.bincount(groups[:-1][pair], weights=cosines, minlength=n_groups) / n
+
+
+def lsa_cohesion(units, dims=LSA_DIMS):
+    """
+    Coh-Metrix-style LSA cohesion for every text (`units`: lsa_units of each text).
+    One TF-IDF sentence × stem sparse matrix over the whole corpus, one truncated SVD
+    (scipy svds, `dims` dimensions) and then, per text, with sparse products:
+      lsa_adjacent       mean cosine between adjacent sentences
+      lsa_all_sentences  mean cosine over all pairs of sentences: from ||sum of unit vectors||^2
+      lsa_paragraph      mean cosine between adjacent paragraphs (sum of the TF-IDF rows of their sentences)
+    Sentences (and paragraphs) without content words are left out, and the ones on either side
+    of them are paired as adjacent; NaN when a text has no pair.
+    Returns one dict per text, in the order of `units`.
+    """
+    from scipy import sparse
+    from scipy.sparse.linalg import svds
+
+    n_texts = len(units)
+    vocabulary = {}
+    rows, cols, text_of, paragraph_of = [], [], [], []
+    for t, (paragraphs, sentences) in enumerate(units):
+        for paragraph, stems in zip(paragraphs, sentences):
+            row = len(text_of)
+            rows.extend([row] * len(stems))
+            cols.extend(vocabulary.setdefault(st, len(vocabulary)) for st in stems)
+            text_of.append(t)
+            paragraph_of.append(paragraph)
+    text_of = np.asarray(text_of, dtype=np.int64)
+    n_sentences, n_terms = len(text_of), len(vocabulary)
+
+    nan = np.full(n_texts, np.nan)
+    dims = min(dims, min(n_sentences, n_terms) - 1)
+    if dims < 1:
+        return [dict.fromkeys(LSA_METRICS, float("nan")) for _ in range(n_texts)]
+
+    # TF-IDF (smoothed idf); repeated (row, term) entries are summed into the counts
+    counts = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_sentences, n_terms))
+    df = np.bincount(counts.indices, minlength=n_terms)
+    idf = np.log((1 + n_sentences) / (1 + df)) + 1
+    tfidf = counts @ sparse.diags(idf)
+
+    # term -> LSA space; a fixed starting vector keeps ARPACK deterministic
+    _, _, vt = svds(tfidf, k=dims, v0=np.ones(min(n_sentences, n_terms)))
+    space = vt.T
+    sentences = tfidf @ space
+
+    adjacent = _adjacent_cosines(sentences, text_of, n_texts)
+
+    # all pairs: sum of cosines = (||sum of unit vectors||^2 - m) / 2, with m valid sentences
+    unit, valid = _unit_rows(sentences)
+    per_text = _indicator(text_of, n_texts)
+    sums = per_text @ unit
+    m = per_text @ valid.astype(np.float64)
+    n_pairs = m * (m - 1) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        all_sentences = np.where(n_pairs > 0, ((sums ** 2).sum(axis=1) - m) / 2 / n_pairs, nan)
+    all_sentences = np.clip(all_sentences, -1.0, 1.0)  # rounding of the identity can leave 1 + ulp
+
+    # paragraphs in (text, paragraph) order; a paragraph is the sum of its sentences
+    stride = max(paragraph_of) + 1
+    keys = text_of * stride + np.asarray(paragraph_of, dtype=np.int64)
+    unique_keys, paragraph_id = np.unique(keys, return_inverse=True)
+    paragraph_text = unique_keys // stride
+    paragraphs = (_indicator(paragraph_id, len(unique_keys)) @ tfidf) @ space
+    paragraph = _adjacent_cosines(paragraphs, paragraph_text, n_texts)
+
+    return [
+        {"lsa_adjacent": float(a), "lsa_all_sentences": float(s), "lsa_paragraph": float(p)}
+        for a, s, p in zip(adjacent, all_sentences, paragraph)
+    ]
+
+
 # ---------------------------------------------------------------------------
 # Per-text analysis
 # ---------------------------------------------------------------------------
 
-def analyze_text(text):
-    tokens = tokenize_words(text)
-    sentences = sent_tokenize(text, language="portuguese")
-    sent_tokens = [tokenize_words(s) for s in sentences]
+def _analyze_doc(doc):
+    """
+    All metrics but mean_zipf and the LSA cohesion, which are filled in once the corpus
+    vocabulary is resolved and the LSA space is fitted.
+    """
+    tokens = doc.tokens
+    diversity = lexical_diversity(tokens)
 
     return {
         "n_tokens": len(tokens),
-        "n_types": len(set(tokens)),
-        "n_sentences": len(sentences),
-        "ttr": ttr(tokens),
-        "msttr_100": msttr(tokens, 100),
-        "mtld": mtld(tokens),
-        "mean_zipf": mean_zipf(tokens),
-        "lexical_density": lexical_density(tokens),
-        "hapax_ratio": hapax_ratio(tokens),
-        "arg_overlap_local": argument_overlap(sent_tokens),
-        "stem_overlap_local": stem_overlap(sent_tokens),
-        "arg_overlap_global": global_noun_overlap(sent_tokens),
+        "n_types": diversity["n_types"],
+        "n_sentences": len(doc.sentences),
+        "ttr": diversity["ttr"],
+        "msttr_100": diversity["msttr"],
+        "mtld": diversity["mtld"],
+        "mtld_fwd": diversity["mtld_fwd"],
+        "mtld_bwd": diversity["mtld_bwd"],
+        "mattr_50": diversity["mattr"],
+        "hdd": diversity["hdd"],
+        "mean_zipf": float("nan"),
+        "lexical_density": lexical_density(doc),
+        "hapax_ratio": diversity["hapax_ratio"],
+        "arg_overlap_local": argument_overlap(doc),
+        "stem_overlap_local": stem_overlap(doc),
+        "arg_overlap_global": global_noun_overlap(doc),
+        **dict.fromkeys(LSA_METRICS, float("nan")),
     }
 
 
-# ---------------------------------------------------------------------------
-# Main
-# ---------------------------------------------------------------------------
+def analyze_text(text, lexicon=None):
+    """
+    Metrics of one text; Zipf frequencies come from `lexicon` (an in-memory LexicoZipf if None)
+    and the LSA space is fitted on the text alone (analyze_corpus fits it on the whole corpus).
+    """
+    doc = AnnotatedDoc(text)
+    rec = _analyze_doc(doc)
+    rec["mean_zipf"] = mean_zipf(doc.content_words, lexicon if lexicon is not None else LexicoZipf())
+    rec.update(lsa_cohesion([lsa_units(doc)])[0])
+    return rec
+
+
+def _analyze_task(text):
+    doc = AnnotatedDoc(text)
+    rec = _analyze_doc(doc)
+    # kept with the cached metrics: the LSA space is refitted on every run, without re-tokenizing
+    rec["_lsa_units"] = json.dumps(lsa_units(doc), ensure_ascii=False)
+    return rec, doc.content_words
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _metric_cache_path(cache_dir):
+    # mean_zipf depends on the wordfreq data: its version is part of the key too
+    return os.path.join(cache_dir, f"metrics_{METRICS_VERSION}_wordfreq-{versao_wordfreq()}.parquet")
 
-def main():
-    print("Loading corpus...")
-    data = load_texts()
 
-    all_records = []
+def _load_metric_cache(cache_dir):
+    """{text hash: metrics} of the previous runs with the same metric set; {} if there are none."""
+    import pyarrow as pa
+    from cache_resultados import read_frame
+
+    path = _metric_cache_path(cache_dir)
+    if not os.path.exists(path):
+        return {}
+    try:
+        df = read_frame(path)
+    except (OSError, ValueError, pa.ArrowException) as e:  # corrupted/incomplete cache: recompute everything
+        print(f"  [cache] discarding {os.path.basename(path)}: {e}")
+        return {}
+    hashes = df.pop("text_hash").tolist()
+    return dict(zip(hashes, df.to_dict("records")))
+
+
+def _save_metric_cache(cache_dir, metrics):
+    from cache_resultados import write_frame
+
+    os.makedirs(cache_dir, exist_ok=True)
+    df = pd.DataFrame(list(metrics.values()))
+    df.insert(0, "text_hash", list(metrics))
+    path = _metric_cache_path(cache_dir)
+    write_frame(df, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def analyze_corpus(data, jobs=1, lexicon=None, cache_dir=None):
+    """
+    Runs analyze_text over every Human and GLM text of all CATEGORIES.
+    With jobs > 1 the texts are spread over a process pool (NLTK resources are
+    initialized once per worker); records come back in (source, category, text_id) order.
+    The content words of all analyzed texts are resolved in one batch in `lexicon`
+    (an in-memory LexicoZipf if None) before mean_zipf is computed, and the LSA cohesion
+    of all texts comes from one space fitted on the whole corpus (lsa_cohesion).
+    With cache_dir, metrics are kept per text hash (and METRICS_VERSION): only new or
+    edited texts are analyzed again.
+    """
+    tasks = []
     for source in ["Human", "GLM"]:
         for cat in CATEGORIES:
             texts = data[source][cat]
             print(f"  {source} | {cat}: {len(texts)} texts")
-            for i, text in enumerate(texts):
-                rec = analyze_text(text)
-                rec["source"] = source
-                rec["category"] = cat
-                rec["text_id"] = i + 1
-                rec["text_preview"] = text[:60]
-                all_records.append(rec)
+            tasks.extend((source, cat, i + 1, text) for i, text in enumerate(texts))
+
+    hashes = [text_hash(text) for _, _, _, text in tasks]
+    cached = _load_metric_cache(cache_dir) if cache_dir else {}
+    metrics = {h: cached[h] for h in hashes if h in cached}
+    # texts still to analyze (repeated texts only once)
+    pending = {}
+    for h, (_, _, _, text) in zip(hashes, tasks):
+        if h not in metrics:
+            pending.setdefault(h, text)
+
+    if pending:
+        init_resources()
+    texts = list(pending.values())
+    if jobs <= 1 or len(texts) < 2:
+        results = [_analyze_task(text) for text in texts]
+    else:
+        # a few chunks per worker: amortizes the pickling without unbalancing the pool
+        chunksize = max(1, len(texts) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_resources, initargs=(False,)) as executor:
+            results = list(executor.map(_analyze_task, texts, chunksize=chunksize))
+
+    if lexicon is None:
+        lexicon = LexicoZipf()
+    lexicon.resolve(w for _, content in results for w in content)
+    for h, (rec, content) in zip(pending, results):
+        rec["mean_zipf"] = mean_zipf(content, lexicon)
+        metrics[h] = rec
+
+    if cache_dir:
+        hits = sum(h in cached for h in hashes)
+        print(f"  [cache] {hits} text(s) from cache, {len(pending)} analyzed -> {cache_dir}")
+        if pending or len(metrics) != len(cached):
+            _save_metric_cache(cache_dir, metrics)  # only the texts of the current corpus
+
+    cohesion = lsa_cohesion([json.loads(metrics[h]["_lsa_units"]) for h in hashes])
+
+    records = []
+    for h, (source, cat, text_id, text), lsa in zip(hashes, tasks, cohesion):
+        rec = dict(metrics[h])
+        del rec["_lsa_units"]
+        rec.update(lsa)
+        rec["source"] = source
+        rec["category"] = cat
+        rec["text_id"] = text_id
+        rec["text_preview"] = text[:60]
+        records.append(rec)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main(jobs=JOBS):
+    print("Loading corpus...")
+    data = load_texts(cache_dir=CORPUS_CACHE_DIR)
+
+    lexicon = LexicoZipf(ZIPF_CACHE_DIR, ZIPF_LANG)
+    all_records = analyze_corpus(data, jobs=jobs, lexicon=lexicon, cache_dir=CORPUS_CACHE_DIR)
+    lexicon.salva()
 
     df = pd.DataFrame(all_records)
 
@@ -338,9 +796,10 @@ def main():
     cols = [
         "source", "category", "text_id",
         "n_tokens", "n_types", "n_sentences",
-        "ttr", "msttr_100", "mtld",
+        "ttr", "msttr_100", "mtld", "mtld_fwd", "mtld_bwd", "mattr_50", "hdd",
         "mean_zipf", "lexical_density", "hapax_ratio",
         "arg_overlap_local", "stem_overlap_local", "arg_overlap_global",
+        "lsa_adjacent", "lsa_all_sentences", "lsa_paragraph",
         "text_preview",
     ]
     df = df[cols]
@@ -348,9 +807,10 @@ def main():
     # --- Summary by source × category ---
     numeric_cols = [
         "n_tokens", "n_types", "n_sentences",
-        "ttr", "msttr_100", "mtld",
+        "ttr", "msttr_100", "mtld", "mtld_fwd", "mtld_bwd", "mattr_50", "hdd",
         "mean_zipf", "lexical_density", "hapax_ratio",
         "arg_overlap_local", "stem_overlap_local", "arg_overlap_global",
+        "lsa_adjacent", "lsa_all_sentences", "lsa_paragraph",
     ]
     summary = df.groupby(["category", "source"])[numeric_cols].agg(["mean", "std"]).round(4)
 
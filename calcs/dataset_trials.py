@@ -0,0 +1,348 @@
+"""
+Base colunar (Parquet) dos trials, montada a partir dos JSON brutos dos participantes.
+
+Layout do diretório da base:
+  <dataset_dir>/task=<particao>/trials.parquet  -> uma linha por trial, esquema tipado por partição
+  <dataset_dir>/task=<particao>/gaze.parquet    -> tabela filha com as amostras de olhar
+                                                   (eye_tracking: webgazer_data;
+                                                    eye_tracking_validation: raw_gaze)
+
+Partições: self_paced_reading, eye_tracking, eye_tracking_validation, iat (trial_type iat-html),
+text_evaluation (avaliação, autoria e confiança) e demographics (questionários, em formato longo).
+Trials de outras telas (instruções, consentimento...) não entram na base.
+
+A ligação trial ↔ amostras é (participant_id, trial_index). Cada arquivo de participante
+vira um row group, então a ingestão lê um arquivo por vez em streaming e a memória fica
+limitada a um participante. As análises leem só a partição e as colunas de que precisam
+(`read_task` / `read_gaze`), sem tocar nas listas de gaze nem nos textos.
+"""
+
+import glob
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from amostras_gaze import raw_gaze_array, webgazer_array
+from leitor_trials import iter_trials
+
+TRIALS_FILE = "trials.parquet"
+GAZE_FILE = "gaze.parquet"
+
+# task do jsPsych -> partição da base
+PARTICOES = {
+    "self_paced_reading": "self_paced_reading",
+    "eye_tracking": "eye_tracking",
+    "eye_tracking_validation": "eye_tracking_validation",
+    "text_evaluation": "text_evaluation",
+    "authorship_identification": "text_evaluation",
+    "confidence_rating": "text_evaluation",
+    "demographic_questionnaire_age": "demographics",
+    "demographic_questionnaire_gender_education": "demographics",
+    "ai_familiarity_questionnaire": "demographics",
+    "need_for_cognition_questionnaire": "demographics",
+}
+PARTICAO_IAT = "iat"
+
+
+# ---------- conversões tipadas (valor ausente/inválido -> None) ----------
+
+def _str(v):
+    if v is None:
+        return None
+    return v if isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+
+
+def _int(v):
+    if isinstance(v, bool) or v is None:
+        return None
+    try:
+        return int(round(float(v)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _float(v):
+    if isinstance(v, bool) or v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bool(v):
+    return v if isinstance(v, bool) else None
+
+
+def _float_list(v):
+    if not isinstance(v, list):
+        return None
+    return [_float(x) for x in v]
+
+
+def _field(name, conv):
+    return lambda trial: conv(trial.get(name))
+
+
+# ---------- esquemas: (coluna, tipo arrow, extrator do trial) ----------
+
+_COMUNS = [
+    ("participant_id", pa.string(), None),   # preenchido na ingestão (fallback: nome do arquivo)
+    ("trial_index", pa.int64(), None),       # idem (fallback: posição no arquivo)
+    ("task", pa.string(), _field("task", _str)),
+    ("trial_type", pa.string(), _field("trial_type", _str)),
+    ("rt", pa.float64(), _field("rt", _float)),  # tempos em ms: float, sem arredondar frações
+]
+_TEXTO = [
+    ("text_id", pa.string(), _field("text_id", _str)),
+    ("text_authorship", pa.string(), _field("text_authorship", _str)),
+]
+
+ESQUEMAS = {
+    "self_paced_reading": _COMUNS + _TEXTO + [
+        ("segment_index", pa.int32(), _field("segment_index", _int)),
+        ("segment_content", pa.string(), _field("segment_content", _str)),
+        ("reading_time", pa.float64(), _field("reading_time", _float)),
+        ("reading_time_per_word", pa.float64(), _field("reading_time_per_word", _float)),
+    ],
+    "eye_tracking": _COMUNS + _TEXTO + [
+        ("text_content", pa.string(), _field("text_content", _str)),
+        ("total_samples", pa.int32(), _field("total_samples", _int)),
+        ("total_reading_time", pa.float64(), _field("total_reading_time", _float)),
+        ("reading_time_per_word", pa.float64(), _field("reading_time_per_word", _float)),
+        ("number_of_fixations", pa.int32(), _field("number_of_fixations", _int)),
+        ("number_of_regressions", pa.int32(), _field("number_of_regressions", _int)),
+        ("fixation_time_by_region", pa.list_(pa.float64()), _field("fixation_time_by_region", _float_list)),
+    ],
+    "eye_tracking_validation": _COMUNS + [
+        ("percent_in_roi", pa.list_(pa.float64()), _field("percent_in_roi", _float_list)),
+        ("validation_mean_error", pa.float64(), _field("validation_mean_error", _float)),
+    ],
+    PARTICAO_IAT: _COMUNS + [
+        ("block", pa.int8(), None),              # bloco corrente (marcadores phase=instruction_block_N)
+        ("stimulus", pa.string(), _field("stimulus", _str)),
+        ("response", pa.string(), _field("response", _str)),
+        ("correct", pa.bool_(), _field("correct", _bool)),
+    ],
+    "text_evaluation": _COMUNS + _TEXTO + [
+        ("naturalidade", pa.int16(), _field("naturalidade", _int)),
+        ("clareza", pa.int16(), _field("clareza", _int)),
+        ("compreensao", pa.int16(), _field("compreensao", _int)),
+        ("correct_authorship", pa.int16(), _field("correct_authorship", _int)),
+        ("authorship_correct", pa.bool_(), _field("authorship_correct", _bool)),
+        ("response", pa.int16(), _field("response", _int)),  # botão (autoria / confiança)
+    ],
+    # formato longo: uma linha por item respondido (idade, genero, escolaridade, familiaridade_ia...)
+    "demographics": _COMUNS + [
+        ("item", pa.string(), None),
+        ("value", pa.string(), None),
+    ],
+}
+
+# amostras com os mesmos tipos dos arrays de amostras_gaze (float32 / int32)
+GAZE_ESQUEMAS = {
+    "eye_tracking": pa.schema([
+        ("participant_id", pa.string()),
+        ("trial_index", pa.int64()),
+        ("sample", pa.int32()),
+        ("x", pa.float32()),
+        ("y", pa.float32()),
+        ("t", pa.int32()),
+    ]),
+    "eye_tracking_validation": pa.schema([
+        ("participant_id", pa.string()),
+        ("trial_index", pa.int64()),
+        ("point", pa.int16()),   # índice do ponto de validação (lista externa do raw_gaze)
+        ("sample", pa.int32()),
+        ("x", pa.float32()),
+        ("y", pa.float32()),
+        ("dx", pa.float32()),
+        ("dy", pa.float32()),
+    ]),
+}
+
+
+def _schema(particao):
+    return pa.schema([(name, typ) for name, typ, _ in ESQUEMAS[particao]])
+
+
+def _particao(trial):
+    trial_type = trial.get("trial_type")
+    if isinstance(trial_type, str) and "iat" in trial_type:
+        return PARTICAO_IAT
+    return PARTICOES.get(trial.get("task"))
+
+
+def _participant_from_path(path):
+    base = os.path.splitext(os.path.basename(path))[0]
+    return base.replace("dados_participante_", "")
+
+
+# ---------- ingestão ----------
+
+class _FileColumns:
+    """Colunas (listas) de um arquivo de participante, por partição, antes de virarem row group."""
+
+    def __init__(self):
+        self.trials = {p: {name: [] for name, _, _ in spec} for p, spec in ESQUEMAS.items()}
+        self.gaze = {p: {name: [] for name in schema.names} for p, schema in GAZE_ESQUEMAS.items()}  # listas de arrays
+
+    def add_trial(self, particao, base, trial, extra=None):
+        cols = self.trials[particao]
+        for name, _, get in ESQUEMAS[particao]:
+            if name in base:
+                cols[name].append(base[name])
+            elif extra is not None and name in extra:
+                cols[name].append(extra[name])
+            else:
+                cols[name].append(get(trial) if get else None)
+
+    def add_gaze(self, particao, base, amostras):
+        """Amostras (array de amostras_gaze) de um trial na tabela filha da partição."""
+        cols = self.gaze[particao]
+        n = len(amostras)
+        cols["participant_id"].append(np.full(n, base["participant_id"], dtype=object))
+        cols["trial_index"].append(np.full(n, base["trial_index"], dtype=np.int64))
+        sample = np.arange(n, dtype=np.int32)
+        if "point" in amostras.dtype.names and n:
+            # posição da amostra dentro do seu ponto de validação (amostras agrupadas por ponto)
+            inicio = np.flatnonzero(np.r_[True, amostras["point"][1:] != amostras["point"][:-1]])
+            sample -= np.repeat(inicio, np.diff(np.r_[inicio, n])).astype(np.int32)
+        cols["sample"].append(sample)
+        for name in amostras.dtype.names:
+            cols[name].append(amostras[name])
+
+    def gaze_table(self, particao):
+        cols = self.gaze[particao]
+        schema = GAZE_ESQUEMAS[particao]
+        if not cols["sample"]:
+            return None
+        return pa.table({name: np.concatenate(cols[name]) for name in schema.names}, schema=schema)
+
+
+def _read_file(path):
+    """Lê um arquivo de participante em streaming e devolve suas colunas por partição."""
+    out = _FileColumns()
+    fallback_id = _participant_from_path(path)
+    block = None
+    for pos, trial in enumerate(iter_trials(path)):
+        phase = trial.get("phase")
+        if isinstance(phase, str) and phase.startswith("instruction_block_"):
+            block = _int(phase.rsplit("_", 1)[-1])
+
+        particao = _particao(trial)
+        if particao is None:
+            continue
+        pid = trial.get("participant_id")
+        base = {
+            "participant_id": _str(pid) if pid is not None else fallback_id,
+            "trial_index": _int(trial.get("trial_index")) if trial.get("trial_index") is not None else pos,
+        }
+
+        if particao == "demographics":
+            response = trial.get("response")
+            if isinstance(response, dict):
+                for item, value in response.items():
+                    out.add_trial(particao, base, trial, {"item": item, "value": _str(value)})
+            continue
+
+        out.add_trial(particao, base, trial, {"block": block} if particao == PARTICAO_IAT else None)
+        if particao == "eye_tracking" and isinstance(trial.get("webgazer_data"), list):
+            out.add_gaze(particao, base, webgazer_array(trial["webgazer_data"]))
+        elif particao == "eye_tracking_validation" and isinstance(trial.get("raw_gaze"), list):
+            out.add_gaze(particao, base, raw_gaze_array(trial["raw_gaze"]))
+    return out
+
+
+def ingest(input_dir, dataset_dir, pattern="dados_participante_*.json"):
+    """(Re)constrói a base em `dataset_dir` a partir dos JSON brutos; devolve o nº de arquivos lidos.
+
+    A base é montada numa pasta temporária ao lado de `dataset_dir` e só substitui a anterior
+    depois de uma ingestão completa. `dataset_dir` não pode ser a pasta dos JSON nem contê-la.
+    """
+    destino = os.path.realpath(dataset_dir)
+    entrada = os.path.realpath(input_dir)
+    if entrada == destino or entrada.startswith(destino + os.sep):
+        raise ValueError(f"dataset_dir ({dataset_dir}) não pode ser nem conter input_dir ({input_dir})")
+    paths = sorted(glob.glob(os.path.join(input_dir, pattern)))
+
+    parent = os.path.dirname(destino)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(destino)}-", dir=parent)
+    writers = {}
+
+    def write(particao, filename, table):
+        if table is None or table.num_rows == 0:
+            return
+        key = (particao, filename)
+        if key not in writers:
+            part_dir = os.path.join(tmp_dir, f"task={particao}")
+            os.makedirs(part_dir, exist_ok=True)
+            writers[key] = pq.ParquetWriter(os.path.join(part_dir, filename), table.schema)
+        writers[key].write_table(table)
+
+    lidos = 0
+    try:
+        try:
+            for path in paths:
+                try:
+                    file_cols = _read_file(path)
+                except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+                    print(f"✗ Erro ao ler {path}: {e}")
+                    continue
+                for particao, cols in file_cols.trials.items():
+                    write(particao, TRIALS_FILE, pa.table(cols, schema=_schema(particao)))
+                for particao in file_cols.gaze:
+                    write(particao, GAZE_FILE, file_cols.gaze_table(particao))
+                lidos += 1
+        finally:
+            for writer in writers.values():
+                writer.close()
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # ingestão interrompida: a base anterior fica
+        raise
+
+    # troca a base anterior pela nova (os.replace não sobrescreve pasta com conteúdo)
+    antiga = None
+    if os.path.isdir(destino):
+        antiga = tmp_dir + ".antiga"
+        os.replace(destino, antiga)
+    os.replace(tmp_dir, destino)
+    if antiga:
+        shutil.rmtree(antiga)
+    return lidos
+
+
+# ---------- leitura ----------
+
+def _read(path, schema, columns):
+    if os.path.exists(path):
+        return pq.read_table(path, columns=columns).to_pandas()
+    # partição vazia: DataFrame vazio com as colunas e tipos do esquema
+    names = columns if columns is not None else schema.names
+    return schema.empty_table().select(names).to_pandas()
+
+
+def read_task(dataset_dir, particao, columns=None):
+    """Trials de uma partição, só com as colunas pedidas (None = todas)."""
+    path = os.path.join(dataset_dir, f"task={particao}", TRIALS_FILE)
+    return _read(path, _schema(particao), columns)
+
+
+def read_gaze(dataset_dir, particao="eye_tracking", columns=None):
+    """Amostras de olhar (tabela filha) de uma partição, só com as colunas pedidas."""
+    path = os.path.join(dataset_dir, f"task={particao}", GAZE_FILE)
+    return _read(path, GAZE_ESQUEMAS[particao], columns)
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    dataset_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/dataset_trials"
+
+    n = ingest(input_directory, dataset_directory)
+    print(f"Base gravada em {dataset_directory} ({n} arquivo(s))")
@@ -0,0 +1,148 @@
+"""
+D-score do IAT (Greenwald, Nosek & Banaji, 2003) para todos os participantes de uma vez.
+
+Entrada: uma tabela longa com uma linha por trial do IAT (participant_id, block, rt_ms e,
+para as variantes com troca de erros, correct). Passo a passo, todo em agregações agrupadas
+(np.bincount por participante × bloco), sem laço por participante:
+
+  1. só os blocos críticos 3, 4 (congruentes) e 6, 7 (incongruentes)
+  2. descarta TR > 10.000 ms
+  3. descarta o participante se mais de 10% dos TR restantes forem < 300 ms
+  4. DP combinado dos blocos 3∪6 e 4∪7
+  5. média de cada bloco
+  6-7. quocientes (M6 - M3) / DP(3∪6) e (M7 - M4) / DP(4∪7)
+  8. D = média dos quocientes disponíveis
+
+Variantes de tratamento dos erros (Greenwald et al., 2003, tabela 4):
+  D1  TR até a resposta correta (penalidade embutida: force_correct_key_press no iat.js)
+  D2  D1, descartando TR < 400 ms
+  D3  TR dos erros trocado pela média dos acertos do bloco + 2 DP
+  D4  TR dos erros trocado pela média dos acertos do bloco + 600 ms
+  D5  D3, descartando TR < 400 ms
+  D6  D4, descartando TR < 400 ms
+D1 é o D-score que os scripts de consolidação gravam.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+RT_MAX = 10000.0          # ms
+LOW_RT = 300.0            # ms
+LOW_RT_FRAC = 0.10        # fração máxima de TR < LOW_RT
+RT_MIN_VARIANTE = 400.0   # ms (D2, D5, D6)
+PENALIDADE_MS = 600.0     # ms (D4, D6)
+
+BLOCOS = ("3", "4", "6", "7")
+_PAR = np.array([0, 1, 0, 1])  # 3∪6 -> 0 (prática), 4∪7 -> 1 (teste)
+
+VARIANTES = {
+    #      (descarta < 400 ms, troca dos erros)
+    "D1": (False, None),
+    "D2": (True, None),
+    "D3": (False, "2dp"),
+    "D4": (False, "600"),
+    "D5": (True, "2dp"),
+    "D6": (True, "600"),
+}
+
+
+def _bloco(valores):
+    """Índice 0..3 dos blocos críticos (3, 4, 6, 7); -1 nos demais."""
+    codigo = pd.Series(valores).astype(str).map({b: i for i, b in enumerate(BLOCOS)})
+    return codigo.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _correto(valores):
+    """Acerto de cada trial; sem a informação (None/NaN), conta como acerto."""
+    return ~pd.Series(valores).isin([False, 0, "false", "False"]).to_numpy()
+
+
+def _media_dp(chave, rt, n_chaves):
+    """(n, média, DP amostral) de rt agrupado por chave (0..n_chaves-1), em duas passadas."""
+    n = np.bincount(chave, minlength=n_chaves).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.bincount(chave, weights=rt, minlength=n_chaves) / n
+        desvio = np.bincount(chave, weights=(rt - media[chave]) ** 2, minlength=n_chaves)
+        dp = np.sqrt(desvio / (n - 1))
+    dp[n < 2] = np.nan
+    return n, media, dp
+
+
+def _quocientes(grupo, bloco, rt, n_grupos):
+    """(D, quociente 3∪6, quociente 4∪7) por grupo, a partir das latências já tratadas."""
+    n, media, _ = _media_dp(grupo * 4 + bloco, rt, n_grupos * 4)
+    media = np.where(n > 0, media, np.nan).reshape(n_grupos, 4)
+    _, _, dp = _media_dp(grupo * 2 + _PAR[bloco], rt, n_grupos * 2)
+    dp = np.where(dp > 0, dp, np.nan).reshape(n_grupos, 2)
+    q_pratica = (media[:, 2] - media[:, 0]) / dp[:, 0]
+    q_teste = (media[:, 3] - media[:, 1]) / dp[:, 1]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # nenhum quociente disponível -> NaN
+        d = np.nanmean(np.column_stack([q_pratica, q_teste]), axis=1)
+    return d, q_pratica, q_teste
+
+
+def _troca_erros(grupo, bloco, rt, correto, n_grupos, troca):
+    """Latências dos erros trocadas pela média dos acertos do bloco + 2 DP ou + 600 ms."""
+    chave = grupo * 4 + bloco
+    n, media, dp = _media_dp(chave[correto], rt[correto], n_grupos * 4)
+    media = np.where(n > 0, media, np.nan)
+    penalidade = 2 * dp if troca == "2dp" else PENALIDADE_MS
+    novo = media + penalidade
+    return np.where(correto, rt, novo[chave] if np.ndim(novo) else novo)
+
+
+def trials_criticos(trials):
+    """Passos 1-3 para todos os participantes de `trials`, em ordem de participant_id.
+
+    Devolve (ids, usados, excluido, grupo, bloco, rt, correto): trials críticos após o corte de
+    10 s por participante, máscara dos excluídos por excesso de TR < 300 ms e, por trial mantido,
+    o índice do participante em `ids`, o índice do bloco (0..3), o TR e o acerto.
+    """
+    # participantes em ordem, como no groupby("participant_id")
+    grupo, ids = pd.factorize(trials["participant_id"], sort=True)
+    grupo = grupo.astype(np.int64)
+    n_grupos = len(ids)
+    bloco = _bloco(trials["block"])
+    rt = pd.to_numeric(trials["rt_ms"], errors="coerce").to_numpy(dtype=np.float64)
+    correto = _correto(trials["correct"]) if "correct" in trials else np.ones(len(trials), dtype=bool)
+
+    # 1-2) blocos críticos e TR <= 10 s (TR ausente também sai)
+    ok = (grupo >= 0) & (bloco >= 0) & (rt <= RT_MAX)
+    grupo, bloco, rt, correto = grupo[ok], bloco[ok], rt[ok], correto[ok]
+    usados = np.bincount(grupo, minlength=n_grupos)
+    # 3) exclusão por excesso de TR < 300 ms
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac_baixos = np.bincount(grupo, weights=(rt < LOW_RT), minlength=n_grupos) / usados
+    excluido = (usados == 0) | (frac_baixos > LOW_RT_FRAC)
+    mantem = ~excluido[grupo]
+    return ids, usados, excluido, grupo[mantem], bloco[mantem], rt[mantem], correto[mantem]
+
+
+def d_scores(trials, variantes=("D1",)):
+    """D-score de todos os participantes de `trials` (uma linha por participante, em ordem).
+
+    Colunas: participant_id, trials_used (trials críticos após o corte de 10 s; 0 se o
+    participante foi excluído) e, para cada variante V, V (o D), V_practice (3∪6) e V_test (4∪7).
+    """
+    ids, usados, excluido, grupo, bloco, rt, correto = trials_criticos(trials)
+    n_grupos = len(ids)
+
+    out = pd.DataFrame({"participant_id": np.asarray(ids, dtype=object), "trials_used": np.where(excluido, 0, usados)})
+    for nome in variantes:
+        descarta_rapidos, troca = VARIANTES[nome]
+        g, b, r, c = grupo, bloco, rt, correto
+        if descarta_rapidos:
+            f = r >= RT_MIN_VARIANTE
+            g, b, r, c = g[f], b[f], r[f], c[f]
+        if troca is not None:
+            r = _troca_erros(g, b, r, c, n_grupos, troca)
+            f = ~np.isnan(r)
+            g, b, r = g[f], b[f], r[f]
+        d, q_pratica, q_teste = _quocientes(g, b, r, n_grupos)
+        out[nome] = d
+        out[f"{nome}_practice"] = q_pratica
+        out[f"{nome}_test"] = q_teste
+    return out
@@ -0,0 +1,127 @@
+"""
+Resolução dos estímulos do IAT: texto do .iat-stimulus e categoria de cada trial iat-html.
+
+O conjunto de estímulos é pequeno e se repete em todos os trials e participantes: as 12
+palavras de atributo do js/iat-stimuli.js e os trechos dos textos (snippet do iat.js: as 6
+primeiras palavras + '…') do texts/example_texts.json. Esses estímulos são indexados uma vez
+(texto em minúsculas -> categoria) e cada HTML distinto é lido com um HTMLParser da
+biblioteca padrão e categorizado uma única vez por processo (lru_cache pela string do HTML).
+
+Estímulo fora do índice cai na heurística por substrings dos scripts de consolidação.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JS_ESTIMULOS = os.path.join(RAIZ, "js", "iat-stimuli.js")
+TEXTOS_JSON = os.path.join(RAIZ, "texts", "example_texts.json")
+PALAVRAS_SNIPPET = 6  # snippet() do iat.js
+
+CATEGORIAS_JS = {"Positivo": "positive", "Negativo": "negative", "IA": "ia_text", "Humano": "human_text"}
+_ATRIBUTO = re.compile(r"stimulus:\s*'([^']*)'\s*,\s*category:\s*'([^']*)'")
+
+# heurística (fallback) para estímulos que não estão no índice
+POSITIVE_WORDS = ("competente", "inteligente", "sábio", "bom", "agradável", "alegre")
+NEGATIVE_WORDS = ("desagradável", "ineficiente", "tolo", "leigo", "ruim", "triste")
+IA_TEXT_PATTERNS = ("organização eficiente", "sistema erp", "sistema consiste", "soluções")
+HUMAN_TEXT_PATTERNS = ("cozinhas planejadas", "item importantíssimo", "preparação do terreno", "escolha")
+IA_FALLBACK = ("ia", "inteligência artificial", "algoritmo")
+IGNORADAS = ("script", "style")  # tags cujo conteúdo o get_text do BeautifulSoup não devolve
+
+
+class _TextoEstimulo(HTMLParser):
+    """Texto do primeiro <div class="iat-stimulus">, como o get_text(strip=True) do BeautifulSoup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.profundidade = 0   # divs abertas dentro do .iat-stimulus (0 = fora)
+        self.achou = False
+        self.ignorado = 0       # <script>/<style> abertos (o conteúdo não é texto)
+        self.partes = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in IGNORADAS:
+            self.ignorado += 1
+            return
+        if tag != "div":
+            return
+        if self.profundidade:
+            self.profundidade += 1
+        elif not self.achou and "iat-stimulus" in (dict(attrs).get("class") or "").split():
+            self.profundidade = 1
+            self.achou = True
+
+    def handle_endtag(self, tag):
+        if tag in IGNORADAS:
+            self.ignorado = max(self.ignorado - 1, 0)
+        elif tag == "div" and self.profundidade:
+            self.profundidade -= 1
+
+    def handle_data(self, data):
+        if self.profundidade and not self.ignorado and data.strip():
+            self.partes.append(data.strip())
+
+
+def extrai_texto(stimulus_html):
+    """Texto do .iat-stimulus do HTML do trial; None se não houver."""
+    parser = _TextoEstimulo()
+    parser.feed(stimulus_html)
+    parser.close()
+    return "".join(parser.partes) if parser.achou else None
+
+
+def _snippet(texto):
+    return " ".join(texto.split()[:PALAVRAS_SNIPPET])
+
+
+@lru_cache(maxsize=None)
+def indice(js_path=JS_ESTIMULOS, textos_path=TEXTOS_JSON):
+    """Estímulo em minúsculas -> categoria, a partir do iat-stimuli.js e dos textos do corpus."""
+    categorias = {}
+    if os.path.exists(js_path):
+        with open(js_path, encoding="utf-8") as f:
+            for estimulo, categoria in _ATRIBUTO.findall(f.read()):
+                if categoria in CATEGORIAS_JS:
+                    categorias[estimulo.lower()] = CATEGORIAS_JS[categoria]
+    if os.path.exists(textos_path):
+        with open(textos_path, encoding="utf-8") as f:
+            for texto in json.load(f).get("texts", []):
+                categoria = "ia_text" if str(texto.get("authorship", "")).lower() == "ai" else "human_text"
+                categorias.setdefault(_snippet(texto.get("content", "")).lower(), categoria)
+    return categorias
+
+
+@lru_cache(maxsize=None)
+def categoriza(estimulo):
+    """Categoria do estímulo: 'ia_text', 'human_text', 'positive' ou 'negative'."""
+    estimulo_lower = estimulo.lower()
+    categoria = indice().get(estimulo_lower)
+    if categoria is not None:
+        return categoria
+
+    if any(word in estimulo_lower for word in POSITIVE_WORDS):
+        return "positive"
+    elif any(word in estimulo_lower for word in NEGATIVE_WORDS):
+        return "negative"
+    elif any(pattern in estimulo_lower for pattern in IA_TEXT_PATTERNS):
+        return "ia_text"
+    elif any(pattern in estimulo_lower for pattern in HUMAN_TEXT_PATTERNS):
+        return "human_text"
+    elif any(word in estimulo_lower for word in IA_FALLBACK):
+        return "ia_text"
+    return "human_text"
+
+
+@lru_cache(maxsize=None)
+def resolve(stimulus_html):
+    """(estímulo limpo, categoria) do HTML de um trial iat-html; None sem .iat-stimulus."""
+    texto = extrai_texto(stimulus_html)
+    if texto is None:
+        return None
+    # o snippet termina em '…': fica só o início, como no índice
+    limpo = texto.split("…")[0] if "…" in texto else texto
+    return limpo, categoriza(limpo)
@@ -3,13 +3,23 @@ import glob
 import json
 import shutil
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-import math
+
+from amostras_gaze import VALIDACAO_DTYPE, GazeArrays, raw_gaze_array
+from cache_resultados import file_sha256
+from leitor_trials import iter_trials
+from qualidade_calibracao import COLUNAS as QC_COLUNAS, tabela_qc
 
 # --- CONFIGURAÇÕES ---
 INPUT_DIR = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"             # onde estão meus arquivos .json
 REJECTED_DIR = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/rejeitados"    # onde os rejeitados vão parar
 LOG_FILE = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/rejeitados/rejection_log.txt"
+QC_FILE = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/qc_calibracao.csv"  # tabela de QC da calibração
+VERDICT_FILE = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/veredito_validacao.csv"  # aprovado/motivos por arquivo
+CACHE_DIR = None  # ex.: os.path.join(INPUT_DIR, ".cache_filtro_dados"): métricas por arquivo, chaveadas pelo sha256
 VALIDATION_ANGLE_THRESHOLD = 4.0  # qualidade mínima aceitável
 EYE_DISTANCE_CM = 65  # distância olho-tela em cm
 PPI = 96  # pixels por polegada
@@ -20,97 +30,324 @@ PX_PER_CM = PPI / 2.54  # pixels por centímetro
 # aceitável ≤ 4° Útil para regressão/fixação
 # precário > 4° Muito ruidoso, melhor descartar, mas os dados dos outros testes, se válidos, podem ser usados ... pensar nisso para futuros artigos
 
-
-# Cria pasta de rejeitados e configura log
-os.makedirs(REJECTED_DIR, exist_ok=True)
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
 # --- LIMIARES (valores típicos da literatura) ---
 IAT_RT_MIN = 300                  # ms; abaixo disso considera implausível
 IAT_RT_MAX = 3000                 # ms; acima disso considera muito lento
 READING_RTW_MIN = 200             # ms/word; abaixo disso é leitura muito rápida
 
-# --- FUNÇÃO PRINCIPAL ---
-def validar_participante(filepath):
-    """Carrega o JSON, calcula métricas e retorna lista de motivos de rejeição (vazia = OK)."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    try:
-        data = [json.loads(l) for l in lines if l.strip().startswith("{")]
-    except Exception:
-        data = json.loads("".join(lines))
-    df = pd.DataFrame(data)
-
-    pid = df.get("participant_id", pd.Series([os.path.basename(filepath)])).iloc[0]
-    motivos = []
+# únicos campos lidos dos trials; webgazer_data, stimulus, text_content etc. são pulados sem decodificar
+CAMPOS = ("participant_id", "trial_type", "rt", "task", "reading_time_per_word", "raw_gaze")
+
+# as métricas em cache não dependem dos limiares, mas dependem da geometria usada no erro em graus
+CACHE_VERSION = f"filtro_dados-2/{EYE_DISTANCE_CM}cm/{PPI}ppi"
+
+
+def limiares_padrao():
+    return {
+        "iat_rt_min": IAT_RT_MIN,
+        "iat_rt_max": IAT_RT_MAX,
+        "reading_rtw_min": READING_RTW_MIN,
+        "validation_angle_threshold": VALIDATION_ANGLE_THRESHOLD,
+    }
+
+
+def _num(v):
+    """Escalar numérico -> float do Python (NaN/ausente -> None), para gravar em JSON."""
+    if v is None or pd.isna(v):
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+# --- MÉTRICAS POR ARQUIVO (independentes dos limiares) ---
+def _metricas_arquivo(filepath, validacao):
+    """Lê o JSON em streaming e devolve as métricas do arquivo.
+
+    As amostras de validação do eye tracking vão para `validacao` (chave: filepath); o erro de
+    calibração sai depois, em lote, da tabela de QC do lote de arquivos.
+    """
+    colunas = set()
+    pid = None
+    rts_iat = []          # rt das trials IAT
+    rtpw_leitura = []     # reading_time_per_word das trials de autoleitura
+    n_validacao = 0       # trials de validação do eye tracking
+    for i, row in enumerate(iter_trials(filepath, fields=CAMPOS)):
+        if i == 0:
+            pid = row.get("participant_id")
+        colunas.update(row)
+        trial_type = row.get("trial_type")
+        if isinstance(trial_type, str) and "iat" in trial_type:
+            rts_iat.append(row.get("rt"))
+        if row.get("task") == "self_paced_reading":
+            rtpw_leitura.append(row.get("reading_time_per_word"))
+        elif row.get("task") == "eye_tracking_validation" and isinstance(row.get("raw_gaze"), list):
+            validacao.add(filepath, i, raw_gaze_array(row["raw_gaze"]))
+            n_validacao += 1
+
+    # sem participant_id no arquivo: None aqui (a entrada vai para o cache pelo conteúdo);
+    # o nome do arquivo entra só nas tabelas, em _participante
+    return {
+        "participant_id": pid if "participant_id" in colunas else None,
+        "campos_iat": "trial_type" in colunas and "rt" in colunas,
+        "campos_leitura": "task" in colunas and "reading_time_per_word" in colunas,
+        "n_iat": len(rts_iat),
+        "iat_rt_medio": _num(pd.Series(rts_iat).astype(float).mean()) if rts_iat else None,
+        "n_leitura": len(rtpw_leitura),
+        "leitura_rtpw_media": _num(pd.Series(rtpw_leitura).astype(float).mean()) if rtpw_leitura else None,
+        "n_validacao": n_validacao,
+        "qc": [],
+    }
+
+
+def _participante(filepath, m):
+    """participant_id das métricas; sem ele, o nome do arquivo (preenchido na hora do relatório)."""
+    return m.get("participant_id") or os.path.basename(filepath)
+
+
+def _metricas_lote(arquivos):
+    """Métricas de um lote de arquivos; a tabela de QC da calibração é calculada uma vez para o lote."""
+    validacao = GazeArrays(VALIDACAO_DTYPE)
+    metricas = {}
+    for filepath in arquivos:
+        try:
+            metricas[filepath] = _metricas_arquivo(filepath, validacao)
+        except OSError as e:
+            # sem permissão, removido durante a execução...: não depende do conteúdo, não vai para o cache
+            metricas[filepath] = {"participant_id": None, "erro_leitura": str(e), "transitorio": True}
+        except (ValueError, TypeError) as e:
+            # JSON inválido (JSONDecodeError/UnicodeDecodeError são ValueError) ou rt não numérico
+            metricas[filepath] = {"participant_id": None, "erro_leitura": str(e)}
+
+    qc = tabela_qc(validacao, EYE_DISTANCE_CM, PX_PER_CM)
+    for filepath, linhas in qc.groupby("participant_id", sort=False):
+        metricas[filepath]["qc"] = [
+            {col: _num(v) if col not in ("participant_id", "nivel") else v for col, v in linha.items()
+             if col != "participant_id"}
+            for linha in linhas.to_dict("records")
+        ]
+    return metricas
+
+
+class _CacheMetricas:
+    """Métricas por arquivo, chaveadas pelo sha256 do conteúdo (sobrevivem a mover/renomear o arquivo).
+
+    Para não reler arquivos inalterados, o sha256 de cada caminho fica guardado junto com tamanho
+    e mtime; só arquivos novos ou modificados são relidos para calcular o hash.
+    """
+
+    def __init__(self, cache_dir, version):
+        self.path = os.path.join(cache_dir, "metricas.json")
+        self.version = version
+        self.por_hash = {}
+        self.arquivos = {}  # caminho -> [tamanho, mtime_ns, sha256]
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("version") == version:
+                self.por_hash = dados["por_hash"]
+                self.arquivos = dados["arquivos"]
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _hash(self, path):
+        st = os.stat(path)
+        info = self.arquivos.get(path)
+        if info is None or info[:2] != [st.st_size, st.st_mtime_ns]:
+            info = [st.st_size, st.st_mtime_ns, file_sha256(path)]
+            self.arquivos[path] = info
+        return info[2]
+
+    def get(self, path):
+        return self.por_hash.get(self._hash(path))
+
+    def put(self, path, metricas):
+        self.por_hash[self._hash(path)] = metricas
 
+    def save(self):
+        self.arquivos = {p: info for p, info in self.arquivos.items() if os.path.exists(p)}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "por_hash": self.por_hash, "arquivos": self.arquivos}, f)
+        os.replace(tmp_path, self.path)
+
+
+def coletar_metricas(arquivos, jobs=1, cache_dir=None):
+    """{filepath: métricas} de todos os arquivos; só os que não estão no cache são lidos (em paralelo)."""
+    cache = _CacheMetricas(cache_dir, CACHE_VERSION) if cache_dir else None
+    metricas = {}
+    pendentes = []
+    for filepath in arquivos:
+        try:
+            m = cache.get(filepath) if cache is not None else None
+        except OSError:
+            m = None  # não deu para calcular o hash: a leitura registra o erro
+        if m is None:
+            pendentes.append(filepath)
+        else:
+            metricas[filepath] = m
+
+    n_lotes = max(1, min(jobs, len(pendentes)))
+    lotes = [pendentes[i::n_lotes] for i in range(n_lotes)]
+    if n_lotes > 1:
+        with ProcessPoolExecutor(max_workers=n_lotes) as executor:
+            for resultado in executor.map(_metricas_lote, lotes):
+                metricas.update(resultado)
+    elif pendentes:
+        metricas.update(_metricas_lote(pendentes))
+
+    if cache is not None:
+        for filepath in pendentes:
+            if metricas[filepath].get("transitorio"):
+                continue
+            try:
+                cache.put(filepath, metricas[filepath])
+            except OSError:
+                pass  # arquivo sumiu depois da leitura: fica fora do cache
+        cache.save()
+        print(f"[cache] {len(arquivos) - len(pendentes)} arquivo(s) do cache, {len(pendentes)} lido(s) → {cache_dir}")
+    return {filepath: metricas[filepath] for filepath in arquivos}
+
+
+# --- VEREDITO (só limiares: não relê nenhum JSON) ---
+def avaliar(m, limiares):
+    """Lista de motivos de rejeição de um arquivo (vazia = OK)."""
+    if "erro_leitura" in m:
+        return [f"erro ao ler o arquivo: {m['erro_leitura']}"]
+    motivos = []
 
     # 1) IAT (tempo de reação médio)
-    if "trial_type" in df.columns and "rt" in df.columns:
-        df_iat = df[df["trial_type"].str.contains("iat", na=False)]
-        if not df_iat.empty:
-            media_rt = df_iat["rt"].astype(float).mean()
-            if media_rt < IAT_RT_MIN or media_rt > IAT_RT_MAX:
-                motivos.append(f"IAT mean RT {media_rt:.0f}ms fora de [{IAT_RT_MIN},{IAT_RT_MAX}]")
+    if m["campos_iat"]:
+        if m["n_iat"]:
+            media_rt = m["iat_rt_medio"]
+            if media_rt is not None and (media_rt < limiares["iat_rt_min"] or media_rt > limiares["iat_rt_max"]):
+                motivos.append(f"IAT mean RT {media_rt:.0f}ms fora de [{limiares['iat_rt_min']},{limiares['iat_rt_max']}]")
         else:
             motivos.append("nenhuma trial IAT encontrada")
     else:
         motivos.append("campos 'trial_type' ou 'rt' ausentes")
 
     # 2) Self‐paced reading (tempo médio por palavra)
-    if "task" in df.columns and "reading_time_per_word" in df.columns:
-        rtpw = df[df["task"] == "self_paced_reading"]["reading_time_per_word"].astype(float)
-        if not rtpw.empty:
-            media_rtpw = rtpw.mean()
-            if media_rtpw < READING_RTW_MIN:
-                motivos.append(f"reading_time_per_word média {media_rtpw:.1f}ms < {READING_RTW_MIN}ms")
+    if m["campos_leitura"]:
+        if m["n_leitura"]:
+            media_rtpw = m["leitura_rtpw_media"]
+            if media_rtpw is not None and media_rtpw < limiares["reading_rtw_min"]:
+                motivos.append(f"reading_time_per_word média {media_rtpw:.1f}ms < {limiares['reading_rtw_min']}ms")
         else:
             motivos.append("nenhuma trial self_paced_reading encontrada")
     else:
         motivos.append("campos 'task' ou 'reading_time_per_word' ausentes")
 
-    # 3) Erro de calibração do eye-tracking (validação)
-    df_val_task = [row for row in data if row.get("task") == "eye_tracking_validation" and isinstance(row.get("raw_gaze"), list)]
-    if df_val_task:
-        all_pontos = []
-        for row in df_val_task:
-            raw_gaze = row.get("raw_gaze", [])
-            if isinstance(raw_gaze, list) and len(raw_gaze) > 0 and isinstance(raw_gaze[0], list):
-                pontos = raw_gaze[0]
-            else:
-                pontos = raw_gaze
-            for ponto in pontos:
-                if all(k in ponto for k in ["x", "y", "dx", "dy"]):
-                    all_pontos.append(ponto)
-        if all_pontos:
-            df_val = pd.DataFrame(all_pontos)
-            df_val["dist_px"] = ((df_val["x"] - df_val["dx"])**2 + (df_val["y"] - df_val["dy"])**2)**0.5
-            df_val["dist_cm"] = df_val["dist_px"] / PX_PER_CM
-            df_val["erro_graus"] = df_val["dist_cm"].apply(lambda d: math.degrees(math.atan(d / EYE_DISTANCE_CM)))
-            erro_medio = df_val["erro_graus"].mean()
-            #logging.info(f"{pid}: erro médio de calibração = {erro_medio:.2f}°")
-            if erro_medio > VALIDATION_ANGLE_THRESHOLD:
-                motivos.append(f"erro de calibração médio {erro_medio:.2f}° > {VALIDATION_ANGLE_THRESHOLD}°")
-        else:
-            motivos.append("nenhum dado válido em raw_gaze")
-    else:
+    # 3) Erro de calibração do eye-tracking (validação): consulta na linha do participante da tabela de QC
+    participante = [linha for linha in m["qc"] if linha["nivel"] == "participante"]
+    limite = limiares["validation_angle_threshold"]
+    if not m["n_validacao"]:
         motivos.append("nenhuma task de validação com eye_tracking_validation encontrada")
+    elif not participante:
+        motivos.append("nenhum dado válido em raw_gaze")
+    elif participante[0]["erro_medio"] > limite:
+        motivos.append(f"erro de calibração médio {participante[0]['erro_medio']:.2f}° > {limite}°")
+
+    return motivos
+
+
+def tabela_veredito(metricas, limiares):
+    """Uma linha por arquivo: participante, métricas principais, aprovado e motivos."""
+    linhas = []
+    for filepath, m in metricas.items():
+        motivos = avaliar(m, limiares)
+        erro = [linha["erro_medio"] for linha in m.get("qc", []) if linha["nivel"] == "participante"]
+        linhas.append({
+            "caminho": filepath,
+            "arquivo": os.path.basename(filepath),
+            "participant_id": _participante(filepath, m),
+            "iat_rt_medio": m.get("iat_rt_medio"),
+            "leitura_rtpw_media": m.get("leitura_rtpw_media"),
+            "erro_calibracao": erro[0] if erro else None,
+            "aprovado": not motivos,
+            "motivos": "; ".join(motivos),
+        })
+    return pd.DataFrame(linhas, columns=["caminho", "arquivo", "participant_id", "iat_rt_medio",
+                                         "leitura_rtpw_media", "erro_calibracao", "aprovado", "motivos"])
 
-    return pid, motivos
 
-# --- RODA A VALIDAÇÃO EM TODOS OS ARQUIVOS ---
-for filepath in glob.glob(os.path.join(INPUT_DIR, "*.json")):
-    pid, motivos = validar_participante(filepath)
-    if motivos:
-        # move para pasta de rejeitados
-        dest = os.path.join(REJECTED_DIR, os.path.basename(filepath))
-        shutil.move(filepath, dest)
-        # escreve no log
-        logging.info(f"{pid}: {'; '.join(motivos)}")
+def tabela_qc_arquivos(metricas):
+    """Tabela de QC da calibração de todos os arquivos (montada das métricas, sem reler os JSON)."""
+    linhas = [
+        {"participant_id": _participante(filepath, m), "arquivo": os.path.basename(filepath), **linha}
+        for filepath, m in metricas.items() for linha in m.get("qc", [])
+    ]
+    qc = pd.DataFrame(linhas, columns=["participant_id", "arquivo"] + QC_COLUNAS[1:])
+    qc["point"] = qc["point"].astype("Int16")
+    return qc
+
+
+def aplicar_veredito(veredito, rejected_dir, log_file):
+    """Move os reprovados para `rejected_dir` e registra os motivos no log."""
+    os.makedirs(rejected_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    for linha in veredito.itertuples():
+        if not linha.aprovado:
+            # move para pasta de rejeitados
+            shutil.move(linha.caminho, os.path.join(rejected_dir, linha.arquivo))
+            # escreve no log
+            logging.info(f"{linha.participant_id}: {linha.motivos}")
+
+
+def validar(input_dir=INPUT_DIR, limiares=None, jobs=1, cache_dir=CACHE_DIR, dry_run=False,
+            rejected_dir=REJECTED_DIR, log_file=LOG_FILE, qc_file=QC_FILE, verdict_file=VERDICT_FILE):
+    """Valida todos os .json de `input_dir`; devolve a tabela de veredito.
+
+    dry_run=True só grava as tabelas (veredito e QC), sem mover nenhum arquivo.
+    """
+    limiares = {**limiares_padrao(), **(limiares or {})}
+    arquivos = glob.glob(os.path.join(input_dir, "*.json"))
+    metricas = coletar_metricas(arquivos, jobs=jobs, cache_dir=cache_dir)
+    veredito = tabela_veredito(metricas, limiares)
+
+    if qc_file:
+        tabela_qc_arquivos(metricas).to_csv(qc_file, index=False, sep=';', decimal=',')
+    if verdict_file:
+        veredito.drop(columns="caminho").to_csv(verdict_file, index=False, sep=';', decimal=',')
+    if not dry_run:
+        aplicar_veredito(veredito, rejected_dir, log_file)
+    return veredito
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Valida os arquivos de participante e separa os rejeitados.")
+    parser.add_argument("--input-dir", default=INPUT_DIR)
+    parser.add_argument("--rejected-dir", default=REJECTED_DIR)
+    parser.add_argument("--log-file", default=LOG_FILE)
+    parser.add_argument("--qc-file", default=QC_FILE)
+    parser.add_argument("--verdict-file", default=VERDICT_FILE)
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="cache de métricas por arquivo (sha256)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="processos em paralelo")
+    parser.add_argument("--dry-run", action="store_true", help="só grava o veredito, não move arquivos")
+    parser.add_argument("--iat-rt-min", type=float, default=IAT_RT_MIN)
+    parser.add_argument("--iat-rt-max", type=float, default=IAT_RT_MAX)
+    parser.add_argument("--reading-rtw-min", type=float, default=READING_RTW_MIN)
+    parser.add_argument("--validation-angle-threshold", type=float, default=VALIDATION_ANGLE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    limiares = {
+        "iat_rt_min": args.iat_rt_min,
+        "iat_rt_max": args.iat_rt_max,
+        "reading_rtw_min": args.reading_rtw_min,
+        "validation_angle_threshold": args.validation_angle_threshold,
+    }
+    veredito = validar(args.input_dir, limiares, jobs=args.jobs, cache_dir=args.cache_dir,
+                       dry_run=args.dry_run, rejected_dir=args.rejected_dir, log_file=args.log_file,
+                       qc_file=args.qc_file, verdict_file=args.verdict_file)
+
+    n_rej = int((~veredito["aprovado"]).sum())
+    if args.dry_run:
+        print(f"Dry-run: {n_rej} de {len(veredito)} arquivo(s) seriam rejeitados. Veja", args.verdict_file)
+    else:
+        print("Validação concluída. Veja", args.log_file, "para detalhes dos rejeitados.")
+
 
-print("Validação concluída. Veja", LOG_FILE, "para detalhes dos rejeitados.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
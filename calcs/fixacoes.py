@@ -0,0 +1,305 @@
+"""
+Detecção de fixações offline a partir do webgazer_data gravado.
+
+No navegador (js/eye-tracking.js, on_finish de createEyeTrackingBlock) só o total
+`number_of_fixations` é salvo. Aqui as fixações são recalculadas para todos os trials
+e viram uma tabela (uma linha por fixação: x, y, start, end, duration).
+
+Métodos:
+  "ancora" -> a regra do eye-tracking.js, reproduzida exatamente: a primeira amostra do grupo
+              é a âncora; as seguintes entram enquanto a distância até a âncora for < raio
+              (35 px); a primeira fora fecha o grupo e vira a nova âncora. O grupo é fixação
+              se fim - início >= duração mínima (100 ms); a posição é a da âncora.
+  "idt"    -> I-DT (dispersão): janela mínima de `duracao_min`, estendida enquanto
+              (max x - min x) + (max y - min y) <= `dispersao_max`; posição = centróide.
+  "ivt"    -> I-VT (velocidade): amostras com velocidade <= `velocidade_max` (px/s) formam
+              fixações; trechos com duração >= `duracao_min`; posição = centróide.
+
+`tabela_varredura` aplica a regra "ancora" a uma grade de (duração mínima, raio) numa
+passada por trial, para testar a sensibilidade dos resultados aos limiares do JS.
+
+Para reproduzir o JS bit a bit, as amostras precisam estar em float64 (WEBGAZER_DTYPE_F64).
+"""
+
+import numpy as np
+import pandas as pd
+
+from amostras_gaze import WEBGAZER_DTYPE_F64, load_gaze
+
+MIN_FIXATION_DURATION = 100   # ms (eye-tracking.js)
+MAX_FIXATION_RADIUS = 35      # px (eye-tracking.js)
+MAX_DISPERSION = 35           # px; I-DT
+MAX_VELOCITY = 1300           # px/s; I-VT (≈ 30°/s a 65 cm de uma tela de 96 ppi)
+
+JANELA = 64  # amostras comparadas de uma vez com cada âncora/início de janela
+
+COLUNAS = ["participant_id", "trial_index", "fixation", "x", "y", "start", "end", "duration", "n_amostras"]
+
+
+def _dist(x, y, i, j):
+    """Distância euclidiana entre a amostra i e as amostras j, como no JS (Math.sqrt de quadrados)."""
+    return np.sqrt((x[j] - x[i]) ** 2 + (y[j] - y[i]) ** 2)
+
+
+def _proximos(x, y, raio):
+    """prox[i]: primeira amostra j > i fora do raio da âncora i; n se não houver; -1 se além de JANELA."""
+    n = len(x)
+    # distância NaN também fecha o grupo, como `NaN < raio` é falso no JS;
+    # calculado para todo i de uma vez, JANELA amostras à frente
+    prox = np.full(n, -1, dtype=np.int64)
+    pendente = np.ones(n, dtype=bool)
+    for k in range(1, min(JANELA, n - 1) + 1):
+        d = np.sqrt((x[k:] - x[:-k]) ** 2 + (y[k:] - y[:-k]) ** 2)
+        fora = np.flatnonzero(pendente[:n - k] & ~(d < raio))
+        prox[fora] = fora + k
+        pendente[fora] = False
+        if not pendente[:n - k].any():
+            break
+    # sem ponto fora até o fim do trial
+    ate_o_fim = pendente & (np.arange(n) + JANELA >= n - 1)
+    prox[ate_o_fim] = n
+    return prox
+
+
+def _grupos_ancora(x, y, raio, prox=None):
+    """Índices de início de cada grupo da regra de âncora do eye-tracking.js."""
+    n = len(x)
+    if prox is None:
+        prox = _proximos(x, y, raio)
+    inicios = []
+    i = 0
+    while i < n:
+        inicios.append(i)
+        j = prox[i]
+        if j < 0:
+            # grupo mais longo que JANELA: continua a busca em blocos
+            j = n
+            lo = i + JANELA + 1
+            while lo < n:
+                hi = min(n, lo + 4 * JANELA)
+                fora = np.flatnonzero(~(_dist(x, y, i, np.arange(lo, hi)) < raio))
+                if fora.size:
+                    j = lo + fora[0]
+                    break
+                lo = hi
+        i = j
+    return np.asarray(inicios, dtype=np.int64)
+
+
+def fixacoes_ancora(x, y, t, raio=MAX_FIXATION_RADIUS, duracao_min=MIN_FIXATION_DURATION):
+    """Regra do eye-tracking.js: (inicio, fim, fx, fy) por fixação, índices de amostra inclusivos."""
+    n = len(x)
+    if n == 0:
+        return _vazio()
+    inicio = _grupos_ancora(x, y, raio)
+    fim = np.r_[inicio[1:] - 1, n - 1]
+    ok = (t[fim] - t[inicio]) >= duracao_min
+    inicio, fim = inicio[ok], fim[ok]
+    return inicio, fim, x[inicio], y[inicio]
+
+
+def fixacoes_idt(x, y, t, dispersao_max=MAX_DISPERSION, duracao_min=MIN_FIXATION_DURATION):
+    """I-DT: (inicio, fim, fx, fy) por fixação; fx, fy = centróide."""
+    n = len(x)
+    if n == 0:
+        return _vazio()
+    # janela mínima de cada i: [i, j_min[i]], com j_min o primeiro j tal que t[j] - t[i] >= duracao_min
+    j_min = np.searchsorted(t, t + duracao_min, side="left")
+    largura = np.minimum(j_min, n - 1) - np.arange(n)
+    xmax, xmin, ymax, ymin = x.copy(), x.copy(), y.copy(), y.copy()
+    for k in range(1, int(largura.max()) + 1):
+        sel = np.flatnonzero(largura >= k)
+        xmax[sel] = np.maximum(xmax[sel], x[sel + k])
+        xmin[sel] = np.minimum(xmin[sel], x[sel + k])
+        ymax[sel] = np.maximum(ymax[sel], y[sel + k])
+        ymin[sel] = np.minimum(ymin[sel], y[sel + k])
+    # inícios possíveis: janela mínima completa e dentro da dispersão (todos calculados de uma vez)
+    candidatos = np.flatnonzero((j_min < n) & ((xmax - xmin) + (ymax - ymin) <= dispersao_max))
+
+    inicios, fins = [], []
+    c = 0
+    while c < len(candidatos):
+        i = candidatos[c]
+        # estende a janela enquanto a dispersão continuar dentro do limite
+        lo, hi = j_min[i], min(n, j_min[i] + 1 + JANELA)
+        while True:
+            xs, ys = x[i:hi], y[i:hi]
+            disp = (np.maximum.accumulate(xs) - np.minimum.accumulate(xs)
+                    + np.maximum.accumulate(ys) - np.minimum.accumulate(ys))
+            fora = np.flatnonzero(~(disp[lo - i:] <= dispersao_max))
+            if fora.size or hi == n:
+                break
+            lo, hi = hi, min(n, hi + 4 * JANELA)
+        fim = lo + fora[0] - 1 if fora.size else hi - 1
+        inicios.append(i)
+        fins.append(fim)
+        c = np.searchsorted(candidatos, fim + 1)
+    return _centroides(x, y, np.asarray(inicios, dtype=np.int64), np.asarray(fins, dtype=np.int64))
+
+
+def fixacoes_ivt(x, y, t, velocidade_max=MAX_VELOCITY, duracao_min=MIN_FIXATION_DURATION):
+    """I-VT: (inicio, fim, fx, fy) por fixação; fx, fy = centróide. Totalmente vetorizado."""
+    n = len(x)
+    if n == 0:
+        return _vazio()
+    dt = np.diff(t) / 1000.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = np.hypot(np.diff(x), np.diff(y)) / dt
+    # amostra k é de fixação se a velocidade a partir da anterior está abaixo do limiar
+    # (a primeira usa a velocidade até a seguinte)
+    lenta = np.empty(n, dtype=bool)
+    lenta[1:] = v <= velocidade_max
+    lenta[0] = lenta[1] if n > 1 else True
+    borda = np.diff(np.r_[False, lenta, False].astype(np.int8))
+    inicio = np.flatnonzero(borda == 1)
+    fim = np.flatnonzero(borda == -1) - 1
+    ok = (t[fim] - t[inicio]) >= duracao_min
+    return _centroides(x, y, inicio[ok], fim[ok])
+
+
+def _vazio():
+    vazio = np.empty(0, dtype=np.int64)
+    return vazio, vazio, np.empty(0), np.empty(0)
+
+
+def _centroides(x, y, inicio, fim):
+    if not len(inicio):
+        return _vazio()
+    cx, cy = np.cumsum(np.r_[0.0, x]), np.cumsum(np.r_[0.0, y])
+    n = fim - inicio + 1
+    return inicio, fim, (cx[fim + 1] - cx[inicio]) / n, (cy[fim + 1] - cy[inicio]) / n
+
+
+METODOS = {"ancora": fixacoes_ancora, "idt": fixacoes_idt, "ivt": fixacoes_ivt}
+
+
+def detectar(amostras, metodo="ancora", **params):
+    """Fixações de um trial (array com campos x, y, t) como DataFrame (colunas de COLUNAS sem as chaves)."""
+    x = np.asarray(amostras["x"], dtype=np.float64)
+    y = np.asarray(amostras["y"], dtype=np.float64)
+    t = np.asarray(amostras["t"], dtype=np.float64)
+    inicio, fim, fx, fy = METODOS[metodo](x, y, t, **params)
+    return pd.DataFrame({
+        "fixation": np.arange(len(inicio)),
+        "x": fx,
+        "y": fy,
+        "start": t[inicio],
+        "end": t[fim],
+        "duration": t[fim] - t[inicio],
+        "n_amostras": fim - inicio + 1,
+    })
+
+
+def tabela_fixacoes(webgazer, metodo="ancora", **params):
+    """Tabela de fixações de todos os trials de um GazeArrays (uma linha por fixação)."""
+    partes = []
+    for (pid, trial_index), amostras in webgazer:
+        fix = detectar(amostras, metodo, **params)
+        fix.insert(0, "trial_index", trial_index)
+        fix.insert(0, "participant_id", pid)
+        partes.append(fix)
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    return pd.concat(partes, ignore_index=True)[COLUNAS]
+
+
+def contagem_por_trial(fixacoes, webgazer=None):
+    """Número de fixações por (participant_id, trial_index), como o number_of_fixations do JS.
+
+    Com `webgazer` (o GazeArrays de onde saíram as fixações), trials sem nenhuma fixação também
+    aparecem, com 0, como no JS.
+    """
+    contagem = fixacoes.groupby(["participant_id", "trial_index"]).size().rename("number_of_fixations")
+    if webgazer is not None:
+        todos = pd.MultiIndex.from_tuples(list(webgazer.index), names=["participant_id", "trial_index"])
+        contagem = contagem.reindex(todos, fill_value=0)
+    return contagem.reset_index()
+
+
+COLUNAS_VARREDURA = ["participant_id", "trial_index", "min_fixation_duration", "max_fixation_radius",
+                     "number_of_fixations", "total_fixation_duration", "mean_fixation_duration"]
+
+
+def varredura(x, y, t, duracoes, raios):
+    """Regra do eye-tracking.js numa grade de parâmetros, para um trial.
+
+    Devolve (n_fix, tempo_fix), arrays len(raios) × len(duracoes) com o número de fixações e a
+    soma das durações. As distâncias até JANELA amostras à frente são calculadas uma vez só:
+    para cada raio, o primeiro ponto fora de cada âncora sai do máximo acumulado dessas
+    distâncias, e a duração de cada grupo é comparada com todas as durações mínimas de uma vez.
+    """
+    duracoes = np.asarray(duracoes, dtype=np.float64)
+    n_fix = np.zeros((len(raios), len(duracoes)), dtype=np.int64)
+    tempo_fix = np.zeros((len(raios), len(duracoes)))
+    n = len(x)
+    if n == 0:
+        return n_fix, tempo_fix
+    largura = min(JANELA, n - 1)
+    # dist[i, k - 1]: distância da âncora i à amostra i + k (NaN fecha o grupo -> inf;
+    # depois do fim do trial -> -inf, que não muda o máximo acumulado)
+    dist = np.full((n, largura), -np.inf)
+    for k in range(1, largura + 1):
+        d = np.sqrt((x[k:] - x[:-k]) ** 2 + (y[k:] - y[:-k]) ** 2)
+        dist[:n - k, k - 1] = np.where(np.isnan(d), np.inf, d)
+    maximo = np.maximum.accumulate(dist, axis=1)
+    posicao = np.arange(n)
+    ate_o_fim = posicao + JANELA >= n - 1
+
+    for r, raio in enumerate(raios):
+        # deslocamentos seguidos dentro do raio (o máximo acumulado é crescente em k)
+        dentro = (maximo < raio).sum(axis=1)
+        prox = posicao + dentro + 1
+        longo = dentro == largura
+        prox[longo] = np.where(ate_o_fim[longo], n, -1)
+        inicio = _grupos_ancora(x, y, raio, prox)
+        fim = np.r_[inicio[1:] - 1, n - 1]
+        duracao = (t[fim] - t[inicio])[:, None]
+        ok = duracao >= duracoes
+        n_fix[r] = ok.sum(axis=0)
+        tempo_fix[r] = np.where(ok, duracao, 0.0).sum(axis=0)
+    return n_fix, tempo_fix
+
+
+def tabela_varredura(webgazer, duracoes, raios):
+    """Tabela longa da varredura: uma linha por trial × (duração mínima, raio)."""
+    duracoes = np.asarray(duracoes)
+    raios = np.asarray(raios)
+    chaves, contagens, tempos = [], [], []
+    for chave, amostras in webgazer:
+        n_fix, tempo_fix = varredura(
+            np.asarray(amostras["x"], dtype=np.float64),
+            np.asarray(amostras["y"], dtype=np.float64),
+            np.asarray(amostras["t"], dtype=np.float64),
+            duracoes, raios,
+        )
+        chaves.append(chave)
+        contagens.append(n_fix.ravel())
+        tempos.append(tempo_fix.ravel())
+    if not chaves:
+        return pd.DataFrame(columns=COLUNAS_VARREDURA)
+
+    por_trial = len(raios) * len(duracoes)
+    n_fix = np.concatenate(contagens)
+    tempo_fix = np.concatenate(tempos)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = np.where(n_fix > 0, tempo_fix / n_fix, np.nan)
+    return pd.DataFrame({
+        "participant_id": np.repeat(np.array([pid for pid, _ in chaves], dtype=object), por_trial),
+        "trial_index": np.repeat([ti for _, ti in chaves], por_trial),
+        "min_fixation_duration": np.tile(np.tile(duracoes, len(raios)), len(chaves)),
+        "max_fixation_radius": np.tile(np.repeat(raios, len(duracoes)), len(chaves)),
+        "number_of_fixations": n_fix,
+        "total_fixation_duration": tempo_fix,
+        "mean_fixation_duration": media,
+    })[COLUNAS_VARREDURA]
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    output_csv = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data/fixacoes.csv"
+    metodo = "ancora"  # "ancora" (igual ao eye-tracking.js), "idt" ou "ivt"
+
+    webgazer, _ = load_gaze(input_directory, webgazer_dtype=WEBGAZER_DTYPE_F64)
+    fixacoes = tabela_fixacoes(webgazer, metodo)
+    fixacoes.to_csv(output_csv, index=False, sep=';', decimal=',')
+    print(f"{len(fixacoes)} fixações em {len(webgazer)} trials → {output_csv}")
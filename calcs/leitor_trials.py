@@ -0,0 +1,282 @@
+"""
+Leitura em streaming dos arquivos de dados do experimento.
+
+Os arquivos de participante chegam em três formatos:
+  1) array JSON            -> [ {trial}, {trial}, ... ]   (salvar_dados_json.js)
+  2) JSONL                 -> um {trial} por linha
+  3) objeto "envelope"     -> {"trials"|"data"|"events": [ {trial}, ... ], ...}
+
+Um objeto de topo só é envelope se não tiver marcadores de trial (trial_type/trial_index)
+no nível de cima ou se for o único valor do arquivo; assim, um trial JSONL com um campo
+"data" em lista continua sendo um trial.
+
+`iter_trials` percorre o arquivo em blocos e devolve um trial (dict) por vez,
+sem montar a lista completa: a memória fica limitada ao tamanho de um trial
+(ex.: um trial de eye tracking com todo o seu webgazer_data), e não ao arquivo.
+
+Com `fields` (projeção), só os campos pedidos são decodificados; os demais
+(webgazer_data, raw_gaze, stimulus, text_content...) são pulados no texto,
+sem virar objetos Python.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1 << 16                        # caracteres lidos por vez
+WRAPPER_KEYS = ("trials", "data", "events") # chaves de envelope com a lista de trials
+SMALL_TRIAL = 1 << 14                       # com projeção, trials até este tamanho são decodificados inteiros
+TRIAL_MARKERS = frozenset(("trial_type", "trial_index"))  # chaves que só um trial tem no nível de cima
+
+_WS = re.compile(r"\s*")
+_NUM_TAIL = re.compile(r"[0-9.eE+\-]*")
+_STR = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+_STRING = re.compile(_STR)
+# trecho sem colchetes/chaves "abertos": escalares, strings e objetos planos ({"x":..,"y":..,"t":..})
+_PLAIN = r'[^\[\]{}"]*'
+_SKIP = re.compile(rf'{_PLAIN}(?:(?:{_STR}|\{{{_PLAIN}(?:{_STR}{_PLAIN})*\}}){_PLAIN})*')
+_DECODER = json.JSONDecoder()
+
+
+class _Buffer:
+    """Janela deslizante sobre o arquivo; descarta o que já foi decodificado."""
+
+    def __init__(self, fh, chunk_size):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.mark = None  # início de um valor que ainda pode ser relido: não descartar a partir dele
+        self.eof = False
+
+    def _fill(self, n=None):
+        if self.eof:
+            return False
+        cut = self.pos if self.mark is None else min(self.pos, self.mark)
+        if cut > self.chunk_size:
+            self.buf = self.buf[cut:]
+            self.pos -= cut
+            if self.mark is not None:
+                self.mark -= cut
+        chunk = self.fh.read(n or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        """Próximo caractere não-branco (sem consumir); '' no fim do arquivo."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected=None):
+        ch = self.peek()
+        if expected is not None and ch not in expected:
+            raise json.JSONDecodeError(f"esperado um de {expected!r}", self.buf, self.pos)
+        self.pos += 1
+        return ch
+
+    def value(self):
+        """Decodifica o próximo valor JSON completo, lendo mais blocos se preciso."""
+        self.peek()
+        need = self.chunk_size
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill(need):
+                    raise
+                need = max(need, len(self.buf) - self.pos)  # crescimento geométrico
+                continue
+            # um número no fim do bloco pode ter sido cortado ao meio ("274." / "1e")
+            if _NUM_TAIL.fullmatch(self.buf, end) and self._fill(need):
+                continue
+            self.pos = end
+            return obj
+
+    def _more(self, need):
+        if not self._fill(need):
+            raise json.JSONDecodeError("valor JSON incompleto", self.buf, self.pos)
+        return max(need, len(self.buf) - self.pos)
+
+    def skip(self):
+        """Pula o próximo valor JSON sem decodificá-lo."""
+        ch = self.peek()
+        need = self.chunk_size
+        if ch == '"':
+            while True:
+                m = _STRING.match(self.buf, self.pos)
+                if m:
+                    self.pos = m.end()
+                    return
+                need = self._more(need)
+        if ch not in "[{":
+            self.value()  # número/literal: curto
+            return
+        self.pos += 1
+        depth = 1
+        while True:
+            self.pos = _SKIP.match(self.buf, self.pos).end()
+            if self.pos == len(self.buf) or self.buf[self.pos] == '"':
+                need = self._more(need)  # fim do bloco ou string cortada ao meio
+                continue
+            depth += 1 if self.buf[self.pos] in "[{" else -1
+            self.pos += 1
+            if depth == 0:
+                return
+
+    def save(self):
+        """Ponto de retorno: posição do arquivo depois do buffer + o trecho ainda não consumido."""
+        self.peek()
+        return self.fh.tell(), self.buf[self.pos:], self.eof
+
+    def restore(self, state):
+        """Volta ao ponto de `save` relendo o arquivo dali (o que foi pulado não ficou em memória)."""
+        offset, self.buf, self.eof = state
+        self.fh.seek(offset)
+        self.pos = 0
+        self.mark = None
+
+    def member_value(self, key, fields):
+        """Valor do membro `key` se ele está na projeção (None = todos); senão pula e devolve _SKIPPED."""
+        if fields is None or key in fields:
+            return self.value()
+        self.skip()
+        return _SKIPPED
+
+
+_SKIPPED = object()
+
+
+def _read_object(buf, fields):
+    """Objeto (trial) só com os campos da projeção."""
+    # trials pequenos (a maioria) saem mais baratos decodificados de uma vez e filtrados;
+    # só os grandes (webgazer_data, raw_gaze...) são lidos campo a campo
+    buf.peek()
+    buf.mark = buf.pos
+    buf.skip()
+    start, buf.mark = buf.mark, None
+    if buf.pos - start <= SMALL_TRIAL:
+        obj = _DECODER.raw_decode(buf.buf, start)[0]
+        return {k: v for k, v in obj.items() if k in fields}
+    buf.pos = start
+
+    buf.take("{")
+    obj = {}
+    if buf.peek() == "}":
+        buf.take()
+        return obj
+    while True:
+        key = buf.value()
+        buf.take(":")
+        val = buf.member_value(key, fields)
+        if val is not _SKIPPED:
+            obj[key] = val
+        if buf.take(",}") == "}":
+            return obj
+
+
+def _iter_array(buf, fields=None):
+    buf.take("[")
+    if buf.peek() == "]":
+        buf.take()
+        return
+    while True:
+        if fields is None:
+            item = buf.value()
+            if isinstance(item, dict):
+                yield item
+        elif buf.peek() == "{":
+            yield _read_object(buf, fields)
+        else:
+            buf.skip()
+        if buf.take(",]") == "]":
+            return
+
+
+def _is_envelope(buf, keys, first):
+    """Com buf.pos na lista de uma chave de WRAPPER_KEYS: o objeto é um envelope?
+
+    Olha adiante sem decodificar (pula a lista e os demais membros, só lendo as chaves) e volta
+    ao início da lista. É envelope se não houver TRIAL_MARKERS no nível de cima do objeto ou se
+    ele for o único valor do arquivo. A lista é pulada em streaming e relida do disco depois
+    (seek), então a memória continua limitada a um trial.
+    """
+    if keys & TRIAL_MARKERS:
+        return False
+    start = buf.save()
+    buf.skip()
+    marked = False
+    while buf.take(",}") == ",":
+        key = buf.value()
+        buf.take(":")
+        buf.skip()
+        marked = marked or key in TRIAL_MARKERS
+    sole = first and buf.peek() == ""
+    buf.restore(start)
+    return sole or not marked
+
+
+def _iter_object(buf, fields=None, first=False):
+    """Objeto de topo: envelope (lista em WRAPPER_KEYS é transmitida) ou um trial JSONL."""
+    buf.take("{")
+    members = {}
+    keys = set()
+    wrapped = False
+    if buf.peek() == "}":
+        buf.take()
+    else:
+        while True:
+            key = buf.value()
+            keys.add(key)
+            buf.take(":")
+            if key in WRAPPER_KEYS and buf.peek() == "[" and _is_envelope(buf, keys, first):
+                wrapped = True
+                yield from _iter_array(buf, fields)
+            else:
+                val = buf.member_value(key, fields)
+                if val is not _SKIPPED:
+                    members[key] = val
+            if buf.take(",}") == "}":
+                break
+    if not wrapped:
+        yield members
+
+
+def iter_trials(path, chunk_size=CHUNK_SIZE, fields=None):
+    """Gera os trials (dicts) de um arquivo de participante, um por vez, em ordem.
+
+    fields: campos a manter em cada trial (None = todos); os outros não são decodificados.
+    """
+    if fields is not None:
+        fields = frozenset(fields)
+    with open(path, "r", encoding="utf-8") as fh:
+        buf = _Buffer(fh, chunk_size)
+        first = True
+        while True:
+            ch = buf.peek()
+            if ch == "":
+                return
+            if ch == "[":
+                yield from _iter_array(buf, fields)
+            elif ch == "{":
+                yield from _iter_object(buf, fields, first)
+            else:
+                buf.skip()  # valor solto fora de objeto/array: ignora
+            first = False
+
+
+class TrialStream:
+    """Sequência re-iterável dos trials de um arquivo: cada `for` relê o disco em streaming."""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, fields=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fields = fields
+
+    def __iter__(self):
+        return iter_trials(self.path, self.chunk_size, self.fields)
@@ -0,0 +1,79 @@
+"""
+Léxico de frequências Zipf (wordfreq) resolvido em lote e persistido em disco.
+
+zipf_frequency é consultado uma única vez por palavra distinta: quem usa o léxico junta o
+vocabulário (do corpus inteiro, dos segmentos etc.), chama resolve() com ele e depois só faz
+consultas a um dict comum (palavra -> Zipf). As palavras já resolvidas ficam em
+  <cache_dir>/zipf_<idioma>_wordfreq-<versão>.json
+e as execuções seguintes partem delas; trocar a versão do wordfreq (ou o idioma) troca o
+arquivo. Os dados do wordfreq só são carregados se houver alguma palavra nova.
+"""
+
+import json
+import os
+import re
+from importlib.metadata import version
+
+ZIPF_LANG = "pt"
+_PALAVRA = re.compile(r"[^\W\d_]+")  # sequências de letras (sem dígitos e _)
+
+
+def versao_wordfreq():
+    return version("wordfreq")
+
+
+def palavras(texto):
+    """Palavras do texto em minúsculas, para covariáveis de frequência sem o tokenizador do NLTK."""
+    return _PALAVRA.findall(str(texto).lower())
+
+
+class LexicoZipf:
+    """palavra -> frequência Zipf de um idioma; em memória se cache_dir for None."""
+
+    def __init__(self, cache_dir: str = None, lang: str = ZIPF_LANG):
+        self.lang = lang
+        self.zipf = {}
+        self.novas = 0  # palavras resolvidas nesta execução (ainda não gravadas)
+        self.path = None
+        if cache_dir:
+            self.path = os.path.join(cache_dir, f"zipf_{lang}_wordfreq-{versao_wordfreq()}.json")
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self.zipf = json.load(f)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    self.zipf = {}  # arquivo corrompido: resolve tudo de novo
+
+    def __len__(self):
+        return len(self.zipf)
+
+    def __getitem__(self, palavra):
+        return self.zipf[palavra]
+
+    def resolve(self, vocabulario):
+        """Consulta o wordfreq, em lote, só as palavras do vocabulário que ainda não estão no léxico."""
+        faltam = set(vocabulario).difference(self.zipf)
+        if faltam:
+            from wordfreq import zipf_frequency
+            for palavra in sorted(faltam):
+                self.zipf[palavra] = zipf_frequency(palavra, self.lang)
+            self.novas += len(faltam)
+        return self.zipf
+
+    def media(self, sequencia):
+        """Zipf médio das palavras (com repetição, na ordem dada); NaN se não houver palavras."""
+        if not sequencia:
+            return float("nan")
+        zipf = self.resolve(sequencia)
+        return sum(zipf[p] for p in sequencia) / len(sequencia)
+
+    def salva(self):
+        """Grava o léxico se houver palavras novas (escrita atômica: arquivo temporário + replace)."""
+        if not self.path or not self.novas:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.zipf, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.novas = 0
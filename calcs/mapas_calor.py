@@ -0,0 +1,200 @@
+"""
+Mapas de calor 2D do tempo de olhar (dwell time) por texto, por autoria e por participante.
+
+O fixation_time_by_region do eye-tracking.js é um histograma de 4 faixas horizontais de
+window.innerWidth, que muda de tela para tela. Aqui as amostras do webgazer_data são levadas
+para as coordenadas da área do texto (aoi_palavras.caixa_texto): x = 0..1 da esquerda à direita
+do conteúdo e y = 0..1 da primeira à última linha, e somadas numa grade BINS (como o
+np.histogram2d, com pesos). O peso de cada amostra é o tempo desde a anterior (como o
+deltaT do JS), limitado a DT_MAXIMO para não contar lacunas.
+
+`MapaCalor` guarda os tempos brutos (ms) de cada mapa: somar dois acumuladores é somar as
+grades, então participantes novos entram sem reprocessar os anteriores (`atualiza` só lê os
+arquivos que ainda não estão no acumulador, que pode ser gravado e reaberto). A normalização
+(fração do tempo total em cada célula) é feita na hora de usar ou desenhar.
+"""
+
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+from aoi_palavras import ALTURA_LINHA, caixa_texto, indice_trial
+from amostras_gaze import trials_com_amostras
+
+BINS = (48, 32)                           # células em x e em y
+LIMITES = ((-0.25, 1.25), (-0.5, 1.5))    # em unidades da área do texto (0..1 = o texto)
+DT_MAXIMO = 100                           # ms
+NIVEIS = ("texto", "autoria", "participante")
+
+
+class MapaCalor:
+    """Acumulador de mapas de tempo de olhar, indexado por (nível, valor)."""
+
+    def __init__(self, bins=BINS, limites=LIMITES):
+        self.bins = tuple(int(b) for b in bins)
+        self.limites = tuple(tuple(float(v) for v in lim) for lim in limites)
+        self.tempo = {}      # (nivel, valor) -> grade bins (ms)
+        self.n_trials = {}   # (nivel, valor) -> trials somados
+        self.arquivos = set()
+
+    def adiciona(self, trials):
+        """Soma de uma vez os trials de um participante: lista de (participant_id, text_id,
+        text_authorship, amostras, caixa), com caixa = (left, top, largura, altura) em px."""
+        trials = [tr for tr in trials if len(tr[3])]
+        if not trials:
+            return
+        nx, ny = self.bins
+        (x0, x1), (y0, y1) = self.limites
+        n = np.array([len(tr[3]) for tr in trials])
+        codigo = np.repeat(np.arange(len(trials)), n)
+        caixa = np.array([tr[4] for tr in trials], dtype=np.float64)[codigo]
+        x = np.concatenate([np.asarray(tr[3]["x"], dtype=np.float64) for tr in trials])
+        y = np.concatenate([np.asarray(tr[3]["y"], dtype=np.float64) for tr in trials])
+        t = np.concatenate([np.asarray(tr[3]["t"], dtype=np.float64) for tr in trials])
+
+        # peso = tempo desde a amostra anterior do mesmo trial
+        peso = np.zeros(len(t))
+        peso[1:] = np.clip(np.diff(t), 0, DT_MAXIMO)
+        peso[np.r_[0, np.cumsum(n)[:-1]]] = 0.0
+
+        u = (x - caixa[:, 0]) / caixa[:, 2]
+        v = (y - caixa[:, 1]) / caixa[:, 3]
+        ix = np.floor((u - x0) / (x1 - x0) * nx).astype(np.int64)
+        iy = np.floor((v - y0) / (y1 - y0) * ny).astype(np.int64)
+        ok = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny) & (peso > 0)
+        # todas as grades dos trials num único bincount
+        celula = (codigo[ok] * nx + ix[ok]) * ny + iy[ok]
+        grades = np.bincount(celula, weights=peso[ok], minlength=len(trials) * nx * ny)
+        grades = grades.reshape(len(trials), nx, ny)
+
+        for grade, (pid, text_id, autoria, _, _) in zip(grades, trials):
+            for chave in (("texto", text_id), ("autoria", autoria), ("participante", pid)):
+                if chave[1] is None:
+                    continue
+                chave = (chave[0], str(chave[1]))
+                if chave in self.tempo:
+                    self.tempo[chave] += grade
+                else:
+                    self.tempo[chave] = grade.copy()
+                self.n_trials[chave] = self.n_trials.get(chave, 0) + 1
+
+    def merge(self, outro):
+        """Soma outro acumulador (de arquivos diferentes) a este."""
+        if outro.bins != self.bins or outro.limites != self.limites:
+            raise ValueError("Mapas com grades diferentes não podem ser somados.")
+        repetidos = self.arquivos & outro.arquivos
+        if repetidos:
+            raise ValueError(f"Arquivos já somados nos dois mapas: {sorted(repetidos)[:5]}")
+        for chave, grade in outro.tempo.items():
+            if chave in self.tempo:
+                self.tempo[chave] = self.tempo[chave] + grade
+            else:
+                self.tempo[chave] = grade.copy()
+            self.n_trials[chave] = self.n_trials.get(chave, 0) + outro.n_trials[chave]
+        self.arquivos |= outro.arquivos
+        return self
+
+    def normalizado(self, nivel, valor):
+        """Fração do tempo total do mapa em cada célula (soma 1)."""
+        grade = self.tempo[(nivel, str(valor))]
+        total = grade.sum()
+        return grade / total if total > 0 else grade.copy()
+
+    def chaves(self, nivel=None):
+        return sorted(k for k in self.tempo if nivel is None or k[0] == nivel)
+
+    def save(self, path):
+        chaves = self.chaves()
+        np.savez_compressed(
+            path,
+            tempo=np.array([self.tempo[k] for k in chaves]).reshape(len(chaves), *self.bins),
+            chaves=np.array([json.dumps(k) for k in chaves], dtype=str),
+            n_trials=np.array([self.n_trials[k] for k in chaves], dtype=np.int64),
+            arquivos=np.array(sorted(self.arquivos), dtype=str),
+            bins=np.array(self.bins),
+            limites=np.array(self.limites),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            mapa = cls(z["bins"], z["limites"])
+            for k, grade, n in zip(z["chaves"], z["tempo"], z["n_trials"]):
+                chave = tuple(json.loads(str(k)))
+                mapa.tempo[chave] = grade
+                mapa.n_trials[chave] = int(n)
+            mapa.arquivos = set(str(a) for a in z["arquivos"])
+        return mapa
+
+
+def _caixa(texto, alvo):
+    """(left, top, largura, altura) da área do texto; altura = linhas × line-height."""
+    left, top, largura = caixa_texto(texto, alvo)
+    linhas = max(indice_trial(texto, alvo).n_linhas, 1)
+    return left, top, largura, linhas * ALTURA_LINHA
+
+
+def atualiza(mapa, input_dir, pattern="dados_participante_*.json"):
+    """Soma ao mapa os arquivos de `input_dir` que ele ainda não tem; devolve quantos entraram."""
+    novos = [p for p in sorted(glob.glob(os.path.join(input_dir, pattern)))
+             if os.path.basename(p) not in mapa.arquivos]
+    for path in novos:
+        nome = glob.escape(os.path.basename(path))
+        trials = [
+            (pid, trial.get("text_id"), trial.get("text_authorship"), amostras,
+             _caixa(trial["text_content"], trial.get("webgazer_targets")))
+            for (pid, _), amostras, trial in trials_com_amostras(
+                input_dir, ("text_id", "text_authorship", "text_content", "webgazer_targets"), pattern=nome)
+            if isinstance(trial.get("text_content"), str)
+        ]
+        mapa.adiciona(trials)
+        mapa.arquivos.add(os.path.basename(path))
+    return len(novos)
+
+
+def renderiza(mapa, pasta, niveis=NIVEIS, cmap="hot"):
+    """Grava um PNG por mapa (<nivel>_<valor>.png) em `pasta`, reaproveitando uma única figura."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+
+    os.makedirs(pasta, exist_ok=True)
+    (x0, x1), (y0, y1) = mapa.limites
+    fig, ax = plt.subplots(figsize=(7, 6))
+    imagem = ax.imshow(np.zeros(mapa.bins).T, origin="upper", extent=(x0, x1, y1, y0),
+                       cmap=cmap, aspect="auto", interpolation="bilinear")
+    ax.add_patch(Rectangle((0, 0), 1, 1, fill=False, edgecolor="cyan", linewidth=1))
+    ax.set_xlabel("x (largura do texto)")
+    ax.set_ylabel("y (altura do texto)")
+    barra = fig.colorbar(imagem, ax=ax, label="fração do tempo")
+    titulo = ax.set_title("")
+    gravados = []
+    for nivel in niveis:
+        for _, valor in mapa.chaves(nivel):
+            grade = mapa.normalizado(nivel, valor).T
+            imagem.set_data(grade)
+            imagem.set_clim(0, grade.max() if grade.max() > 0 else 1)
+            barra.update_normal(imagem)
+            titulo.set_text(f"{nivel}: {valor} ({mapa.n_trials[(nivel, valor)]} trials)")
+            destino = os.path.join(pasta, f"{nivel}_{re.sub(r'[^0-9A-Za-z_.-]+', '_', valor)}.png")
+            fig.savefig(destino, dpi=100)
+            gravados.append(destino)
+    plt.close(fig)
+    return gravados
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    mapa_path = os.path.join(input_directory, "mapas_calor.npz")
+    pasta_imagens = os.path.join(input_directory, "mapas_calor")
+
+    mapa = MapaCalor.load(mapa_path) if os.path.exists(mapa_path) else MapaCalor()
+    novos = atualiza(mapa, input_directory)
+    mapa.save(mapa_path)
+    imagens = renderiza(mapa, pasta_imagens)
+    print(f"{novos} arquivos novos somados ({len(mapa.arquivos)} no total) → {mapa_path}; "
+          f"{len(imagens)} imagens em {pasta_imagens}")
@@ -0,0 +1,97 @@
+"""
+Qualidade da calibração do eye tracking (trials eye_tracking_validation), calculada em lote.
+
+Entrada: GazeArrays de validação (amostras_gaze), com as amostras de todos os participantes.
+Saída: uma única tabela de QC, com uma linha por participante (nivel="participante") e uma
+por alvo de validação de cada participante (nivel="alvo"):
+
+  n_amostras     amostras válidas
+  erro_medio     acurácia: média do erro angular (°) entre olhar (x, y) e alvo (dx, dy)
+  erro_mediana   mediana do erro angular (°)
+  erro_rms       raiz do erro angular quadrático médio (°)
+  precisao_s2s   precisão: RMS da distância angular entre amostras consecutivas
+                 do mesmo alvo (RMS-S2S, °)
+  alvo_x, alvo_y posição média do alvo (px; só nas linhas de alvo)
+
+A conversão px -> graus usa a distância olho-tela e a densidade da tela:
+  graus = atan(dist_px / px_por_cm / distancia_olho_cm)
+Tudo é feito com arrays NumPy + um groupby, sem laço por participante ou amostra.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUNAS = ["participant_id", "nivel", "point", "n_amostras",
+           "erro_medio", "erro_mediana", "erro_rms", "precisao_s2s", "alvo_x", "alvo_y"]
+
+
+def graus(dist_px, eye_distance_cm, px_per_cm):
+    """Distância na tela (px) -> ângulo visual (graus)."""
+    return np.degrees(np.arctan(np.asarray(dist_px, dtype=np.float64) / px_per_cm / eye_distance_cm))
+
+
+def tabela_qc(validacao, eye_distance_cm, px_per_cm):
+    """Tabela de QC de todos os participantes (primeiro elemento da chave do índice) de uma vez."""
+    if not len(validacao):
+        return pd.DataFrame(columns=COLUNAS)
+
+    keys = list(validacao.index)
+    bounds = np.array([validacao.index[k] for k in keys], dtype=np.int64).reshape(-1, 2)
+    lens = bounds[:, 1] - bounds[:, 0]
+    participantes = pd.unique(pd.Series([pid for pid, _ in keys], dtype=object))
+    codigo = {pid: i for i, pid in enumerate(participantes)}
+
+    # as amostras de cada trial podem não estar em sequência: junta na ordem do índice
+    amostras = validacao.samples
+    idx = np.concatenate([np.arange(a, b) for a, b in bounds]) if lens.sum() else np.arange(0)
+    amostras = amostras[idx]
+    part = np.repeat([codigo[pid] for pid, _ in keys], lens)
+    trial = np.repeat(np.arange(len(keys)), lens)
+
+    x = amostras["x"].astype(np.float64)
+    y = amostras["y"].astype(np.float64)
+    dx = amostras["dx"].astype(np.float64)
+    dy = amostras["dy"].astype(np.float64)
+    point = amostras["point"]
+
+    erro = graus(np.hypot(x - dx, y - dy), eye_distance_cm, px_per_cm)
+
+    # distância entre amostras consecutivas, só dentro do mesmo trial e do mesmo alvo
+    s2s = np.full(len(erro), np.nan)
+    if len(erro) > 1:
+        mesmo = (trial[1:] == trial[:-1]) & (point[1:] == point[:-1])
+        passo = graus(np.hypot(np.diff(x), np.diff(y)), eye_distance_cm, px_per_cm)
+        s2s[1:][mesmo] = passo[mesmo]
+
+    df = pd.DataFrame({
+        "part": part, "point": point, "erro": erro, "erro2": erro ** 2, "s2s2": s2s ** 2,
+        "alvo_x": dx, "alvo_y": dy,
+    })
+
+    def agrega(chaves):
+        g = df.groupby(chaves, sort=True)
+        out = g.agg(
+            n_amostras=("erro", "size"),
+            erro_medio=("erro", "mean"),
+            erro_mediana=("erro", "median"),
+            erro_rms=("erro2", "mean"),
+            precisao_s2s=("s2s2", "mean"),
+            alvo_x=("alvo_x", "mean"),
+            alvo_y=("alvo_y", "mean"),
+        ).reset_index()
+        out["erro_rms"] = np.sqrt(out["erro_rms"])
+        out["precisao_s2s"] = np.sqrt(out["precisao_s2s"])
+        return out
+
+    por_participante = agrega(["part"])
+    por_participante["nivel"] = "participante"
+    por_participante["point"] = pd.NA
+    por_participante[["alvo_x", "alvo_y"]] = np.nan
+    por_alvo = agrega(["part", "point"])
+    por_alvo["nivel"] = "alvo"
+
+    qc = pd.concat([por_participante, por_alvo], ignore_index=True)
+    qc["participant_id"] = participantes[qc["part"].to_numpy()]
+    qc["point"] = qc["point"].astype("Int16")
+    qc = qc.sort_values(["part", "point"], na_position="first", kind="stable")
+    return qc[COLUNAS].reset_index(drop=True)
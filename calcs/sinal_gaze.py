@@ -0,0 +1,250 @@
+"""
+Condicionamento do sinal de olhar e sacadas, com regressões contadas por palavra.
+
+O on_finish do eye-tracking.js conta uma "regressão" sempre que o x de uma amostra é menor que o
+da anterior: com o ruído do WebGazer isso vira centenas de regressões por texto. Aqui o
+webgazer_data passa por:
+
+  1. reamostragem para FREQUENCIA Hz (interpolação linear; lacunas > LACUNA_MAXIMA ficam NaN)
+  2. filtro de mediana (JANELA_MEDIANA amostras): tira os picos de ruído de 1-2 amostras
+  3. sacadas: trechos com velocidade > LIMIAR_SACADA e amplitude >= AMPLITUDE_MINIMA
+
+Não há filtro de velocidade máxima: a FREQUENCIA Hz uma sacada real cabe num só intervalo
+entre amostras, e o deslocamento de um intervalo pode ser qualquer salto dentro da tela
+(um limite fisiológico de ~1000°/s a 65 cm e 96 ppi dá ~1400 px em 33 ms). Um limiar desses
+não separa ruído de sacada; os picos isolados ficam a cargo da mediana.
+
+Cada sacada é classificada pelas palavras de origem e destino (aoi_palavras):
+  "progressiva"    para uma palavra à direita na mesma linha
+  "regressao"      para uma palavra anterior (à esquerda na mesma linha ou numa linha acima)
+  "retorno_linha"  para a linha seguinte, da direita para a esquerda (não é regressão)
+  "intrapalavra"   dentro da mesma palavra
+Se a origem ou o destino cai fora das palavras, a classificação usa só a geometria (dx e a
+diferença de linhas dy / ALTURA_LINHA); sem o texto do trial, vale sempre a geometria.
+
+Todos os trials de um participante são processados de uma vez: as grades reamostradas são
+concatenadas num só array, separadas por NaN, e cada etapa é uma operação vetorizada.
+"""
+
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from aoi_palavras import ALTURA_LINHA, indice_trial
+from amostras_gaze import WEBGAZER_DTYPE_F64, load_gaze, trials_eye_tracking
+
+FREQUENCIA = 30            # Hz
+LACUNA_MAXIMA = 150        # ms sem amostra a partir do qual não se interpola
+JANELA_MEDIANA = 5         # amostras (ímpar)
+AMPLITUDE_MINIMA = 20      # px
+# a 30 Hz uma sacada cabe num intervalo entre amostras: o limiar é um passo de AMPLITUDE_MINIMA
+LIMIAR_SACADA = AMPLITUDE_MINIMA * FREQUENCIA  # px/s
+
+TIPOS = ["progressiva", "regressao", "retorno_linha", "intrapalavra", "outra"]
+COLUNAS = ["participant_id", "trial_index", "sacada", "start", "end", "x0", "y0", "x1", "y1",
+           "amplitude", "pico_velocidade", "palavra_origem", "palavra_destino", "tipo"]
+COLUNAS_TRIAL = ["participant_id", "trial_index", "n_sacadas", "number_of_regressions",
+                 "return_sweeps", "progressive_saccades"]
+
+
+def condiciona(blocos, frequencia=FREQUENCIA, lacuna_maxima=LACUNA_MAXIMA,
+               janela_mediana=JANELA_MEDIANA):
+    """Reamostra e filtra de uma vez as amostras (x, y, t) de vários trials.
+
+    Devolve (trial, t, x, y, v): a grade concatenada de todos os trials, com `trial` = posição do
+    bloco em `blocos` (-1 nas separações NaN), t em ms desde o início do trial e v em px/s.
+    """
+    h = janela_mediana // 2 + 1  # separação entre trials: nenhuma janela junta dois trials
+    passo = 1000.0 / frequencia
+    blocos = list(blocos)
+    n_amostras = np.array([len(b) for b in blocos], dtype=np.int64)
+    if not n_amostras.sum():
+        vazio = np.full((len(blocos) + 1) * h, np.nan)
+        return np.full(len(vazio), -1, dtype=np.int64), vazio, vazio.copy(), vazio.copy(), vazio.copy()
+    t = np.concatenate([np.asarray(b["t"], dtype=np.float64) for b in blocos])
+    x = np.concatenate([np.asarray(b["x"], dtype=np.float64) for b in blocos])
+    y = np.concatenate([np.asarray(b["y"], dtype=np.float64) for b in blocos])
+    bloco = np.repeat(np.arange(len(blocos)), n_amostras)
+
+    # tempo de cada trial na grade: de t[0] a t[-1], de passo em passo
+    primeiro = np.r_[0, np.cumsum(n_amostras)[:-1]]
+    tem = n_amostras > 0
+    t0 = np.zeros(len(blocos))
+    t1 = np.zeros(len(blocos))
+    t0[tem] = t[primeiro[tem]]
+    t1[tem] = t[primeiro[tem] + n_amostras[tem] - 1]
+    n_grade = np.where(tem, np.floor((t1 - t0) / passo).astype(np.int64) + 1, 0)
+
+    # posições na grade concatenada: h separadores antes de cada trial e depois do último
+    inicio = np.cumsum(np.r_[0, n_grade[:-1] + h]) + h
+    total = int(n_grade.sum()) + (len(blocos) + 1) * h
+    trial = np.full(total, -1, dtype=np.int64)
+    tg = np.full(total, np.nan)
+    xg = np.full(total, np.nan)
+    yg = np.full(total, np.nan)
+    grade_trial = np.repeat(np.arange(len(blocos)), n_grade)
+    j = np.arange(n_grade.sum()) - np.repeat(np.cumsum(np.r_[0, n_grade[:-1]]), n_grade)
+    pos = inicio[grade_trial] + j
+    tempo = t0[grade_trial] + j * passo
+
+    # um só eixo de tempo crescente para todos os trials: cada trial deslocado para depois do anterior
+    deslocamento = np.cumsum(np.r_[0.0, (t1 - t0 + 2 * lacuna_maxima)[:-1]]) - t0
+    T = t + deslocamento[bloco]
+    Tg = tempo + deslocamento[grade_trial]
+    direita = np.minimum(np.searchsorted(T, Tg, side="right"), len(T) - 1)
+    esquerda = np.maximum(direita - 1, 0)
+    lacuna = (T[direita] - T[esquerda] > lacuna_maxima) & (T[esquerda] != Tg)
+
+    trial[pos] = grade_trial
+    tg[pos] = tempo
+    xg[pos] = np.where(lacuna, np.nan, np.interp(Tg, T, x))
+    yg[pos] = np.where(lacuna, np.nan, np.interp(Tg, T, y))
+
+    # filtro de mediana (as lacunas continuam NaN)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # janelas só com NaN
+        meia = janela_mediana // 2
+        for arr in (xg, yg):
+            falta = np.isnan(arr)
+            arr[:] = np.nanmedian(sliding_window_view(np.pad(arr, meia, constant_values=np.nan),
+                                                      janela_mediana), axis=1)
+            arr[falta] = np.nan
+
+    return trial, tg, xg, yg, _velocidade(xg, yg, frequencia)
+
+
+def _velocidade(x, y, frequencia):
+    """Velocidade (px/s) de cada amostra desde a anterior; NaN na primeira e depois de lacunas."""
+    v = np.full(len(x), np.nan)
+    if len(x) > 1:
+        v[1:] = np.hypot(np.diff(x), np.diff(y)) * frequencia
+    return v
+
+
+def detecta_sacadas(trial, t, x, y, v, limiar=LIMIAR_SACADA, amplitude_minima=AMPLITUDE_MINIMA):
+    """Sacadas da grade de `condiciona`: dict de arrays (trial, start, end, x0, y0, x1, y1, amplitude,
+    pico_velocidade). Origem é a amostra antes do trecho rápido; destino, a última dele."""
+    rapida = v > limiar
+    borda = np.diff(np.r_[False, rapida, False].astype(np.int8))
+    inicio = np.flatnonzero(borda == 1)
+    fim = np.flatnonzero(borda == -1) - 1
+    # v[k] é o movimento de k - 1 a k; os separadores NaN garantem que k - 1 existe
+    antes, depois = inicio - 1, fim
+    x0, y0, x1, y1 = x[antes], y[antes], x[depois], y[depois]
+    amplitude = np.hypot(x1 - x0, y1 - y0)
+    ok = (trial[antes] >= 0) & (trial[antes] == trial[depois]) & (amplitude >= amplitude_minima)
+    pico = np.maximum.reduceat(np.where(rapida, v, 0.0), inicio) if len(inicio) else np.empty(0)
+    return {
+        "trial": trial[antes][ok], "start": t[antes][ok], "end": t[depois][ok],
+        "x0": x0[ok], "y0": y0[ok], "x1": x1[ok], "y1": y1[ok],
+        "amplitude": amplitude[ok], "pico_velocidade": pico[ok],
+    }
+
+
+def classifica(x0, y0, x1, y1, indice=None):
+    """(palavra_origem, palavra_destino, tipo) das sacadas de um trial."""
+    x0, y0, x1, y1 = (np.asarray(a, dtype=np.float64) for a in (x0, y0, x1, y1))
+    dx = x1 - x0
+    # geometria: diferença de linhas pela distância vertical
+    dl = np.rint((y1 - y0) / ALTURA_LINHA)
+    tipo = np.select(
+        [(dl == 1) & (dx < 0), (dl < 0) | ((dl == 0) & (dx < 0)), (dl == 0) & (dx > 0)],
+        ["retorno_linha", "regressao", "progressiva"], default="outra",
+    ).astype(object)
+    w0 = w1 = np.full(len(x0), -1, dtype=np.int64)
+    if indice is not None and len(indice):
+        w0, w1 = indice.consulta(x0, y0), indice.consulta(x1, y1)
+        ok = (w0 >= 0) & (w1 >= 0)
+        l0, l1 = indice.linha[np.maximum(w0, 0)], indice.linha[np.maximum(w1, 0)]
+        palavras = np.select(
+            [(l1 == l0 + 1) & (dx < 0), w1 < w0, w1 > w0],
+            ["retorno_linha", "regressao", "progressiva"], default="intrapalavra",
+        )
+        tipo[ok] = palavras[ok]
+    return w0, w1, tipo
+
+
+def _por_participante(webgazer):
+    """{participant_id: [(trial_index, início, fim), ...]} a partir do índice do GazeArrays."""
+    grupos = {}
+    for (pid, ti), (a, b) in webgazer.index.items():
+        grupos.setdefault(pid, []).append((ti, a, b))
+    return grupos
+
+
+def tabela_sacadas(webgazer, trials=None, **params):
+    """Sacadas de todos os trials (uma linha por sacada), processando um participante por vez.
+
+    `trials` (amostras_gaze.trials_eye_tracking com text_content e webgazer_targets) posiciona as
+    palavras de cada texto; sem ele as sacadas são classificadas só pela geometria.
+    """
+    cond = {k: params[k] for k in ("frequencia", "lacuna_maxima", "janela_mediana")
+            if k in params}
+    det = {k: params[k] for k in ("limiar", "amplitude_minima") if k in params}
+    textos = {}
+    if trials is not None:
+        alvos = trials.get("webgazer_targets", pd.Series(None, index=trials.index))
+        textos = {(pid, ti): (texto, alvo) for pid, ti, texto, alvo
+                  in zip(trials["participant_id"], trials["trial_index"], trials["text_content"], alvos)}
+
+    samples = webgazer.samples
+    partes = []
+    for pid, lista in _por_participante(webgazer).items():
+        sac = detecta_sacadas(*condiciona([samples[a:b] for _, a, b in lista], **cond), **det)
+        trial_index = np.array([ti for ti, _, _ in lista])[sac["trial"]]
+        w0 = np.full(len(trial_index), -1, dtype=np.int64)
+        w1 = w0.copy()
+        tipo = np.empty(len(trial_index), dtype=object)
+        # classificação por trial (as sacadas já saem agrupadas e em ordem)
+        limites = np.flatnonzero(np.diff(sac["trial"])) + 1
+        for fatia in np.split(np.arange(len(trial_index)), limites):
+            if not len(fatia):
+                continue
+            texto = textos.get((pid, trial_index[fatia[0]]))
+            indice = indice_trial(*texto) if texto is not None else None
+            w0[fatia], w1[fatia], tipo[fatia] = classifica(
+                sac["x0"][fatia], sac["y0"][fatia], sac["x1"][fatia], sac["y1"][fatia], indice)
+        parte = pd.DataFrame({k: sac[k] for k in COLUNAS if k in sac})
+        parte.insert(0, "trial_index", trial_index)
+        parte.insert(0, "participant_id", pid)
+        parte["sacada"] = parte.groupby("trial_index", sort=False).cumcount()
+        parte["palavra_origem"], parte["palavra_destino"], parte["tipo"] = w0, w1, tipo
+        partes.append(parte)
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    return pd.concat(partes, ignore_index=True)[COLUNAS]
+
+
+def regressoes_por_trial(sacadas, webgazer=None):
+    """Contagens por trial: sacadas, regressões (number_of_regressions), retornos de linha e progressivas.
+
+    Com `webgazer`, trials sem nenhuma sacada também aparecem (com zeros).
+    """
+    contagem = pd.crosstab([sacadas["participant_id"], sacadas["trial_index"]], sacadas["tipo"])
+    contagem = contagem.reindex(columns=TIPOS, fill_value=0)
+    if webgazer is not None:
+        todos = pd.MultiIndex.from_tuples(list(webgazer.index), names=["participant_id", "trial_index"])
+        contagem = contagem.reindex(todos, fill_value=0)
+    tabela = pd.DataFrame({
+        "n_sacadas": contagem.sum(axis=1),
+        "number_of_regressions": contagem["regressao"],
+        "return_sweeps": contagem["retorno_linha"],
+        "progressive_saccades": contagem["progressiva"],
+    }).reset_index()
+    return tabela[COLUNAS_TRIAL]
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    output_sacadas = os.path.join(input_directory, "sacadas.csv")
+    output_regressoes = os.path.join(input_directory, "regressoes_por_trial.csv")
+
+    webgazer, _ = load_gaze(input_directory, webgazer_dtype=WEBGAZER_DTYPE_F64)
+    trials = trials_eye_tracking(input_directory, ["text_id", "text_content", "webgazer_targets"])
+    sacadas = tabela_sacadas(webgazer, trials)
+    sacadas.to_csv(output_sacadas, index=False, sep=';', decimal=',')
+    regressoes_por_trial(sacadas, webgazer).to_csv(output_regressoes, index=False, sep=';', decimal=',')
+    print(f"{len(sacadas)} sacadas em {len(webgazer)} trials → {output_sacadas}, {output_regressoes}")
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from consolida_granular import GRANULARIDADES, ExperimentDataProcessor
+
+
+def _participante(pid, segmentos, extras=()):
+    trials = [{"participant_id": pid, "consent_agreed": True, "screen_w": 1280, "screen_h": 720}]
+    for i, rt in enumerate(segmentos):
+        trials.append({"task": "self_paced_reading", "text_id": "t1", "text_authorship": "human",
+                       "segment_index": i, "segment_content": f"segmento {i}", "rt": rt})
+    trials.extend(extras)
+    return trials
+
+
+def _roda(input_dir, out_dir, cache_dir):
+    saidas = {g: str(out_dir / f"{g}.csv") for g in GRANULARIDADES}
+    ExperimentDataProcessor(str(input_dir), saidas, cache_dir=str(cache_dir)).run()
+    return {g: open(path, encoding="utf-8").read() for g, path in saidas.items()}
+
+
+def test_cache_quente_igual_ao_frio(tmp_path):
+    entrada = tmp_path / "data"
+    entrada.mkdir()
+    # p1: só inteiros; p2: um trial de eye tracking sem text_id (linha descartada em finish_file,
+    # mas guardada no cache) e avaliações com chaves que p1 não tem
+    arquivos = {
+        "p1": _participante("p1", [120, 340, 560]),
+        "p2": _participante("p2", [150.5, 200], [
+            {"task": "eye_tracking", "text_id": "", "number_of_fixations": 7},
+            {"task": "text_evaluation", "text_id": "t1", "response": {"naturalidade": 4, "clareza": 5}},
+        ]),
+    }
+    for pid, trials in arquivos.items():
+        (entrada / f"dados_participante_{pid}.json").write_text(json.dumps(trials), encoding="utf-8")
+
+    cache = tmp_path / "cache"
+    frio = _roda(entrada, tmp_path / "frio", cache)
+    quente = _roda(entrada, tmp_path / "quente", cache)
+    assert quente == frio
+    assert ";3;" in frio["text"]  # quantidade_segmentos de p1 continua inteiro
@@ -0,0 +1,22 @@
+import numpy as np
+
+from amostras_gaze import WEBGAZER_DTYPE_F64, GazeArrays
+from fixacoes import contagem_por_trial, tabela_fixacoes
+
+
+def test_contagem_inclui_trials_sem_fixacao():
+    webgazer = GazeArrays(WEBGAZER_DTYPE_F64)
+    # p1/0: uma fixação de 150 ms; p1/1: amostras espalhadas, nenhuma fixação; p2/0: sem amostras
+    parada = [(100.0, 100.0, float(t)) for t in range(0, 151, 30)]
+    espalhadas = [(100.0 * i, 100.0 * i, 30.0 * i) for i in range(6)]
+    webgazer.add("p1", 0, np.array(parada, dtype=WEBGAZER_DTYPE_F64))
+    webgazer.add("p1", 1, np.array(espalhadas, dtype=WEBGAZER_DTYPE_F64))
+    webgazer.add("p2", 0, np.array([], dtype=WEBGAZER_DTYPE_F64))
+
+    fixacoes = tabela_fixacoes(webgazer)
+    contagem = contagem_por_trial(fixacoes, webgazer)
+
+    assert list(zip(contagem["participant_id"], contagem["trial_index"], contagem["number_of_fixations"])) == [
+        ("p1", 0, 1), ("p1", 1, 0), ("p2", 0, 0)]
+    # sem o GazeArrays, só os trials com alguma fixação
+    assert len(contagem_por_trial(fixacoes)) == 1
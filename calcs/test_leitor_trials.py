@@ -0,0 +1,34 @@
+import json
+import tracemalloc
+
+from leitor_trials import iter_trials
+
+
+def _trials(n):
+    # ~4 KB por trial, com acentos (a volta ao início da lista é feita por seek no arquivo)
+    return [{"trial_index": i, "task": "eye_tracking", "text_content": "ação " * 200,
+             "webgazer_data": [{"x": j, "y": j, "t": j} for j in range(100)]} for i in range(n)]
+
+
+def _pico(path, **kwargs):
+    tracemalloc.start()
+    n = sum(1 for _ in iter_trials(path, **kwargs))
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return n, pico
+
+
+def test_envelope_em_streaming(tmp_path):
+    trials = _trials(1000)
+    envelope = tmp_path / "envelope.json"
+    envelope.write_text(json.dumps({"trials": trials, "meta": {"versao": 1}}, ensure_ascii=False), encoding="utf-8")
+    array = tmp_path / "array.json"
+    array.write_text(json.dumps(trials, ensure_ascii=False), encoding="utf-8")
+    assert envelope.stat().st_size > 4_000_000
+
+    assert list(iter_trials(envelope, chunk_size=4099)) == trials
+    n_envelope, pico_envelope = _pico(envelope, fields={"trial_index"})
+    n_array, pico_array = _pico(array, fields={"trial_index"})
+    assert n_envelope == n_array == len(trials)
+    # a lista do envelope não fica inteira no buffer: mesma ordem de grandeza do array
+    assert pico_envelope < 2 * pico_array + (1 << 20)
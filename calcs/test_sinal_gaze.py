@@ -0,0 +1,17 @@
+import numpy as np
+
+from amostras_gaze import WEBGAZER_DTYPE_F64
+from sinal_gaze import condiciona, detecta_sacadas
+
+
+def test_mediana_remove_pico_isolado():
+    # leitura lenta da esquerda para a direita com um pico de ruído de uma amostra
+    t = np.arange(0, 2000, 33.0)
+    x = 100 + 0.2 * t
+    x[20] = 1500
+    amostras = np.array(list(zip(x, np.full_like(t, 100), t)), dtype=WEBGAZER_DTYPE_F64)
+
+    trial, tg, xg, yg, v = condiciona([amostras])
+
+    assert np.nanmax(xg) < 600
+    assert len(detecta_sacadas(trial, tg, xg, yg, v)["trial"]) == 0
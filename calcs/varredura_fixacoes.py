@@ -0,0 +1,74 @@
+"""
+Sensibilidade das fixações aos limiares do eye-tracking.js.
+
+MIN_FIXATION_DURATION (100 ms) e MAX_FIXATION_RADIUS (35 px) são fixos no JS. Aqui a regra
+é recalculada para toda a grade DURACOES × RAIOS, em todos os trials de eye tracking de
+todos os participantes, numa única leitura dos dados (fixacoes.tabela_varredura).
+
+Saídas:
+  varredura_fixacoes.csv    tabela longa: participant_id, trial_index, text_id, text_authorship,
+                            min_fixation_duration, max_fixation_radius, number_of_fixations,
+                            total_fixation_duration, mean_fixation_duration
+                            (filtrada por um par de limiares, tem o formato que o stat_desc.py usa)
+  varredura_comparacoes.csv para cada par e cada variável, as comparações do stat_desc.py:
+                            média por participante e autoria, Δ (AI – human), t-teste de uma
+                            amostra vs. zero, d_rm e Wilcoxon
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.stats import wilcoxon
+
+from amostras_gaze import WEBGAZER_DTYPE_F64, load_gaze, trials_eye_tracking
+from fixacoes import tabela_varredura
+
+DURACOES = [50, 75, 100, 150, 200, 250, 300]   # ms
+RAIOS = [20, 25, 30, 35, 40, 50, 60, 75]       # px
+
+PARAMETROS = ["min_fixation_duration", "max_fixation_radius"]
+VARIAVEIS = ["number_of_fixations", "total_fixation_duration", "mean_fixation_duration"]
+
+
+def comparacoes(longa):
+    """Δ (AI – human) por participante e testes pareados, para cada par de limiares e variável."""
+    medias = (longa.groupby(PARAMETROS + ["participant_id", "text_authorship"])[VARIAVEIS]
+              .mean()
+              .unstack("text_authorship"))
+    resultados = []
+    for var in VARIAVEIS:
+        if (var, "AI") not in medias.columns or (var, "human") not in medias.columns:
+            continue
+        delta = (medias[(var, "AI")] - medias[(var, "human")]).dropna()
+        for (duracao, raio), dados in delta.groupby(level=PARAMETROS):
+            linha = {"min_fixation_duration": duracao, "max_fixation_radius": raio, "variavel": var,
+                     "n": len(dados), "delta_medio": dados.mean(),
+                     "t_statistic": np.nan, "p_value": np.nan, "d_rm": np.nan,
+                     "wilcoxon_stat": np.nan, "wilcoxon_p": np.nan}
+            if len(dados) > 1 and dados.std(ddof=1) > 0:
+                linha["t_statistic"], linha["p_value"] = stats.ttest_1samp(dados, 0)
+                linha["d_rm"] = dados.mean() / dados.std(ddof=1)
+                linha["wilcoxon_stat"], linha["wilcoxon_p"] = wilcoxon(dados)
+            resultados.append(linha)
+    return pd.DataFrame(resultados)
+
+
+if __name__ == "__main__":
+    input_directory = "/Users/vander/PycharmProjects/Textos/jspsych-experiment 4/data"
+    output_longa = os.path.join(input_directory, "varredura_fixacoes.csv")
+    output_comparacoes = os.path.join(input_directory, "varredura_comparacoes.csv")
+
+    webgazer, _ = load_gaze(input_directory, webgazer_dtype=WEBGAZER_DTYPE_F64)
+    longa = tabela_varredura(webgazer, DURACOES, RAIOS)
+    textos = trials_eye_tracking(input_directory, ["text_id", "text_authorship"])
+    longa = longa.merge(textos, on=["participant_id", "trial_index"], how="left")
+    longa = longa[["participant_id", "trial_index", "text_id", "text_authorship"]
+                  + PARAMETROS + VARIAVEIS]
+    longa.to_csv(output_longa, index=False, sep=';', decimal=',')
+
+    comp = comparacoes(longa)
+    comp.to_csv(output_comparacoes, index=False, sep=';', float_format='%.3f', decimal=',', encoding='utf-8')
+    print(f"{len(webgazer)} trials × {len(DURACOES) * len(RAIOS)} pares de limiares → {output_longa}")
+    print(f"Comparações AI – human por par → {output_comparacoes}")